@@ -1,3 +1,5 @@
 #!/bin/sh
 
-$RASPI_APP_VENV_PATH/bin/python $RASPI_APP_LAUNCH_PATH
+# Resolve the 'current' release link once at startup, so this process keeps running from its own release
+# folder even if 'current' is switched to a new release (self-update) while we're running
+$RASPI_APP_VENV_PATH/bin/python "$(readlink -f "$RASPI_APP_LAUNCH_PATH")"
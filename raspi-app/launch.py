@@ -7,17 +7,49 @@ Created on Fri May 28 2021
 
 # ---------------------------------------------------------------------------------------------------------------------
 # %% Imports
-from flask import Flask
+import os
+import json
+import shutil
+import signal
+import tempfile
+import threading
+
+from flask import Flask, Response, request
 from flask_cors import CORS
 
-from waitress import serve as wsgi_serve
-
-from wakeonlan import send_magic_packet
-from local.lib.network import nmap_host_info, ping_machine, reboot_desktop_to_os
-from local.lib.response_helpers import json_response
-
-from local.lib.server_helpers import check_git_version, register_waitress_shutdown_command
+from waitress import create_server as create_wsgi_server
+
+from local.lib.network import nmap_host_info, reboot_desktop_to_os, get_ubuntu_app_client
+from local.lib.host_monitor import Host_Monitor, Shared_Host_Monitor, Shared_Probe_State
+from local.lib.jobs import Job_Manager
+from local.lib.os_detect import detect_os_fast
+from local.lib.wake import send_wake_packets, wake_and_wait
+from local.lib.events import Event_Broadcaster, Host_Event_Tracker, Shared_Event_Channel, format_sse
+from local.lib.ssh import get_ssh_manager, parse_ssh_destination
+from local.lib.update_checker import Update_Checker, Shared_Update_Checker
+from local.lib.releases import Release_Manager
+from local.lib.response_cache import Response_Cache
+from local.lib.bulkheads import Bulkhead_Pools
+from local.lib.rate_limit import Rate_Limiter, Shared_Token_Buckets
+from local.lib.metrics import METRICS
+from local.lib.single_flight import SINGLE_FLIGHT
+from local.lib.prefork import Prefork_Supervisor, create_listen_socket, get_supervisor_pid
+from local.lib.response_helpers import json_response, server_error_response
+from local.lib.timekeeper_utils import get_current_ems
+
+from local.lib.server_helpers import check_git_version, register_waitress_shutdown_command, GIT_READER
+from local.lib.server_helpers import force_server_shutdown, get_git_state_signature
 from local.lib.environment import get_remote_host, get_remote_mac, get_remote_ssh_port, get_service_host, get_service_protocol, get_service_port, get_debugmode
+from local.lib.environment import get_service_threads, get_service_workers, get_events_max_subscribers
+from local.lib.environment import get_remote_ssh_user, get_ssh_commands, get_ssh_max_streams
+from local.lib.environment import get_ssh_fan_out_hosts, get_ssh_fan_out_concurrency
+from local.lib.environment import get_monitor_interval_ms, get_monitor_timeout_ms, get_nmap_result_ttl_sec
+from local.lib.environment import get_os_detect_timeout_ms, get_wake_packet_repeats, get_wake_boot_window_sec
+from local.lib.environment import get_update_check_interval_sec, get_update_check_max_backoff_sec, get_deploy_root
+from local.lib.environment import get_response_cache_max_entries
+from local.lib.environment import get_bulkhead_cheap_limit, get_bulkhead_slow_limit, get_bulkhead_control_limit
+from local.lib.environment import get_bulkhead_poll_limit, get_bulkhead_stream_limit
+from local.lib.environment import get_rate_limits
 # ---------------------------------------------------------------------------------------------------------------------
 # %% Create main routes
 
@@ -25,10 +57,41 @@ from local.lib.environment import get_remote_host, get_remote_mac, get_remote_ss
 wsgi_app = Flask(__name__)
 CORS(wsgi_app)
 
+# Record timing of every request (exported at /metrics)
+METRICS.instrument_flask(wsgi_app)
+
+# The server can run as several worker processes (see prefork.py, not used in debug mode)
+# -> State that every worker needs to agree on is kept in files in a (temporary) shared folder,
+#    which is only created when the supervisor starts up (see create_shared_folder) & removed when it stops
+USE_WORKERS = (get_service_workers() > 1) and not get_debugmode()
+SHARED_FOLDER_PATH = None
+if USE_WORKERS:
+    SHARED_FOLDER_PATH = os.path.join(tempfile.gettempdir(), "raspi-app-shared-{}".format(os.getpid()))
+
+# Limit how often each client (ip) can call the expensive & control routes, over-eager clients get a 429
+RATE_LIMITER = Rate_Limiter(get_rate_limits(), shared_buckets=Shared_Token_Buckets() if USE_WORKERS else None)
+RATE_LIMITER.install(wsgi_app)
+
+# Read-mostly routes re-use their responses (with ETags), until the data behind them changes
+RESPONSE_CACHE = Response_Cache(get_response_cache_max_entries())
+
+# Routes are split into pools that get their own share of the server threads, so slow routes can't starve the rest
+# -> Requests beyond a pool's limit get a 503 right away, rather than queueing up
+# -> Long-lived requests (slow, job long-polls, streams) can't take every thread between them (checked here)
+BULKHEADS = Bulkhead_Pools()
+BULKHEADS.add_pool("cheap", get_bulkhead_cheap_limit(), retry_after_sec=1)
+BULKHEADS.add_pool("slow", get_bulkhead_slow_limit(), retry_after_sec=5)
+BULKHEADS.add_pool("poll", get_bulkhead_poll_limit(), retry_after_sec=2)
+BULKHEADS.add_pool("control", get_bulkhead_control_limit(), retry_after_sec=10)
+BULKHEADS.add_pool("stream", get_bulkhead_stream_limit(), retry_after_sec=15)
+BULKHEADS.check_thread_budget(get_service_threads())
+
 # .....................................................................................................................
 
 
 @wsgi_app.route("/")
+@RESPONSE_CACHE.cached(validator_func=get_git_state_signature)
+@BULKHEADS.limit("cheap")
 def home_route():
     '''Home route that serves a home page of some sort'''
 
@@ -64,6 +127,8 @@ def home_route():
 
 
 @wsgi_app.route("/help")
+@RESPONSE_CACHE.cached(ttl_sec=300)
+@BULKHEADS.limit("cheap")
 def help_route():
 
     # Initialize output html listing
@@ -110,64 +175,585 @@ def help_route():
 # .....................................................................................................................
 
 @wsgi_app.route("/bring-online")
+@BULKHEADS.limit("slow")
 def bring_online_route():
     '''
     Brings the machine online
+    Add '?wait=<seconds>' to wait for the machine to come online before responding (capped at MAX_WAKE_WAIT_SEC),
+    or add '?job=1' to do the waiting in a background job (poll /jobs/<job_id> for the result)
     '''
 
-    send_magic_packet(REMOTE_MAC)
+    wait_sec = request.args.get("wait", default=0, type=float)
+    use_job = bool(request.args.get("job", default=0, type=int))
+
+    # Fire-and-forget, like a plain wake-on-lan call
+    EVENT_PUBLISHER.publish("wake_sent", {"mac": REMOTE_MAC, "wait_sec": wait_sec, "job": use_job})
+    if not use_job and wait_sec <= 0:
+        send_wake_packets(REMOTE_MAC, WAKE_PACKET_REPEATS)
+        return json_response({"success": "magic packet sent"})
+
+    # Jobs can wait for much longer, since they don't hold up a server thread
+    max_wait_sec = MAX_WAKE_JOB_WAIT_SEC if use_job else MAX_WAKE_WAIT_SEC
+    wait_sec = min(wait_sec, max_wait_sec) if wait_sec > 0 else max_wait_sec
+    wake_args = (REMOTE_MAC, REMOTE_HOST, wait_sec)
+    wake_kwargs = {"probe_func": HOST_MONITOR.probe_now,
+                   "packet_repeats": WAKE_PACKET_REPEATS,
+                   "boot_window_sec": WAKE_BOOT_WINDOW_SEC}
+
+    if use_job:
+        job = JOB_MANAGER.submit(("wake", REMOTE_MAC), wake_and_wait, *wake_args, force_new=True, **wake_kwargs)
+        return job_response(job)
+
+    result = wake_and_wait(*wake_args, **wake_kwargs)
 
-    return json_response({"success": "magic packet sent"})
+    return json_response(result)
 
 # .....................................................................................................................
 
 @wsgi_app.route("/check-online")
 @wsgi_app.route("/check-online/<int:timeout_ms>")
-def check_online_route(timeout_ms=100):
+@RESPONSE_CACHE.cached(validator_func=lambda: get_monitor_checked_at(), bypass_func=lambda: is_arg_set("fresh"),
+                       max_age_func=lambda: get_monitor_next_check_sec(),
+                       serve_func=lambda response: update_check_age(response))
+@BULKHEADS.limit("cheap")
+def check_online_route(timeout_ms=None):
     '''
     Checks if the machine is online
+    Answers from the background host monitor, unless called with '?fresh=1' (or the monitor result is stale),
+    in which case a live probe is run, with timeout_ms used as the probe timeout
+    The response gives both the time of the check (checked_at_ems) and its age (age_ms), which is
+    updated every time a cached copy of the response is served
     '''
 
-    is_online = ping_machine(REMOTE_HOST, timeout_ms)
+    force_fresh = is_arg_set("fresh")
+
+    # Treat anything older than a few monitor intervals as stale (e.g. if the monitor isn't running)
+    host_state = None
+    if not force_fresh:
+        host_state = HOST_MONITOR.get_state(max_age_ms=MONITOR_MAX_AGE_MS)
 
-    return json_response({"is_online": is_online})
+    is_cached = (host_state is not None)
+    if not is_cached:
+        host_state = HOST_MONITOR.probe_now(timeout_ms)
+
+    return json_response({"is_online": host_state["is_online"],
+                          "rtt_ms": host_state["rtt_ms"],
+                          "age_ms": host_state["age_ms"],
+                          "checked_at_ems": host_state["checked_at_ems"],
+                          "cached": is_cached})
 
 # .....................................................................................................................
 
 @wsgi_app.route("/get-host-info")
+@BULKHEADS.limit("slow")
 def get_host_info_route():
     '''
-    Runs an nmap to query the host info
+    Runs an nmap to query the host info, as a background job
+    Responds with the job (202) while the scan runs, poll /jobs/<job_id> for the result
+    Add '?refresh=1' to ignore a previously cached scan result
     '''
 
-    result = nmap_host_info(REMOTE_HOST)
-
-    return json_response(result)
+    return submit_nmap_job()
 
 # .....................................................................................................................
 
 @wsgi_app.route("/get-current-os")
+@RESPONSE_CACHE.cached(validator_func=lambda: HOST_EVENTS.get_snapshot()["is_online"],
+                       ttl_sec=2, bypass_func=lambda: is_arg_set("full"))
+@BULKHEADS.limit("cheap")
 def get_current_os():
     '''
-    Gets the current operating system
+    Gets the current operating system, using quick checks (ping TTL, OS-specific ports, ssh banner)
+    Results are re-used for a few seconds (or until the host goes on/offline)
+    Add '?full=1' to use an nmap scan instead (as a background job, see /get-host-info)
     '''
 
-    result = nmap_host_info(REMOTE_HOST)
+    use_nmap = is_arg_set("full")
+    if use_nmap:
+        return submit_nmap_job()
+
+    result = detect_os_fast(REMOTE_HOST, OS_DETECT_TIMEOUT_MS)
+    HOST_EVENTS.update_os(result)
 
     return json_response(result)
 
 # .....................................................................................................................
 
+@wsgi_app.route("/jobs/<string:job_id>")
+@BULKHEADS.limit("poll")
+def get_job_route(job_id):
+    '''
+    Gets the status (and result, once finished) of a background job
+    Add '?wait=<seconds>' to long-poll until the job finishes (capped at MAX_JOB_WAIT_SEC)
+    '''
+
+    job = JOB_MANAGER.get_job(job_id)
+    if job is None:
+        return server_error_response("Unknown job id: {}".format(job_id), 404)
+
+    wait_sec = request.args.get("wait", default=0, type=float)
+    wait_sec = min(max(wait_sec, 0), MAX_JOB_WAIT_SEC)
+    if wait_sec > 0:
+        job.wait(wait_sec)
+
+    return job_response(job)
+
+# .....................................................................................................................
+
 @wsgi_app.route("/set-current-os/<string:os_select>")
+@BULKHEADS.limit("slow")
 def set_current_os(os_select):
     '''
     Sets the current operating system
     '''
 
+    EVENT_PUBLISHER.publish("reboot_requested", {"os": os_select})
     result = reboot_desktop_to_os(os_select)
 
     return json_response(result)
 
+# .....................................................................................................................
+
+@wsgi_app.route("/events")
+@BULKHEADS.limit("stream")
+def events_route():
+    '''
+    Streams host events as Server-Sent Events: online, offline, os_changed, wake_sent, reboot_requested
+    Starts with a 'state' event holding the current host state. Each stream holds a server thread,
+    so only a limited number are allowed at once (see EVENTS_MAX_SUBSCRIBERS)
+    '''
+
+    subscriber_queue = EVENT_BROADCASTER.subscribe()
+    if subscriber_queue is None:
+        response, status_code = server_error_response("Too many event subscribers, try again later", 503)
+        response.headers["Retry-After"] = str(EVENT_BROADCASTER.heartbeat_sec)
+        return response, status_code
+
+    # Make sure the subscriber slot is freed, even if the stream never starts
+    initial_events = [("state", HOST_EVENTS.get_snapshot())]
+    response = sse_response(EVENT_BROADCASTER.stream(subscriber_queue, initial_events))
+    response.call_on_close(lambda: EVENT_BROADCASTER.unsubscribe(subscriber_queue))
+
+    return response
+
+# .....................................................................................................................
+
+@wsgi_app.route("/ssh/run/<string:command_name>")
+@BULKHEADS.limit("stream")
+def ssh_run_route(command_name):
+    '''
+    Runs one of the configured commands (see SSH_COMMANDS) on the remote host over ssh,
+    streaming the output as Server-Sent Events: 'stdout' / 'stderr' events as output arrives,
+    then a final 'exit' event with the exit status and timing
+    Add '?timeout=<seconds>' to change the time limit (default 300, capped at MAX_SSH_TIMEOUT_SEC)
+    '''
+
+    remote_command, error_response = reserve_ssh_command(command_name)
+    if error_response is not None:
+        return error_response
+
+    timeout_sec = min(request.args.get("timeout", default=300, type=float), MAX_SSH_TIMEOUT_SEC)
+
+    def generate_sse():
+        try:
+            output_iter = get_ssh_manager().stream_command(REMOTE_HOST, REMOTE_SSH_USER, remote_command,
+                                                           REMOTE_SSH_PORT, timeout_sec)
+            for each_event_name, each_output in output_iter:
+                event_data = each_output if each_event_name == "exit" else {"text": each_output}
+                yield format_sse(each_event_name, event_data)
+        except OSError as err:
+            yield format_sse("error", {"error": str(err)})
+
+    response = sse_response(generate_sse())
+    response.call_on_close(SSH_STREAM_SLOTS.release)
+
+    return response
+
+# .....................................................................................................................
+
+@wsgi_app.route("/ssh/fan-out/<string:command_name>")
+@BULKHEADS.limit("stream")
+def ssh_fan_out_route(command_name):
+    '''
+    Runs one of the configured commands (see SSH_COMMANDS) on every host in SSH_FAN_OUT_HOSTS at once,
+    streaming a 'host_result' Server-Sent Event as each host finishes, then a 'summary' event
+    Add '?concurrency=<count>' to change how many hosts run at once,
+    or '?timeout=<seconds>' to change the per-host time limit (default 60, capped at MAX_SSH_TIMEOUT_SEC)
+    '''
+
+    remote_command, error_response = reserve_ssh_command(command_name)
+    if error_response is not None:
+        return error_response
+
+    max_concurrency = request.args.get("concurrency", default=SSH_FAN_OUT_CONCURRENCY, type=int)
+    timeout_sec = min(request.args.get("timeout", default=60, type=float), MAX_SSH_TIMEOUT_SEC)
+
+    def generate_sse():
+        for each_event_name, each_data in get_ssh_manager().fan_out(SSH_FAN_OUT_DESTINATIONS, remote_command,
+                                                                     max_concurrency, timeout_sec):
+            yield format_sse(each_event_name, each_data)
+
+    response = sse_response(generate_sse())
+    response.call_on_close(SSH_STREAM_SLOTS.release)
+
+    return response
+
+# .....................................................................................................................
+
+@wsgi_app.route("/upstream-stats")
+@BULKHEADS.limit("cheap")
+def upstream_stats_route():
+    '''
+    Gets latency stats for calls made to the ubuntu-app
+    '''
+
+    return json_response(get_ubuntu_app_client().get_stats())
+
+# .....................................................................................................................
+
+@wsgi_app.route("/metrics")
+def metrics_route():
+    '''
+    Gets request/subprocess timing histograms, counters & server gauges, in the Prometheus text format
+    '''
+
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+# .....................................................................................................................
+
+@wsgi_app.route("/versions")
+@BULKHEADS.limit("cheap")
+def versions_route():
+    '''
+    Gets the newer/current/older commit listing from the last background update check (doesn't touch the network)
+    Add '?refresh=1' to ask for a new check in the background. The response doesn't wait for it
+    '''
+
+    if request.args.get("refresh", "0") == "1":
+        UPDATE_CHECKER.request_check()
+
+    version_state = UPDATE_CHECKER.get_state()
+    if version_state is None:
+        response, status_code = server_error_response("Update check hasn't finished yet, try again later", 503)
+        response.headers["Retry-After"] = "5"
+        return response, status_code
+
+    return json_response(version_state)
+
+# .....................................................................................................................
+
+@wsgi_app.route("/releases")
+@BULKHEADS.limit("cheap")
+def releases_route():
+    '''
+    Lists the prepared releases (one git worktree per commit) used for self-updates, and which one is current
+    '''
+
+    return json_response(RELEASE_MANAGER.get_status())
+
+# .....................................................................................................................
+
+@wsgi_app.route("/update-to/<string:revision>")
+@BULKHEADS.limit("control")
+def update_to_route(revision):
+    '''
+    Prepares the given commit/tag as a release (separate worktree, pre-compiled), then switches to it.
+    The server restarts itself afterwards (to be started again by systemd), unless '?restart=0' is given.
+    The old release is kept on disk for instant rollbacks (see /rollback-update)
+    '''
+
+    try:
+        update_result = RELEASE_MANAGER.update_to(revision)
+    except AttributeError:
+        return server_error_response("Unknown commit: {}".format(revision), 404)
+    except RuntimeError as err:
+        return server_error_response(str(err))
+
+    update_result["restarting"] = schedule_restart(update_result["changed"])
+
+    return json_response(update_result)
+
+# .....................................................................................................................
+
+@wsgi_app.route("/rollback-update")
+@BULKHEADS.limit("control")
+def rollback_update_route():
+    '''
+    Switches back to the release that was in use before the last update, then restarts (unless '?restart=0')
+    '''
+
+    try:
+        rollback_result = RELEASE_MANAGER.rollback()
+    except RuntimeError as err:
+        return server_error_response(str(err))
+
+    rollback_result["restarting"] = schedule_restart(rollback_result["changed"])
+
+    return json_response(rollback_result)
+
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+# %% Route helpers
+
+# .....................................................................................................................
+
+def job_response(job):
+    '''Responds with the job info. Uses 202 (with a Location header to poll) if the job is still running'''
+
+    job_dict = job.to_dict()
+    if job.is_finished():
+        return json_response(job_dict)
+
+    job_url = "/jobs/{}".format(job.job_id)
+    job_dict["poll_url"] = job_url
+    response, status_code = json_response(job_dict, 202)
+    response.headers["Location"] = job_url
+
+    return response, status_code
+
+# .....................................................................................................................
+
+def sse_response(sse_str_iter):
+    '''Streams an iterable of Server-Sent Event strings to the client, with buffering disabled'''
+
+    return Response(sse_str_iter, mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# .....................................................................................................................
+
+def reserve_ssh_command(command_name):
+    '''
+    Looks up a named ssh command & reserves one of the ssh streaming slots for it
+    Returns (command, None) on success, otherwise (None, error_response)
+    '''
+
+    remote_command = SSH_COMMANDS.get(command_name)
+    if remote_command is None:
+        error_msg = "Unknown command: {}. Please choose one of: {}".format(command_name, ", ".join(SSH_COMMANDS))
+        return None, server_error_response(error_msg, 404)
+
+    # Each stream holds a server thread, so limit how many can run at once
+    if not SSH_STREAM_SLOTS.acquire(blocking=False):
+        response, status_code = server_error_response("Too many ssh commands running, try again later", 503)
+        response.headers["Retry-After"] = "5"
+        return None, (response, status_code)
+
+    return remote_command, None
+
+# .....................................................................................................................
+
+def submit_nmap_job():
+    '''Starts an nmap scan of the remote host in the background (or re-uses the running/cached one)'''
+
+    force_new = bool(request.args.get("refresh", default=0, type=int))
+    job = JOB_MANAGER.submit(("nmap", REMOTE_HOST), run_nmap_scan, REMOTE_HOST, force_new=force_new)
+
+    return job_response(job)
+
+# .....................................................................................................................
+
+def run_nmap_scan(host):
+    '''
+    Runs an nmap scan (as a background job). Scan failures are raised, so the job is reported as failed
+    (status 'error') and isn't re-used as a cached result
+    '''
+
+    scan_dict = nmap_host_info(host)
+    if "error" in scan_dict:
+        raise RuntimeError(scan_dict["error"])
+
+    return scan_dict
+
+# .....................................................................................................................
+
+def is_arg_set(arg_name):
+    '''Checks if a (0/1) flag query argument is set on the current request, e.g. '?fresh=1' '''
+    return bool(request.args.get(arg_name, default=0, type=int))
+
+# .....................................................................................................................
+
+def get_monitor_checked_at():
+    '''Returns the time (epoch ms) of the latest host monitor check, or None if there isn't a recent one'''
+
+    host_state = HOST_MONITOR.get_state(max_age_ms=MONITOR_MAX_AGE_MS)
+    if host_state is None:
+        return None
+
+    return host_state["checked_at_ems"]
+
+# .....................................................................................................................
+
+def update_check_age(response):
+    '''Updates the age (age_ms) of the host check given in a cached /check-online response'''
+
+    response_dict = json.loads(response.get_data())
+    response_dict["age_ms"] = max(0, get_current_ems() - response_dict["checked_at_ems"])
+    response.set_data(json.dumps(response_dict))
+
+# .....................................................................................................................
+
+def get_monitor_next_check_sec():
+    '''Returns roughly how long (in seconds) until the host monitor runs its next check'''
+
+    host_state = HOST_MONITOR.get_state()
+    if host_state is None:
+        return 0
+
+    return (HOST_MONITOR.interval_ms - host_state["age_ms"]) / 1000.0
+
+# .....................................................................................................................
+
+def get_response_cache_counts():
+    '''Returns the response cache hit/miss counts, labelled for the metrics'''
+
+    cache_stats = RESPONSE_CACHE.get_stats()
+
+    return {(("result", each_key),): cache_stats[each_key] for each_key in ("hits", "misses", "not_modified")}
+
+# .....................................................................................................................
+
+def get_bulkhead_counts():
+    '''Returns how many requests each route pool let through or turned away (503), labelled for the metrics'''
+
+    counts_dict = {}
+    for each_pool, each_stats in BULKHEADS.get_stats().items():
+        for each_result in ("admitted", "rejected"):
+            counts_dict[(("pool", each_pool), ("result", each_result))] = each_stats[each_result]
+
+    return counts_dict
+
+# .....................................................................................................................
+
+def get_bulkhead_active():
+    '''Returns how many requests are running in each route pool, labelled for the metrics'''
+
+    return {(("pool", each_pool),): each_stats["active"] for each_pool, each_stats in BULKHEADS.get_stats().items()}
+
+# .....................................................................................................................
+
+def get_rate_limit_counts():
+    '''Returns how many requests were allowed or limited (429) by route, labelled for the metrics'''
+
+    counts_dict = {}
+    for each_route, each_counts in RATE_LIMITER.get_counts().items():
+        for each_result, each_count in each_counts.items():
+            counts_dict[(("route", each_route), ("result", each_result))] = each_count
+
+    return counts_dict
+
+# .....................................................................................................................
+
+def get_single_flight_counts():
+    '''Returns how many probe calls ran vs. waited on an identical in-flight call, labelled for the metrics'''
+
+    counts_dict = {}
+    for each_op, each_counts in SINGLE_FLIGHT.get_counts().items():
+        for each_result, each_count in each_counts.items():
+            counts_dict[(("operation", each_op), ("result", each_result))] = each_count
+
+    return counts_dict
+
+# .....................................................................................................................
+
+def schedule_restart(release_changed):
+    '''
+    Stops the server shortly after the current response is sent, so that systemd starts it again
+    from the (new) current release. Returns True if a restart was scheduled
+    '''
+
+    restart_requested = (request.args.get("restart", "1") != "0")
+    if not (release_changed and restart_requested):
+        return False
+
+    restart_timer = threading.Timer(RESTART_DELAY_SEC, force_service_shutdown)
+    restart_timer.daemon = True
+    restart_timer.start()
+
+    return True
+
+# .....................................................................................................................
+
+def force_service_shutdown():
+
+    ''' Stops the whole service, which means stopping the supervisor (and so every worker) when using workers '''
+
+    if USE_WORKERS:
+        os.kill(get_supervisor_pid(), signal.SIGTERM)
+    else:
+        force_server_shutdown()
+
+# .....................................................................................................................
+
+def create_shared_folder():
+
+    '''
+    Creates the (private) folder that workers share state through. Called by the supervisor before
+    any workers are started. A folder left behind by an earlier run that crashed (with the same pid) is replaced
+    '''
+
+    shutil.rmtree(SHARED_FOLDER_PATH, ignore_errors=True)
+    os.mkdir(SHARED_FOLDER_PATH, mode=0o700)
+    os.mkdir(JOBS_FOLDER_PATH)
+
+# .....................................................................................................................
+
+def run_monitor_process():
+
+    '''
+    Does the background work that should only happen once (when using workers), rather than once per worker:
+    probing the remote host (results are shared through shared memory), turning probe results into host events
+    (including OS re-checks) and checking for updates (results are shared through a file)
+    '''
+
+    METRICS.share_across_processes(SHARED_FOLDER_PATH)
+
+    update_checker = Update_Checker(GIT_READER, get_update_check_interval_sec(),
+                                    max_backoff_sec=get_update_check_max_backoff_sec(),
+                                    shared_state_path=UPDATE_STATE_PATH)
+    update_checker.listen_for_check_requests()
+    update_checker.start()
+
+    monitor = Host_Monitor(REMOTE_HOST, HOST_MONITOR.interval_ms, HOST_MONITOR.timeout_ms)
+    monitor.add_listener(SHARED_HOST_STATE.write)
+    monitor.add_listener(HOST_EVENTS.update_online)
+
+    def stop_monitor(*_):
+        monitor.stop(join_timeout_sec=0)
+    signal.signal(signal.SIGTERM, stop_monitor)
+    signal.signal(signal.SIGINT, stop_monitor)
+
+    monitor.run()
+
+# .....................................................................................................................
+
+def run_server(service_host, service_port, service_protocol, listen_socket=None):
+
+    ''' Runs the waitress server (blocking), either on its own or as one of several workers sharing a socket '''
+
+    # Start probing the remote host before we begin serving requests
+    HOST_MONITOR.start()
+    UPDATE_CHECKER.start()
+
+    # Workers pass on events from every worker (and the monitor process) to their own subscribers
+    if USE_WORKERS:
+        METRICS.share_across_processes(SHARED_FOLDER_PATH)
+        EVENT_PUBLISHER.follow(EVENT_BROADCASTER)
+
+    register_waitress_shutdown_command()
+    if listen_socket is None:
+        wsgi_server = create_wsgi_server(wsgi_app, host=service_host,
+                                         port=service_port, url_scheme=service_protocol, threads=get_service_threads())
+    else:
+        wsgi_server = create_wsgi_server(wsgi_app, sockets=[listen_socket],
+                                         url_scheme=service_protocol, threads=get_service_threads())
+    METRICS.add_waitress_gauges(wsgi_server.task_dispatcher)
+    wsgi_server.print_listen("Serving on http://{}:{} (pid: " + str(os.getpid()) + ")")
+    wsgi_server.run()
+
+# .....................................................................................................................
+
 
 # ---------------------------------------------------------------------------------------------------------------------
 # %% Configure globals
@@ -175,6 +761,88 @@ def set_current_os(os_select):
 REMOTE_HOST = get_remote_host()
 REMOTE_SSH_PORT = get_remote_ssh_port()
 REMOTE_MAC = get_remote_mac()
+REMOTE_SSH_USER = get_remote_ssh_user()
+OS_DETECT_TIMEOUT_MS = get_os_detect_timeout_ms()
+WAKE_PACKET_REPEATS = get_wake_packet_repeats()
+WAKE_BOOT_WINDOW_SEC = get_wake_boot_window_sec()
+
+# Keep track of whether the remote host is online in the background, so requests don't need to probe
+# -> With workers, a single monitor process probes the host & workers follow its results (in shared memory)
+HOST_MONITOR = Host_Monitor(REMOTE_HOST, get_monitor_interval_ms(), get_monitor_timeout_ms())
+SHARED_HOST_STATE = None
+if USE_WORKERS:
+    SHARED_HOST_STATE = Shared_Probe_State()
+    HOST_MONITOR = Shared_Host_Monitor(SHARED_HOST_STATE, REMOTE_HOST,
+                                       HOST_MONITOR.interval_ms, HOST_MONITOR.timeout_ms)
+MONITOR_MAX_AGE_MS = 3 * HOST_MONITOR.interval_ms
+
+# Host state changes are pushed to /events subscribers from the monitor, rather than each client polling
+# -> With workers, host events come from the monitor process (using a shared host state), and all events
+#    are published through a shared channel, which each worker passes on to its own subscribers
+EVENT_BROADCASTER = Event_Broadcaster(max_subscribers=get_events_max_subscribers())
+EVENT_PUBLISHER = EVENT_BROADCASTER
+HOST_EVENTS_PATH = None
+if USE_WORKERS:
+    EVENT_PUBLISHER = Shared_Event_Channel(os.path.join(SHARED_FOLDER_PATH, "events.lock"))
+    HOST_EVENTS_PATH = os.path.join(SHARED_FOLDER_PATH, "host_events.json")
+HOST_EVENTS = Host_Event_Tracker(EVENT_PUBLISHER, lambda: detect_os_fast(REMOTE_HOST, OS_DETECT_TIMEOUT_MS),
+                                 shared_state_path=HOST_EVENTS_PATH)
+if not USE_WORKERS:
+    HOST_MONITOR.add_listener(HOST_EVENTS.update_online)
+
+# Slow work (e.g. nmap scans) runs as background jobs, so it doesn't tie up the server threads
+# -> With workers, jobs are shared through files, so any worker can poll (or re-use) a job started by another
+JOBS_FOLDER_PATH = None
+if USE_WORKERS:
+    JOBS_FOLDER_PATH = os.path.join(SHARED_FOLDER_PATH, "jobs")
+JOB_MANAGER = Job_Manager(result_ttl_sec=get_nmap_result_ttl_sec(), shared_folder_path=JOBS_FOLDER_PATH)
+MAX_JOB_WAIT_SEC = 20
+MAX_WAKE_WAIT_SEC = 60
+MAX_WAKE_JOB_WAIT_SEC = 180
+
+# Remote commands that can be streamed over ssh (only named commands, not arbitrary ones!)
+SSH_COMMANDS = get_ssh_commands()
+SSH_STREAM_SLOTS = threading.BoundedSemaphore(get_ssh_max_streams())
+MAX_SSH_TIMEOUT_SEC = 3600
+
+# Hosts that fan-out commands get sent to
+SSH_FAN_OUT_DESTINATIONS = [parse_ssh_destination(each_host, REMOTE_SSH_USER) for each_host in get_ssh_fan_out_hosts()]
+SSH_FAN_OUT_CONCURRENCY = get_ssh_fan_out_concurrency()
+
+# Check for updates (git fetch) in the background, so version listings don't wait on the network
+# -> With workers, checks are made by the monitor process & workers read the results from a shared file
+UPDATE_CHECKER = Update_Checker(GIT_READER, get_update_check_interval_sec(),
+                                max_backoff_sec=get_update_check_max_backoff_sec())
+UPDATE_STATE_PATH = None
+if USE_WORKERS:
+    UPDATE_STATE_PATH = os.path.join(SHARED_FOLDER_PATH, "update_state.json")
+    UPDATE_CHECKER = Shared_Update_Checker(UPDATE_STATE_PATH)
+
+# Self-updates prepare each release in its own worktree (under the deploy root), next to the running one
+# -> The repo is found (from this code's location) on first use, rather than searching for it at startup
+APP_FOLDER_NAME = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+RELEASE_MANAGER = Release_Manager(None, get_deploy_root(),
+                                  compile_subfolder=APP_FOLDER_NAME)
+RESTART_DELAY_SEC = 1.0
+
+# Include response cache results in the metrics
+METRICS.add_callback("response_cache_requests_total", "Responses served by the cache (or not), by result",
+                     get_response_cache_counts, metric_type="counter")
+
+# Include route pool (bulkhead) admissions & rejections in the metrics
+METRICS.add_callback("bulkhead_requests_total", "Requests let through or turned away (503), by route pool",
+                     get_bulkhead_counts, metric_type="counter")
+METRICS.add_callback("bulkhead_active_requests", "Requests currently running, by route pool", get_bulkhead_active)
+
+# Include per-client rate limiting in the metrics
+METRICS.add_callback("rate_limit_requests_total", "Requests allowed or limited (429) by the per-client rate limits",
+                     get_rate_limit_counts, metric_type="counter")
+METRICS.add_callback("rate_limit_buckets", "Clients being tracked by the rate limits (idle ones are dropped)",
+                     RATE_LIMITER.get_num_buckets, merge="max")
+
+# Include coalesced (single-flight) host probes in the metrics
+METRICS.add_callback("single_flight_calls_total", "Probe calls that ran, or waited on an identical call (coalesced)",
+                     get_single_flight_counts, metric_type="counter")
 
 
 # ---------------------------------------------------------------------------------------------------------------------
@@ -194,12 +862,25 @@ if __name__ == "__main__":
     enable_debug_mode = get_debugmode()
     if enable_debug_mode:
         # Launch server using flask built-in debugging server
+        HOST_MONITOR.start()
+        UPDATE_CHECKER.start()
         wsgi_app.run(service_host, port=service_port, debug=True)
+    elif USE_WORKERS:
+        # Launch several waitress servers (worker processes), all accepting connections from one shared socket
+        num_workers = get_service_workers()
+        listen_socket = create_listen_socket(service_host, service_port)
+        supervisor = Prefork_Supervisor(num_workers,
+                                        lambda: run_server(service_host, service_port, service_protocol, listen_socket),
+                                        monitor_func=run_monitor_process)
+        print("Starting {} workers on {}".format(num_workers, SERVER_URL))
+        create_shared_folder()
+        try:
+            supervisor.run()
+        finally:
+            shutil.rmtree(SHARED_FOLDER_PATH, ignore_errors=True)
     else:
         # Launch server using waitress
-        register_waitress_shutdown_command()
-        wsgi_serve(wsgi_app, host=service_host,
-                   port=service_port, url_scheme=service_protocol)
+        run_server(service_host, service_port, service_protocol)
 
     # Feedback in case we get here
     print("Done! Closing server...")
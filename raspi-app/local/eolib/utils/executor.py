@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import io
+import sys
+import selectors
+import signal
+import subprocess
+import threading
+import time
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Process_Output_Reader(io.RawIOBase):
+    
+    '''
+    Wraps the stdout of a stream_process(...) generator as a readable (binary) file object,
+    for parsers that read their input incrementally (e.g. xml.etree.ElementTree.iterparse).
+    Only the start of stderr (up to max_stderr_bytes) is kept, as: reader.stderr
+    Once the output is used up, the process info (see run_process) is available as: reader.result
+    Wrap in io.BufferedReader for line-by-line reading
+    '''
+    
+    # .................................................................................................................
+    
+    def __init__(self, stream_iter, max_stderr_bytes = 4096):
+        
+        super().__init__()
+        self._stream_iter = stream_iter
+        self._pending_bytes = b""
+        self._max_stderr_bytes = max_stderr_bytes
+        self.stderr = b""
+        self.result = None
+    
+    # .................................................................................................................
+    
+    def readable(self):
+        return True
+    
+    # .................................................................................................................
+    
+    def readinto(self, buffer):
+        
+        # Pull more output from the process until we have something to hand back (or it's finished)
+        while not self._pending_bytes and self.result is None:
+            pipe_name, data = next(self._stream_iter)
+            if pipe_name == "exit":
+                self.result = data
+            elif pipe_name == "stdout":
+                self._pending_bytes = data
+            elif len(self.stderr) < self._max_stderr_bytes:
+                self.stderr += data[:(self._max_stderr_bytes - len(self.stderr))]
+        
+        num_bytes = min(len(buffer), len(self._pending_bytes))
+        buffer[:num_bytes] = self._pending_bytes[:num_bytes]
+        self._pending_bytes = self._pending_bytes[num_bytes:]
+        
+        return num_bytes
+    
+    # .................................................................................................................
+    
+    def close(self):
+        
+        # Closing early stops (kills) the process, see stream_process(...)
+        self._stream_iter.close()
+        super().close()
+    
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def run_process(cmd_list, command_class, timeout_sec, capture_output = True, max_output_bytes = 1000000,
+                cwd = None):
+    
+    '''
+    Runs a command (list of strings) and waits for it to finish, or for the timeout to run out.
+    On timeout, the whole process group is killed (not just the top-level process), since commands
+    like ssh or shell scripts start children of their own.
+    At most max_output_bytes are kept from stdout & stderr (each), any more output is read & discarded
+    (use None to keep everything).
+    Use capture_output = False for commands that leave background processes holding onto their
+    output (e.g. 'ssh -f'), which would otherwise keep us waiting on the pipes.
+    No more than a set number of processes of the same command_class can run at once (see CONCURRENCY_LIMITS),
+    waiting for a slot counts against the timeout.
+    
+    Returns a dictionary:
+        {"returncode": int | None, "stdout": bytes, "stderr": bytes, "timed_out": bool, "truncated": bool,
+         "outcome": "ok" | "error" | "timeout" | "stopped", "wall_sec": float, "cpu_sec": float | None,
+         "max_rss_kb": int | None}
+    '''
+    
+    # Output is collected (rather than streamed) whenever a max size is given
+    max_output_bytes = sys.maxsize if max_output_bytes is None else max_output_bytes
+    
+    result = None
+    for each_pipe_name, each_data in stream_process(cmd_list, command_class, timeout_sec, capture_output,
+                                                    cwd = cwd, _max_output_bytes = max_output_bytes):
+        if each_pipe_name == "exit":
+            result = each_data
+    
+    return result
+
+# .....................................................................................................................
+
+def stream_process(cmd_list, command_class, timeout_sec, capture_output = True, chunk_size = 4096,
+                   cwd = None, _max_output_bytes = None):
+    
+    '''
+    Runs a command, yielding its output as it arrives, as ("stdout" | "stderr", bytes) tuples.
+    The last item is ("exit", {...}), with the same info as run_process(...) (minus stdout/stderr data).
+    Both pipes are read at once (a chatty stderr can't block the command) and output is handed off in
+    chunks of at most chunk_size bytes, so memory use doesn't depend on how much the command prints.
+    Closing the generator early kills the process (group), as does running out of time.
+    Commands don't get any input (stdin is /dev/null), use start_coprocess(...) for commands that need input
+    '''
+    
+    # Wait for a free slot for this type of command (counts against the deadline)
+    start_time = time.perf_counter()
+    deadline = time.monotonic() + timeout_sec
+    slots = _get_slots(command_class)
+    if not slots.acquire(timeout = max(0, deadline - time.monotonic())):
+        result = _build_result(None, True, start_time, None)
+        _report_process(command_class, result)
+        yield "exit", result
+        return
+    
+    output_pipe = subprocess.PIPE if capture_output else subprocess.DEVNULL
+    try:
+        # Run in a new session/process group, so a timeout can kill everything the command started
+        proc = subprocess.Popen(cmd_list, stdin = subprocess.DEVNULL, stdout = output_pipe, stderr = output_pipe,
+                                cwd = cwd, start_new_session = True)
+    except BaseException:
+        slots.release()
+        raise
+    
+    timed_out = False
+    finished = False
+    rusage = None
+    kept_output = {"stdout": [], "stderr": []}
+    kept_sizes = {"stdout": 0, "stderr": 0}
+    truncated = False
+    try:
+        if capture_output:
+            pipe_names = {proc.stdout: "stdout", proc.stderr: "stderr"}
+            with selectors.DefaultSelector() as selector:
+                for each_pipe in pipe_names:
+                    os.set_blocking(each_pipe.fileno(), False)
+                    selector.register(each_pipe, selectors.EVENT_READ)
+                
+                while selector.get_map():
+                    remaining_sec = deadline - time.monotonic()
+                    if remaining_sec <= 0:
+                        timed_out = True
+                        break
+                    
+                    for each_key, _ in selector.select(remaining_sec):
+                        pipe_name = pipe_names[each_key.fileobj]
+                        try:
+                            chunk = os.read(each_key.fileobj.fileno(), chunk_size)
+                        except BlockingIOError:
+                            continue
+                        
+                        # An empty read means the pipe was closed
+                        if not chunk:
+                            selector.unregister(each_key.fileobj)
+                            continue
+                        
+                        # When collecting output (run_process), keep a limited amount & discard the rest
+                        if _max_output_bytes is not None:
+                            keep_size = max(0, min(len(chunk), _max_output_bytes - kept_sizes[pipe_name]))
+                            truncated = truncated or (keep_size < len(chunk))
+                            if keep_size > 0:
+                                kept_output[pipe_name].append(chunk[:keep_size])
+                                kept_sizes[pipe_name] += keep_size
+                            continue
+                        
+                        yield pipe_name, chunk
+        
+        # Wait for the process to exit (any pipes are closed, or were never opened)
+        if not timed_out:
+            returncode, rusage = _wait_with_deadline(proc, deadline)
+            timed_out = (returncode is None)
+        finished = True
+    
+    finally:
+        # Make sure nothing is left running if we time out or stop early (e.g. the reader went away)
+        if proc.returncode is None:
+            _kill_process_group(proc)
+            _, rusage = _reap(proc)
+        for each_pipe in (proc.stdout, proc.stderr):
+            if each_pipe is not None:
+                each_pipe.close()
+        slots.release()
+        
+        # Stopping early (on purpose) isn't an error, even though the process exits with an error code
+        result = _build_result(proc.returncode, timed_out, start_time, rusage, truncated)
+        if not finished:
+            result["outcome"] = "stopped"
+        _report_process(command_class, result)
+    
+    if _max_output_bytes is not None:
+        result["stdout"] = b"".join(kept_output["stdout"])
+        result["stderr"] = b"".join(kept_output["stderr"])
+    
+    yield "exit", result
+
+# .....................................................................................................................
+
+def start_coprocess(cmd_list, command_class):
+    
+    '''
+    Starts a long-running process that we talk to over its stdin/stdout (e.g. 'git cat-file --batch').
+    These don't use a slot or have a deadline, but are counted (when started) like other processes.
+    Returns the process (subprocess.Popen), which should be stopped with stop_coprocess(...)
+    '''
+    
+    proc = subprocess.Popen(cmd_list, stdin = subprocess.PIPE, stdout = subprocess.PIPE, stderr = subprocess.DEVNULL,
+                            start_new_session = True)
+    _report_process(command_class, None)
+    
+    return proc
+
+# .....................................................................................................................
+
+def stop_coprocess(proc, timeout_sec = 1.0):
+    
+    ''' Stops a process from start_coprocess(...), by closing its stdin (& killing it if it doesn't exit) '''
+    
+    try:
+        proc.stdin.close()
+    except OSError:
+        pass
+    
+    returncode, _ = _wait_with_deadline(proc, time.monotonic() + timeout_sec)
+    if returncode is None:
+        _kill_process_group(proc)
+        _reap(proc)
+    proc.stdout.close()
+
+# .....................................................................................................................
+
+def set_process_listener(listener_func):
+    
+    '''
+    Sets a function to be called each time a process finishes (e.g. for recording metrics), as:
+        listener_func(command_class, wall_sec, outcome, cpu_sec, max_rss_kb)
+    Where outcome is one of: "ok", "error" (non-zero exit code), "timeout" or "stopped" (closed early).
+    Co-processes are reported when they start, with None for everything except the outcome
+    '''
+    
+    global _PROCESS_LISTENER
+    _PROCESS_LISTENER = listener_func
+
+# .....................................................................................................................
+
+def _get_slots(command_class):
+    
+    with _SLOTS_LOCK:
+        slots = _SLOTS_BY_CLASS.get(command_class)
+        if slots is None:
+            max_processes = CONCURRENCY_LIMITS.get(command_class, DEFAULT_CONCURRENCY_LIMIT)
+            slots = _SLOTS_BY_CLASS[command_class] = threading.BoundedSemaphore(max_processes)
+    
+    return slots
+
+# .....................................................................................................................
+
+def _wait_with_deadline(proc, deadline):
+    
+    '''
+    Waits for the process to exit, without blocking past the deadline
+    Returns: returncode, rusage (both None if the deadline passed first)
+    '''
+    
+    # Poll with a growing delay, since os.wait4 can't wait with a timeout
+    delay_sec = 0.0005
+    while True:
+        returncode, rusage = _reap(proc, blocking = False)
+        if returncode is not None:
+            return returncode, rusage
+        
+        remaining_sec = deadline - time.monotonic()
+        if remaining_sec <= 0:
+            return None, None
+        time.sleep(min(delay_sec, remaining_sec))
+        delay_sec = min(0.05, delay_sec * 2)
+
+# .....................................................................................................................
+
+def _reap(proc, blocking = True):
+    
+    '''
+    Waits on the process with os.wait4, which also gives us its resource usage (cpu time, max memory use)
+    Returns: returncode, rusage (both None if not blocking & the process is still running)
+    '''
+    
+    if proc.returncode is not None:
+        return proc.returncode, None
+    
+    try:
+        pid, wait_status, rusage = os.wait4(proc.pid, 0 if blocking else os.WNOHANG)
+    except ChildProcessError:
+        # Already reaped somewhere else, so there's no usage info
+        proc.wait()
+        return proc.returncode, None
+    
+    if pid == 0:
+        return None, None
+    
+    # Record the exit code on the Popen object, so it doesn't try to wait on the (now gone) process itself
+    if os.WIFSIGNALED(wait_status):
+        proc.returncode = -os.WTERMSIG(wait_status)
+    else:
+        proc.returncode = os.WEXITSTATUS(wait_status)
+    
+    return proc.returncode, rusage
+
+# .....................................................................................................................
+
+def _kill_process_group(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
+
+# .....................................................................................................................
+
+def _build_result(returncode, timed_out, start_time, rusage, truncated = False):
+    
+    if timed_out:
+        outcome = "timeout"
+    else:
+        outcome = "ok" if returncode == 0 else "error"
+    
+    return {"returncode": None if timed_out else returncode,
+            "stdout": b"",
+            "stderr": b"",
+            "timed_out": timed_out,
+            "truncated": truncated,
+            "outcome": outcome,
+            "wall_sec": time.perf_counter() - start_time,
+            "cpu_sec": None if rusage is None else (rusage.ru_utime + rusage.ru_stime),
+            "max_rss_kb": None if rusage is None else rusage.ru_maxrss}
+
+# .....................................................................................................................
+
+def _report_process(command_class, result):
+    
+    listener_func = _PROCESS_LISTENER
+    if listener_func is None:
+        return
+    
+    if result is None:
+        listener_func(command_class, None, "ok", None, None)
+    else:
+        listener_func(command_class, result["wall_sec"], result["outcome"], result["cpu_sec"], result["max_rss_kb"])
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Number of processes of each class that can run at once (classes not listed use the default)
+DEFAULT_CONCURRENCY_LIMIT = 4
+CONCURRENCY_LIMITS = {"ping": 4, "nmap": 1, "git": 4, "ssh": 16, "ssh_master": 4, "compileall": 1, "reboot": 1}
+
+_SLOTS_LOCK = threading.Lock()
+_SLOTS_BY_CLASS = {}
+
+# Optional function which is told about every process, see set_process_listener(...)
+_PROCESS_LISTENER = None
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+    
+    # Quick checks of output limits, deadlines (killing a whole process group) & streaming
+    print(run_process(["sh", "-c", "echo hello; echo oops >&2; exit 3"], "demo", 5))
+    print(run_process(["sh", "-c", "yes | head -c 100000"], "demo", 5, max_output_bytes = 10)["truncated"])
+    
+    t1 = time.perf_counter()
+    ex_result = run_process(["sh", "-c", "sleep 10 & sleep 10"], "demo", 0.5)
+    print("Timed out:", ex_result["timed_out"], "after {:.2f} s".format(time.perf_counter() - t1))
+    
+    ex_reader = io.BufferedReader(Process_Output_Reader(stream_process(["seq", "1", "5"], "demo", 5)))
+    print([each_line.strip() for each_line in ex_reader], ex_reader.raw.result)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -11,12 +11,21 @@ Created on Thu Oct 22 11:22:38 2020
 #%% Imports
 
 import os
-import subprocess
+import io
+import atexit
+import threading
 
 from shutil import which
 
 import datetime as dt
 
+from itertools import islice
+
+from local.eolib.utils.git_direct import Git_Direct_Reader, find_git_folders, parse_commit_object
+from local.eolib.utils.git_direct import get_folder_tree_signature
+from local.eolib.utils.executor import run_process, stream_process, start_coprocess, stop_coprocess
+from local.eolib.utils.executor import Process_Output_Reader
+
 
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Define classes
@@ -29,11 +38,34 @@ class Git_Caller:
     
     def __init__(self, git_folder_parent_path = None):
         
-        # Try to find git folder, if not provided
-        if git_folder_parent_path is None:
+        # If a git folder isn't provided, it's searched for on first use (keeps creating a caller cheap)
+        self._git_folder_parent_path = git_folder_parent_path
+        self._need_git_folder_search = (git_folder_parent_path is None)
+        self._commit_format_arg = "--format=%H%x1f%h%x1f%cd%x1f%P%x1f%D"
+        
+        # Git calls are killed if they take longer than this (unless a call sets its own timeout)
+        self.default_timeout_sec = 120
+        
+        # Keep track of how many times we spawn git, since it's the main cost of most functions
+        self.num_git_calls = 0
+        
+        # Storage for a long-running 'git cat-file --batch' process, used for repeated object lookups
+        self._batch_lock = threading.Lock()
+        self._batch_proc = None
+        self._batch_parent_path = None
+        self._registered_atexit = False
+    
+    # .................................................................................................................
+    
+    @property
+    def git_folder_parent_path(self):
+        
+        # Try to find git folder (only once), if not provided
+        if self._need_git_folder_search:
+            self._need_git_folder_search = False
             this_file_path = os.path.abspath(os.path.realpath(__file__))
             this_folder_path = os.path.dirname(this_file_path)
-            found_git_folder, git_folder_parent_path = \
+            found_git_folder, self._git_folder_parent_path = \
             self.search_git_folder_backwards(this_folder_path, max_levels_to_search = 8,
                                              update_internal_pathing_on_success = False)
             
@@ -44,8 +76,12 @@ class Git_Caller:
                       "  Couldn't find git folder!",
                       sep = "\n")
         
-        self.git_folder_parent_path = git_folder_parent_path        
-        self._commit_format_arg = "--format='%h | %cd'"
+        return self._git_folder_parent_path
+    
+    @git_folder_parent_path.setter
+    def git_folder_parent_path(self, new_parent_folder_path):
+        self._need_git_folder_search = False
+        self._git_folder_parent_path = new_parent_folder_path
     
     # .................................................................................................................
     
@@ -138,14 +174,10 @@ class Git_Caller:
         parent_path = starting_folder_path
         for k in range(max_levels_to_search):
             
-            # Get a listing of all folders in the current parent folder path
-            file_names_list = os.listdir(parent_path)
-            file_paths_list = [os.path.join(parent_path, each_name) for each_name in file_names_list]
-            folder_paths_list = [each_path for each_path in file_paths_list if os.path.isdir(each_path)]
-            
-            # Stop searching if we find a git folder
+            # Stop searching if we find a git folder (or a .git file, which is used by worktrees)
+            # -> Checked with a single stat, rather than listing every folder (slow on SD cards)
             target_path = os.path.join(parent_path, target_folder)
-            found_git_folder = (target_path in folder_paths_list)
+            found_git_folder = os.path.exists(target_path)
             if found_git_folder:
                 git_folder_parent_path = parent_path
                 break
@@ -207,31 +239,144 @@ class Git_Caller:
     
     # .................................................................................................................
     
-    def _run_git(self, git_command, *command_strs, suppress_errors = True):
+    def fetch(self, *command_strs, remote_name = "origin", branch_name = "master", timeout_sec = None):
+        
+        ''' Updates remote-tracking refs (doesn't change the checked-out commit), so it's safe for readers too '''
+        
+        return self._run_git("fetch", remote_name, branch_name, *command_strs, timeout_sec = timeout_sec)
+    
+    # .................................................................................................................
+    
+    def resolve_commit_id(self, revision_str):
+        
+        ''' Returns the full id of the commit given by a revision (e.g. "HEAD", a tag or a short id) '''
+        
+        commit_revision_str = "{}^{{commit}}".format(revision_str)
+        batch_result = self.query_object(commit_revision_str)
+        if batch_result is not None:
+            commit_id, _, _ = batch_result
+            return commit_id
+        
+        return self._run_git("rev-parse", "--verify", "--quiet", commit_revision_str)[0]
+    
+    # .................................................................................................................
+    
+    def query_object(self, object_name):
+        
+        '''
+        Function used to look up a single object (e.g. "HEAD", "v1.0^{commit}", "a1b2c3d") through a
+        long-running 'git cat-file --batch' process, so that repeated lookups don't need to spawn git each time
+        Raises an AttributeError if the object is missing or the name is ambiguous
+        Returns:
+            object_id, object_type, object_data (bytes)
+            -> Returns None if the batch process isn't available (e.g. git isn't installed)
+        '''
+        
+        # Names are sent one-per-line, so we can't handle names containing newlines
+        object_name = object_name.strip()
+        if "\n" in object_name or object_name == "":
+            raise AttributeError("Error calling git! Bad object name: {}".format(repr(object_name)))
+        
+        with self._batch_lock:
+            
+            # Try twice, in case the process died since our last query and needs to be restarted
+            for _ in range(2):
+                batch_proc = self._get_batch_process()
+                if batch_proc is None:
+                    return None
+                
+                try:
+                    batch_proc.stdin.write("{}\n".format(object_name).encode("utf-8"))
+                    batch_proc.stdin.flush()
+                    header_str = batch_proc.stdout.readline().decode("utf-8")
+                    
+                    # Header is either "<id> <type> <size>" or "<name> missing" / "<name> ambiguous"
+                    header_parts = header_str.split()
+                    if len(header_parts) == 3:
+                        object_id, object_type, object_size = header_parts
+                        object_data = batch_proc.stdout.read(int(object_size) + 1)[:-1]
+                        if len(object_data) == int(object_size):
+                            return object_id, object_type, object_data
+                    
+                    elif header_str.rstrip().endswith((" missing", " ambiguous")):
+                        raise AttributeError("Error calling git! Bad object ({})".format(header_str.strip()))
+                
+                except (OSError, ValueError):
+                    pass
+                
+                # If we get here, the process died or we got garbled output, so start over
+                self._close_batch_process()
+        
+        return None
+    
+    # .................................................................................................................
+    
+    def close(self):
+        
+        ''' Function used to shut down any long-running git process. Also called automatically on exit '''
+        
+        with self._batch_lock:
+            self._close_batch_process()
+    
+    # .................................................................................................................
+    
+    def _get_batch_process(self):
+        
+        ''' Helper which returns the (running) 'git cat-file --batch' process, starting it if needed '''
+        
+        # Restart the process if our pathing has changed or it has died
+        path_changed = (self._batch_parent_path != self.git_folder_parent_path)
+        batch_died = (self._batch_proc is not None and self._batch_proc.poll() is not None)
+        if path_changed or batch_died:
+            self._close_batch_process()
+        
+        if self._batch_proc is None and self.git_folder_parent_path is not None:
+            cmd_list = ["git", "-C", self.git_folder_parent_path, "cat-file", "--batch"]
+            try:
+                self.num_git_calls += 1
+                self._batch_proc = start_coprocess(cmd_list, "git")
+                self._batch_parent_path = self.git_folder_parent_path
+            except OSError:
+                return None
+            
+            # Make sure we don't leave the process behind when python exits
+            if not self._registered_atexit:
+                atexit.register(self.close)
+                self._registered_atexit = True
+        
+        return self._batch_proc
+    
+    # .................................................................................................................
+    
+    def _close_batch_process(self):
+        
+        ''' Helper which stops the batch process (closing stdin makes git exit on its own) '''
+        
+        batch_proc, self._batch_proc = self._batch_proc, None
+        if batch_proc is None:
+            return
+        
+        stop_coprocess(batch_proc, timeout_sec = 1)
+    
+    # .................................................................................................................
+    
+    def _run_git(self, git_command, *command_strs, suppress_errors = True, timeout_sec = None):
         
         # Build list of arguments to use with subprocess call
         cmd_list = ["git", "-C", self.git_folder_parent_path, git_command, *command_strs]
         
         # Run git with captured output & look for errors
-        subproc_result = subprocess.run(cmd_list, stdout = subprocess.PIPE, stderr = subprocess.DEVNULL)
-        if subproc_result.returncode != 0:
-            
-            # We may have failed because git isn't even installed...
-            git_installed = self.check_git_installed()
-            if not git_installed:
-                raise RuntimeError("Error calling git... Not installed on system!")
-            
-            # We may have failed because the folder we're pointing doesn't have a git init
-            has_git_folder = self.verify_git_folder()
-            if not has_git_folder:
-                raise TypeError("Error calling git... Not using a git-enabled folder!")
-            
-            # If we get here, the git call probably failed for some other reason
-            print(subproc_result.returncode)
-            raise AttributeError("Error calling git! Used command:\n{}".format(" ".join(cmd_list)))
+        timeout_sec = self.default_timeout_sec if timeout_sec is None else timeout_sec
+        self.num_git_calls += 1
+        proc_result = run_process(cmd_list, "git", timeout_sec, max_output_bytes = None)
+        if proc_result["timed_out"]:
+            raise AttributeError("Error calling git! Timed out ({} sec) on command:\n{}".format(timeout_sec,
+                                                                                            " ".join(cmd_list)))
+        if proc_result["returncode"] != 0:
+            self._raise_git_error(cmd_list, proc_result["returncode"])
         
         # Grab returned byte-str and split it into separate strings (by newline) in a list
-        returned_byte_str = subproc_result.stdout
+        returned_byte_str = proc_result["stdout"]
         returned_str = returned_byte_str.decode("utf-8")
         output_str_list = [each_str.strip("'") for each_str in returned_str.splitlines()]
         
@@ -239,6 +384,53 @@ class Git_Caller:
     
     # .................................................................................................................
     
+    def _stream_git(self, git_command, *command_strs):
+        
+        '''
+        Similar to _run_git, but yields output lines as git produces them
+        If the caller stops reading early (e.g. closes the generator), git is stopped as well,
+        so that long outputs (e.g. a full 'git log') don't need to be generated/read when only the start is used
+        '''
+        
+        # Build list of arguments to use with subprocess call
+        cmd_list = ["git", "-C", self.git_folder_parent_path, git_command, *command_strs]
+        
+        # Run git and hand back lines as they arrive (closing the reader kills git, if it's still running)
+        self.num_git_calls += 1
+        git_stream = stream_process(cmd_list, "git", self.default_timeout_sec)
+        with io.BufferedReader(Process_Output_Reader(git_stream)) as git_reader:
+            for each_line in git_reader:
+                yield each_line.decode("utf-8").rstrip("\n")
+            proc_result = git_reader.raw.result
+        
+        if proc_result["timed_out"]:
+            raise AttributeError("Error calling git! Timed out ({} sec) on command:\n{}".format(
+                self.default_timeout_sec, " ".join(cmd_list)))
+        if proc_result["returncode"] != 0:
+            self._raise_git_error(cmd_list, proc_result["returncode"])
+    
+    # .................................................................................................................
+    
+    def _raise_git_error(self, cmd_list, return_code):
+        
+        ''' Helper used to raise an error describing why a git call failed '''
+        
+        # We may have failed because git isn't even installed...
+        git_installed = self.check_git_installed()
+        if not git_installed:
+            raise RuntimeError("Error calling git... Not installed on system!")
+        
+        # We may have failed because the folder we're pointing doesn't have a git init
+        has_git_folder = self.verify_git_folder()
+        if not has_git_folder:
+            raise TypeError("Error calling git... Not using a git-enabled folder!")
+        
+        # If we get here, the git call probably failed for some other reason
+        print(return_code)
+        raise AttributeError("Error calling git! Used command:\n{}".format(" ".join(cmd_list)))
+    
+    # .................................................................................................................
+    
     def _parse_git_datetimes(self, datetime_str):
         
         '''
@@ -262,10 +454,18 @@ class Git_Reader(Git_Caller):
     
     # .................................................................................................................
     
-    def __init__(self, git_folder_parent_path = None):
+    def __init__(self, git_folder_parent_path = None, use_direct_reads = True):
         
         # Inherit from parent class        
         super().__init__(git_folder_parent_path)
+        
+        # Storage for reader which works directly on the .git folder (avoids spawning git), created on first use
+        self._use_direct_reads = use_direct_reads
+        self._direct_reader = None
+        self._direct_reader_parent_path = None
+        
+        # Storage for tag listing, which only needs to be re-read if tags change
+        self._tags_index_cache = (None, {})
     
     # .................................................................................................................
     
@@ -282,7 +482,11 @@ class Git_Reader(Git_Caller):
     def get_full_commit_id(self, short_commit_id_str):
         
         try:
-            message_str_list = self.log("-n", "1", "--format=%H", short_commit_id_str)
+            commit_dict = self._read_commit(short_commit_id_str)
+            if commit_dict is not None:
+                message_str_list = [commit_dict["id"]]
+            else:
+                message_str_list = self.log("-n", "1", "--format=%H", short_commit_id_str)
         except AttributeError:
             message_str_list = ["??? ({})".format(short_commit_id_str)]
         
@@ -297,7 +501,13 @@ class Git_Reader(Git_Caller):
         
         tags_list = []
         try:
-            tags_list = self._run_git("tag", "--points-at", commit_id_str)
+            read_direct, found_tags_list = \
+            self._try_direct(lambda reader: reader.get_tags_for_commit(reader.resolve(commit_id_str)))
+            if not read_direct:
+                found_tags_list = self._get_tags_with_batch(commit_id_str)
+            if found_tags_list is None:
+                found_tags_list = self._run_git("tag", "--points-at", commit_id_str)
+            tags_list = found_tags_list
         except AttributeError:
             pass
         
@@ -311,7 +521,11 @@ class Git_Reader(Git_Caller):
         
         # Get commit message if possible
         try:
-            message_str_list = self.log("-n", "1", "--format=%B", commit_id_str)
+            commit_dict = self._read_commit(commit_id_str)
+            if commit_dict is not None:
+                message_str_list = self._format_commit_message(commit_dict)
+            else:
+                message_str_list = self.log("-n", "1", "--format=%B", commit_id_str)
         except AttributeError:
             message_str_list = ["Error! Can't find commit message for {}...".format(commit_id_str)]
             include_header_info = False
@@ -342,36 +556,39 @@ class Git_Reader(Git_Caller):
         if fetch_first:
             self.fetch()
         
+        # Read commits directly from the .git folder if possible, since it's much faster than calling git
+        read_direct, log_results_tuple = \
+        self._try_direct(self._read_direct_log, ["origin/master"], ["HEAD"], max_number_of_commits)
+        if read_direct:
+            return log_results_tuple
+        
         # Use 'git log' to get raw commit listing
-        log_results_list = self.log("HEAD..origin/master", self._commit_format_arg)
-        num_to_use = min(len(log_results_list), max_number_of_commits)
+        num_entries_arg = "-n {}".format(max(0, int(max_number_of_commits)))
+        log_results_list = self.log(num_entries_arg, "HEAD..origin/master", self._commit_format_arg)
         
-        # Now break listing into commit IDs & relative dates
-        commit_ids_list = []
-        commit_tags_list = []
-        commit_dates_list = []
-        for each_entry in log_results_list[:num_to_use]:
-            each_id, each_date_str = each_entry.split(" | ")
-            each_tags = self.get_tags_for_commit(each_id)
-            each_dt = self._parse_git_datetimes(each_date_str)
-            commit_ids_list.append(each_id)
-            commit_tags_list.append(each_tags)
-            commit_dates_list.append(each_dt)
+        # Now break listing into commit IDs, tags & dates
+        tags_index, _ = self._get_tags_index()
+        log_entries_list = [self._parse_log_entry(each_line) for each_line in log_results_list]
         
-        return commit_ids_list, commit_tags_list, commit_dates_list
+        return self._split_log_entries(log_entries_list, tags_index)
     
     # .................................................................................................................
     
     def get_current_commit(self):
         
+        # Read commit directly from the .git folder if possible, since it's much faster than calling git
+        read_direct, log_results_tuple = self._try_direct(self._read_direct_log, ["HEAD"], [], 1)
+        if read_direct:
+            (commit_id,), (commit_tags_list,), (commit_dt,) = log_results_tuple
+            return commit_id, commit_tags_list, commit_dt
+        
         # First use 'git log' to get raw commit listing
         log_results_list = self.log("-1", self._commit_format_arg)
-        current_entry = log_results_list[0]
+        current_entry = self._parse_log_entry(log_results_list[0])
         
-        # Now break listing into commit IDs & relative dates
-        commit_id, commit_date_str = current_entry.split(" | ")
-        commit_tags_list = self.get_tags_for_commit(commit_id)
-        commit_dt = self._parse_git_datetimes(commit_date_str)
+        # Now break listing into commit IDs, tags & dates
+        tags_index, _ = self._get_tags_index()
+        (commit_id,), (commit_tags_list,), (commit_dt,) = self._split_log_entries([current_entry], tags_index)
         
         return commit_id, commit_tags_list, commit_dt
     
@@ -381,34 +598,35 @@ class Git_Reader(Git_Caller):
         
         # Handle special case of negative/zero max commits
         if max_number_of_commits < 1:
-            return [], []
+            return [], [], []
         
         # Create the log argument for getting older commits
         safe_number_of_commits = 1 + int(max_number_of_commits)
         num_entries_arg = "-n {}".format(safe_number_of_commits)
         
+        # Read commits directly from the .git folder if possible (first entry is the current commit, so skip it)
+        read_direct, log_results_tuple = \
+        self._try_direct(self._read_direct_log, ["HEAD"], [], safe_number_of_commits)
+        if read_direct:
+            return tuple(each_list[1:] for each_list in log_results_tuple)
+        
         # Use 'git log' to get raw commit listing
         log_results_list = self.log(num_entries_arg, self._commit_format_arg)
-        older_entries_list = log_results_list[1:]
+        older_entries_list = [self._parse_log_entry(each_line) for each_line in log_results_list[1:]]
         
-        # Now break listing into commit IDs & relative dates
-        commit_ids_list = []
-        commit_tags_list = []
-        commit_dates_list = []
-        for each_entry in older_entries_list:            
-            each_id, each_date_str = each_entry.split(" | ")
-            each_tags = self.get_tags_for_commit(each_id)
-            each_dt = self._parse_git_datetimes(each_date_str)
-            commit_ids_list.append(each_id)
-            commit_tags_list.append(each_tags)
-            commit_dates_list.append(each_dt)
+        # Now break listing into commit IDs, tags & dates
+        tags_index, _ = self._get_tags_index()
         
-        return commit_ids_list, commit_tags_list, commit_dates_list
+        return self._split_log_entries(older_entries_list, tags_index)
     
     # .................................................................................................................
     
     def get_commit_listings(self, max_listings = 6):
         
+        # When we have to call git, build the listing from a single pass through the log, to limit process spawns
+        if self._get_direct_reader() is None:
+            return self._get_commit_listings_single_pass(max_listings)
+        
         # Get the current entry
         current_commit_id, current_commit_tags_list, current_commit_dt = self.get_current_commit()
         
@@ -442,6 +660,315 @@ class Git_Reader(Git_Caller):
         
         return output_commit_listings
     
+    # .................................................................................................................
+    
+    def _get_commit_listings_single_pass(self, max_listings = 6):
+        
+        '''
+        Builds the same output as get_commit_listings, but using only 1 git call (regardless of listing size):
+            'git log' covering both HEAD & origin/master, which is only read as far as needed.
+            Tags come from the (full) ref decorations on each logged commit, so they don't need a separate call
+        '''
+        
+        # For clarity
+        max_new = (max_listings - 1)
+        upstream_ref_name = "refs/remotes/origin/master"
+        
+        # Walk through both histories at once. Date-order guarantees children are listed before their parents,
+        # so commits listed before HEAD are newer and ancestors of HEAD can be found by passing 'marks' to parents
+        # -> Newer commits may still be pending until we've seen the upstream commit itself
+        current_entry = None
+        newer_entries_list = []
+        older_entries_list = []
+        head_ancestor_ids = set()
+        pending_newer_ids = set()
+        found_upstream = False
+        log_lines = self._stream_git("log", "--date-order", "--decorate=full", self._commit_format_arg,
+                                     upstream_ref_name, "HEAD")
+        try:
+            for each_line in log_lines:
+                
+                each_entry = self._parse_log_entry(each_line)
+                each_id = each_entry["full_id"]
+                each_parents = each_entry["parent_ids"]
+                pending_newer_ids.discard(each_id)
+                found_upstream = found_upstream or (upstream_ref_name in each_entry["refs"])
+                
+                # Sort entry into current/older/newer commits
+                is_head = any(each_ref == "HEAD" or each_ref.startswith("HEAD -> ") for each_ref in each_entry["refs"])
+                if current_entry is None and is_head:
+                    current_entry = each_entry
+                    head_ancestor_ids.update(each_parents)
+                    pending_newer_ids.difference_update(each_parents)
+                
+                elif each_id in head_ancestor_ids:
+                    older_entries_list.append(each_entry)
+                    head_ancestor_ids.update(each_parents)
+                    pending_newer_ids.difference_update(each_parents)
+                
+                else:
+                    newer_entries_list.append(each_entry)
+                    pending_newer_ids.update(each_parent_id for each_parent_id in each_parents
+                                             if each_parent_id not in head_ancestor_ids)
+                
+                # Stop reading once the remaining log can't change the listing
+                if current_entry is None:
+                    continue
+                num_new = min(len(newer_entries_list), max_new)
+                have_all_newer = (found_upstream and len(pending_newer_ids) == 0) or (num_new >= max_new)
+                have_all_older = (len(older_entries_list) >= (max_listings - num_new - 1))
+                if have_all_newer and have_all_older:
+                    break
+        finally:
+            log_lines.close()
+        
+        if current_entry is None:
+            raise AttributeError("Error calling git! Couldn't find HEAD in log")
+        
+        # Build listings using the same limits as get_commit_listings
+        num_new = min(len(newer_entries_list), max_new)
+        num_old = max(0, max_listings - num_new - 1)
+        output_commit_listings = []
+        for each_entry in newer_entries_list[:num_new] + [current_entry] + older_entries_list[:num_old]:
+            each_tags_list = self._get_decoration_tags(each_entry["refs"])
+            each_dt = self._parse_git_datetimes(each_entry["date_str"])
+            one_listing = create_new_commit_listing(each_entry["short_id"], each_tags_list, each_dt,
+                                                    in_use = (each_entry is current_entry))
+            output_commit_listings.append(one_listing)
+        
+        return output_commit_listings
+    
+    # .................................................................................................................
+    
+    def _get_tags_index(self, *extra_ref_names):
+        
+        '''
+        Helper which builds a {full commit id: [tag names]} index, using a single 'git for-each-ref' call
+        Annotated tags are listed under both the tag object id & the commit they point at,
+        which matches the behavior of 'git tag --points-at'
+        Any extra (full) ref names that are given will also be looked up, and returned as a list of ids
+        Returns:
+            tags_index, extra_ref_ids (or a single id, if only 1 extra ref is given)
+        '''
+        
+        # Re-use the previous tag listing if possible (only when we don't need other refs, which change more often)
+        tags_state = self._get_tags_state() if len(extra_ref_names) == 0 else None
+        cached_state, cached_index = self._tags_index_cache
+        if tags_state is not None and tags_state == cached_state:
+            return cached_index, []
+        
+        # Get all tags, with peeled ids for annotated tags (sorted by ref name, like 'git tag' output)
+        refs_format_arg = "--format=%(objectname)%1f%(*objectname)%1f%(refname)"
+        ref_lines_list = self._run_git("for-each-ref", refs_format_arg, "refs/tags", *extra_ref_names)
+        
+        tags_index = {}
+        ids_by_ref_name = {}
+        for each_line in ref_lines_list:
+            object_id, peeled_id, ref_name = each_line.split("\x1f")
+            ids_by_ref_name[ref_name] = object_id
+            if not ref_name.startswith("refs/tags/"):
+                continue
+            
+            tag_name = ref_name[len("refs/tags/"):]
+            for each_id in {object_id, peeled_id}:
+                if each_id:
+                    tags_index.setdefault(each_id, []).append(tag_name)
+        
+        if tags_state is not None:
+            self._tags_index_cache = (tags_state, tags_index)
+        
+        extra_ref_ids = [ids_by_ref_name.get(each_name) for each_name in extra_ref_names]
+        if len(extra_ref_ids) == 1:
+            extra_ref_ids = extra_ref_ids[0]
+        
+        return tags_index, extra_ref_ids
+    
+    # .................................................................................................................
+    
+    @staticmethod
+    def _parse_log_entry(log_line):
+        
+        '''
+        Helper which splits a line of 'git log' output (using the commit format arg) into a dictionary
+        Example log line (fields separated by unit-separator characters):
+            "<full id>|<short id>|Wed Aug 5 14:09:05 2020 -0400|<parent ids>|HEAD -> master, tag: v1.0"
+        '''
+        
+        full_id, short_id, date_str, parents_str, refs_str = log_line.split("\x1f")
+        
+        return {"full_id": full_id,
+                "short_id": short_id,
+                "date_str": date_str,
+                "parent_ids": parents_str.split(),
+                "refs": [each_ref for each_ref in refs_str.split(", ") if each_ref]}
+    
+    # .................................................................................................................
+    
+    @staticmethod
+    def _get_decoration_tags(refs_list):
+        
+        '''
+        Helper which picks the (sorted) tag names out of a log entry's ref decorations, when using --decorate=full
+        Annotated tags are listed on the commit they point at, which matches 'git tag --points-at <commit>'
+        Example refs:
+            ["HEAD -> refs/heads/master", "tag: refs/tags/v1.0", "refs/remotes/origin/master"]
+        '''
+        
+        tag_prefix = "tag: refs/tags/"
+        
+        return sorted(each_ref[len(tag_prefix):] for each_ref in refs_list if each_ref.startswith(tag_prefix))
+    
+    # .................................................................................................................
+    
+    def _split_log_entries(self, log_entries_list, tags_index):
+        
+        ''' Helper which splits parsed log entries into separate lists of (short) commit ids, tags & dates '''
+        
+        commit_ids_list = []
+        commit_tags_list = []
+        commit_dates_list = []
+        for each_entry in log_entries_list:
+            commit_ids_list.append(each_entry["short_id"])
+            commit_tags_list.append(tags_index.get(each_entry["full_id"], []))
+            commit_dates_list.append(self._parse_git_datetimes(each_entry["date_str"]))
+        
+        return commit_ids_list, commit_tags_list, commit_dates_list
+    
+    # .................................................................................................................
+    
+    def _get_direct_reader(self):
+        
+        ''' Helper which returns a reader working directly on the .git folder, or None if it isn't supported '''
+        
+        # Bail if direct reads are disabled, so everything goes through git
+        if not self._use_direct_reads:
+            return None
+        
+        # Re-create the reader if our pathing has changed
+        if self._direct_reader_parent_path != self.git_folder_parent_path:
+            self._direct_reader = Git_Direct_Reader.create_if_supported(self.git_folder_parent_path)
+            self._direct_reader_parent_path = self.git_folder_parent_path
+        
+        return self._direct_reader
+    
+    # .................................................................................................................
+    
+    def _try_direct(self, read_func, *args):
+        
+        '''
+        Helper which tries to run a read function using the direct (no subprocess) reader
+        Missing commits/refs raise an AttributeError, just like failed git calls
+        Any other problem is treated as 'unsupported', so that the caller can fall back to calling git
+        Returns: read_direct (boolean), read_result
+        '''
+        
+        direct_reader = self._get_direct_reader()
+        if direct_reader is None:
+            return False, None
+        
+        try:
+            return True, read_func(direct_reader, *args)
+        except AttributeError:
+            raise
+        except Exception:
+            return False, None
+    
+    # .................................................................................................................
+    
+    @staticmethod
+    def _read_direct_log(direct_reader, include_revisions_list, exclude_revisions_list, max_number_of_commits):
+        
+        '''
+        Helper which mimics: git log -n <max> --format='%h | %cd' <include> ^<exclude>
+        Returns: commit_ids_list, commit_tags_list, commit_dates_list
+        '''
+        
+        # Resolve revisions (e.g. "HEAD", "origin/master") into full commit ids
+        include_ids = [direct_reader.read_commit(direct_reader.resolve(each_rev))["id"]
+                       for each_rev in include_revisions_list]
+        exclude_ids = [direct_reader.read_commit(direct_reader.resolve(each_rev))["id"]
+                       for each_rev in exclude_revisions_list]
+        
+        commit_ids_list = []
+        commit_tags_list = []
+        commit_dates_list = []
+        for each_commit in islice(direct_reader.iter_log(include_ids, exclude_ids), max_number_of_commits):
+            commit_ids_list.append(direct_reader.abbreviate(each_commit["id"]))
+            commit_tags_list.append(direct_reader.get_tags_for_commit(each_commit["id"]))
+            commit_dates_list.append(each_commit["commit_dt"])
+        
+        return commit_ids_list, commit_tags_list, commit_dates_list
+    
+    # .................................................................................................................
+    
+    def _read_commit(self, commit_id_str):
+        
+        '''
+        Helper which reads commit info (see git_direct.parse_commit_object), without spawning git if possible
+        Reads directly from the .git folder if supported, otherwise uses the 'cat-file --batch' process
+        Raises an AttributeError if the commit can't be found, returns None if neither approach is available
+        '''
+        
+        read_direct, commit_dict = \
+        self._try_direct(lambda reader: reader.read_commit(reader.resolve(commit_id_str)))
+        if read_direct:
+            return commit_dict
+        
+        batch_result = self.query_object("{}^{{commit}}".format(commit_id_str))
+        if batch_result is None:
+            return None
+        
+        object_id, _, object_data = batch_result
+        
+        return parse_commit_object(object_id, object_data)
+    
+    # .................................................................................................................
+    
+    def _get_tags_with_batch(self, commit_id_str):
+        
+        ''' Helper which mimics 'git tag --points-at', using the batch process + tag index. May return None '''
+        
+        batch_result = self.query_object(commit_id_str)
+        if batch_result is None:
+            return None
+        
+        object_id, _, _ = batch_result
+        tags_index, _ = self._get_tags_index()
+        
+        return tags_index.get(object_id, [])
+    
+    # .................................................................................................................
+    
+    def _get_tags_state(self):
+        
+        ''' Helper which returns a tuple that changes whenever tags are added/removed (or None if unavailable) '''
+        
+        # Bail if we can't find the git folder (tags are stored in the main repo folder, for worktrees)
+        _, common_folder_path = find_git_folders(self.git_folder_parent_path)
+        if common_folder_path is None:
+            return None
+        
+        # Check every tag folder, since adding a nested tag (e.g. 'release/v2') only changes its own folder
+        tags_state = [get_folder_tree_signature(os.path.join(common_folder_path, "refs", "tags"))]
+        try:
+            packed_stat = os.stat(os.path.join(common_folder_path, "packed-refs"))
+            tags_state.append((packed_stat.st_mtime_ns, packed_stat.st_size, packed_stat.st_ino))
+        except FileNotFoundError:
+            tags_state.append(None)
+        
+        return tuple(tags_state)
+    
+    # .................................................................................................................
+    
+    @staticmethod
+    def _format_commit_message(commit_dict):
+        
+        ''' Helper which mimics the output of: git log -n 1 --format=%B <commit> '''
+        
+        message_str = commit_dict["message"] + "\n"
+        
+        return [each_str.strip("'") for each_str in message_str.splitlines()]
+    
     # .................................................................................................................
     # .................................................................................................................
 
@@ -463,8 +990,25 @@ class Git_Writer(Git_Caller):
     
     # .................................................................................................................
     
-    def fetch(self, *command_strs, remote_name = "origin", branch_name = "master"):
-        return self._run_git("fetch", remote_name, branch_name, *command_strs)
+    def add_worktree(self, worktree_folder_path, commit_id_str):
+        
+        ''' Checks out a commit into a separate folder (detached), leaving the current checkout untouched '''
+        
+        return self._run_git("worktree", "add", "--detach", worktree_folder_path, commit_id_str)
+    
+    # .................................................................................................................
+    
+    def remove_worktree(self, worktree_folder_path):
+        
+        ''' Deletes a worktree folder (including any local changes!) and cleans up git's record of it '''
+        
+        try:
+            self._run_git("worktree", "remove", "--force", worktree_folder_path)
+        except AttributeError:
+            # Happens if git doesn't consider the folder to be a worktree (e.g. partially created)
+            pass
+        
+        return self._run_git("worktree", "prune")
     
     # .................................................................................................................
     
@@ -555,6 +1099,16 @@ if __name__ == "__main__":
     if ex_git.verify_git_folder():
         print(ex_git.get_version())
     
+    # Commit listings should only need a single git call, no matter how many commits are listed
+    ex_reader = Git_Reader(ex_git.git_folder_parent_path, use_direct_reads = False)
+    try:
+        for each_listing in ex_reader.get_commit_listings():
+            print(each_listing)
+        assert ex_reader.num_git_calls == 1, "Listing used {} git calls".format(ex_reader.num_git_calls)
+    except AttributeError as err:
+        print("", "Couldn't get commit listings:", err, sep = "\n")
+    print("", "Number of git calls: {}".format(ex_reader.num_git_calls), sep = "\n")
+
 
 
 # ---------------------------------------------------------------------------------------------------------------------
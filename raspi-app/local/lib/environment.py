@@ -8,48 +8,10 @@ Created on Tue Jul 1 2021
 
 
 # ---------------------------------------------------------------------------------------------------------------------
-#%% Add local path
+#%% Imports
 
 import os
-import sys
-
-def find_path_to_local(target_folder = "local"):
-    '''Finds the path to the local folder so that local imports work properly'''
-
-    # Skip path finding if we successfully import the dummy file
-    try:
-        from local.dummy import dummy_func
-        dummy_func()
-        return
-    except ImportError:
-        print("", "Couldn't find local directory!", "Searching for path...", sep="\n")
-
-    # Figure out where this file is located so we can work backwards to find the target folder
-    file_directory = os.path.dirname(os.path.abspath(__file__))
-    path_check = []
-
-    # Check parent directories to see if we hit the main project directory containing the target folder
-    prev_working_path = working_path = file_directory
-    while True:
-        # If we find the target folder in the given directory, add it to the python path (if it's not already there)
-        if target_folder in os.listdir(working_path):
-            if working_path not in sys.path:
-                tilde_swarm = "~"*(4 + len(working_path))
-                print("\n{0}\nPython path updated:\n  {1}\n{0}".format(tilde_swarm, working_path))
-                sys.path.append(working_path)
-            break
-
-        # Stop if we hit the filesystem root directory (parent directory isn't changing)
-        prev_working_path, working_path = working_path, os.path.dirname(working_path)
-        path_check.append(prev_working_path)
-        if prev_working_path == working_path:
-            print("\nTried paths:", *path_check, "", sep="\n  ")
-            raise ImportError("Can't find '{}' directory!".format(target_folder))
-
-find_path_to_local()
-
-# ---------------------------------------------------------------------------------------------------------------------
-#%% Imports
+import json
 
 # .....................................................................................................................
 # .....................................................................................................................
@@ -77,6 +39,18 @@ def get_service_port():
 
 # .....................................................................................................................
 
+def get_service_threads():
+    """Returns SERVICE_THREADS (number of waitress worker threads) if set, or 10"""
+    return int(os.environ.get("SERVICE_THREADS", 10))
+
+# .....................................................................................................................
+
+def get_service_workers():
+    """Returns SERVICE_WORKERS (number of server processes, each with its own threads) if set, or 1"""
+    return int(os.environ.get("SERVICE_WORKERS", 1))
+
+# .....................................................................................................................
+
 def get_remote_host():
     return os.environ.get("REMOTE_HOST", "192.168.2.128")
 
@@ -95,6 +69,125 @@ def get_remote_ssh_port():
 def get_remote_mac():
     return os.environ.get("REMOTE_MAC", "1C:1B:0D:95:58:E9")
 
+# .....................................................................................................................
+
+def get_remote_ssh_user():
+    return os.environ.get("REMOTE_SSH_USER", "jared")
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Performance tuning
+
+# .....................................................................................................................
+
+def get_monitor_interval_ms():
+    """Returns HOST_MONITOR_INTERVAL_MS (time between background probes of the remote host) if set, or 1000"""
+    return int(os.environ.get("HOST_MONITOR_INTERVAL_MS", 1000))
+
+# .....................................................................................................................
+
+def get_monitor_timeout_ms():
+    """Returns HOST_MONITOR_TIMEOUT_MS (how long each background probe waits for a reply) if set, or 250"""
+    return int(os.environ.get("HOST_MONITOR_TIMEOUT_MS", 250))
+
+# .....................................................................................................................
+
+def get_nmap_result_ttl_sec():
+    """Returns NMAP_RESULT_TTL_S (how long finished nmap scan results are re-used) if set, or 300"""
+    return float(os.environ.get("NMAP_RESULT_TTL_S", 300))
+
+# .....................................................................................................................
+
+def get_os_detect_timeout_ms():
+    """Returns OS_DETECT_TIMEOUT_MS (time limit for the fast OS detection checks) if set, or 80"""
+    return int(os.environ.get("OS_DETECT_TIMEOUT_MS", 80))
+
+# .....................................................................................................................
+
+def get_upstream_connect_timeout_sec():
+    """Returns UPSTREAM_CONNECT_TIMEOUT_S (connect timeout for calls to the ubuntu-app) if set, or 1.0"""
+    return float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT_S", 1.0))
+
+# .....................................................................................................................
+
+def get_upstream_read_timeout_sec():
+    """Returns UPSTREAM_READ_TIMEOUT_S (read timeout for calls to the ubuntu-app) if set, or 5.0"""
+    return float(os.environ.get("UPSTREAM_READ_TIMEOUT_S", 5.0))
+
+# .....................................................................................................................
+
+def get_upstream_max_retries():
+    """Returns UPSTREAM_MAX_RETRIES (retries of failed connection attempts to the ubuntu-app) if set, or 2"""
+    return int(os.environ.get("UPSTREAM_MAX_RETRIES", 2))
+
+# .....................................................................................................................
+
+def get_wake_packet_repeats():
+    """Returns WAKE_PACKET_REPEATS (number of magic packets sent per wake request) if set, or 3"""
+    return int(os.environ.get("WAKE_PACKET_REPEATS", 3))
+
+# .....................................................................................................................
+
+def get_wake_boot_window_sec():
+    """Returns WAKE_BOOT_WINDOW_S (start,end of the expected boot time after a wake, in seconds) if set, or (5, 45)"""
+    window_str = os.environ.get("WAKE_BOOT_WINDOW_S", "5,45")
+    window_start_sec, window_end_sec = [float(each_value) for each_value in window_str.split(",")]
+    return window_start_sec, window_end_sec
+
+# .....................................................................................................................
+
+def get_events_max_subscribers():
+    """Returns EVENTS_MAX_SUBSCRIBERS (max. /events streams, each holds a server thread) if set, or 2"""
+    return int(os.environ.get("EVENTS_MAX_SUBSCRIBERS", 2))
+
+# .....................................................................................................................
+
+def get_ssh_control_dir():
+    """Returns SSH_CONTROL_DIR (folder for ssh master connection sockets) if set, or a folder in /tmp"""
+    return os.environ.get("SSH_CONTROL_DIR", "/tmp/raspi-app-ssh")
+
+# .....................................................................................................................
+
+def get_ssh_control_persist_sec():
+    """Returns SSH_CONTROL_PERSIST_S (how long idle ssh master connections are kept open) if set, or 600"""
+    return int(os.environ.get("SSH_CONTROL_PERSIST_S", 600))
+
+# .....................................................................................................................
+
+def get_ssh_commands():
+    """
+    Returns SSH_COMMANDS (json object of {name: command} that can be run on remote hosts) if set,
+    or a few read-only health check commands
+    """
+    default_commands = {"uptime": "uptime", "disk": "df -h", "memory": "free -m"}
+    commands_json = os.environ.get("SSH_COMMANDS")
+    return default_commands if commands_json is None else json.loads(commands_json)
+
+# .....................................................................................................................
+
+def get_ssh_max_streams():
+    """Returns SSH_MAX_STREAMS (max. streaming ssh commands, each holds a server thread) if set, or 1"""
+    return int(os.environ.get("SSH_MAX_STREAMS", 1))
+
+# .....................................................................................................................
+
+def get_ssh_fan_out_hosts():
+    """
+    Returns SSH_FAN_OUT_HOSTS (comma separated list of user@host:port entries to run fan-out commands on) if set,
+    or just the remote host
+    """
+    default_host = "{}@{}:{}".format(get_remote_ssh_user(), get_remote_host(), get_remote_ssh_port())
+    hosts_str = os.environ.get("SSH_FAN_OUT_HOSTS", default_host)
+    return [each_host.strip() for each_host in hosts_str.split(",") if each_host.strip()]
+
+# .....................................................................................................................
+
+def get_ssh_fan_out_concurrency():
+    """Returns SSH_FAN_OUT_CONCURRENCY (max. hosts running a fan-out command at the same time) if set, or 4"""
+    return int(os.environ.get("SSH_FAN_OUT_CONCURRENCY", 4))
+
 # .....................................................................................................................
 # .....................................................................................................................
 
@@ -104,14 +197,101 @@ def get_remote_mac():
 # .....................................................................................................................
 
 def get_debugmode():
-    """Returns DEBUG_MODE (bool of the service in debug mode). Defaults to True"""
-    return bool(int(os.environ.get("DEBUG_MODE", 1)))
+    """Returns DEBUG_MODE (bool of the service in debug mode). Defaults to False"""
+    return bool(int(os.environ.get("DEBUG_MODE", 0)))
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Update checking
+
+# .....................................................................................................................
+
+def get_update_check_interval_sec():
+    """Returns UPDATE_CHECK_INTERVAL_S (time between background 'git fetch' checks for updates) if set, or 900"""
+    return float(os.environ.get("UPDATE_CHECK_INTERVAL_S", 900))
+
+# .....................................................................................................................
+
+def get_update_check_max_backoff_sec():
+    """Returns UPDATE_CHECK_MAX_BACKOFF_S (longest wait between retries after failed fetches) if set, or 3600"""
+    return float(os.environ.get("UPDATE_CHECK_MAX_BACKOFF_S", 3600))
 
 # .....................................................................................................................
+
+def get_deploy_root():
+    """Returns DEPLOY_ROOT (folder holding release worktrees & the 'current' link) if set, or a default path"""
+    return os.environ.get("DEPLOY_ROOT", "/home/jared/remote-compute-access-releases")
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Response caching
+
 # .....................................................................................................................
 
+def get_response_cache_max_entries():
+    """Returns RESPONSE_CACHE_MAX_ENTRIES (number of responses kept for read-mostly routes) if set, or 128"""
+    return int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 128))
+
+# .....................................................................................................................
+# .....................................................................................................................
 
 # ---------------------------------------------------------------------------------------------------------------------
+#%% Admission control
+
+# .....................................................................................................................
+
+def get_bulkhead_cheap_limit():
+    """Returns BULKHEAD_CHEAP_LIMIT (max. requests at once for quick routes, e.g. /check-online) if set, or 6"""
+    return int(os.environ.get("BULKHEAD_CHEAP_LIMIT", 6))
+
+# .....................................................................................................................
+
+def get_bulkhead_slow_limit():
+    """Returns BULKHEAD_SLOW_LIMIT (max. requests at once for routes that wait on the desktop) if set, or 2"""
+    return int(os.environ.get("BULKHEAD_SLOW_LIMIT", 2))
+
+# .....................................................................................................................
+
+def get_bulkhead_control_limit():
+    """Returns BULKHEAD_CONTROL_LIMIT (max. requests at once for self-update routes) if set, or 1"""
+    return int(os.environ.get("BULKHEAD_CONTROL_LIMIT", 1))
+
+# .....................................................................................................................
+
+def get_bulkhead_poll_limit():
+    """Returns BULKHEAD_POLL_LIMIT (max. requests at once for job polling, which may long-poll) if set, or 2"""
+    return int(os.environ.get("BULKHEAD_POLL_LIMIT", 2))
+
+# .....................................................................................................................
+
+def get_bulkhead_stream_limit():
+    """Returns BULKHEAD_STREAM_LIMIT (max. streams at once, i.e. /events & /ssh routes) if set, or 2"""
+    return int(os.environ.get("BULKHEAD_STREAM_LIMIT", 2))
+
+# .....................................................................................................................
+
+def get_rate_limits():
+    """
+    Returns RATE_LIMITS (json object of {route: [requests per minute, burst]}, limited per client ip) if set,
+    or limits for the expensive (nmap, wake) & control (reboot, update) routes
+    """
+    default_limits = {"/get-host-info": [6, 3],
+                      "/bring-online": [10, 5],
+                      "/set-current-os/<string:os_select>": [3, 2],
+                      "/update-to/<string:revision>": [3, 2],
+                      "/rollback-update": [3, 2]}
+    limits_json = os.environ.get("RATE_LIMITS")
+    return default_limits if limits_json is None else json.loads(limits_json)
+
+# .....................................................................................................................
+# .....................................................................................................................
 
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Demo
@@ -125,10 +305,41 @@ if __name__ == "__main__":
     print("SERVICE_PROTOCOL:", get_service_protocol())
     print("SERVICE_HOST:", get_service_host())
     print("SERVICE_PORT:", get_service_port())
+    print("SERVICE_THREADS:", get_service_threads())
+    print("SERVICE_WORKERS:", get_service_workers())
     print("")
     print("REMOTE_MAC", get_remote_mac())
     print("REMOTE_HOST", get_remote_host())
     print("REMOTE_SSH_PORT", get_remote_ssh_port())
+    print("REMOTE_SSH_USER", get_remote_ssh_user())
+    print("")
+    print("HOST_MONITOR_INTERVAL_MS", get_monitor_interval_ms())
+    print("HOST_MONITOR_TIMEOUT_MS", get_monitor_timeout_ms())
+    print("NMAP_RESULT_TTL_S", get_nmap_result_ttl_sec())
+    print("OS_DETECT_TIMEOUT_MS", get_os_detect_timeout_ms())
+    print("UPSTREAM_CONNECT_TIMEOUT_S", get_upstream_connect_timeout_sec())
+    print("UPSTREAM_READ_TIMEOUT_S", get_upstream_read_timeout_sec())
+    print("UPSTREAM_MAX_RETRIES", get_upstream_max_retries())
+    print("WAKE_PACKET_REPEATS", get_wake_packet_repeats())
+    print("WAKE_BOOT_WINDOW_S", get_wake_boot_window_sec())
+    print("EVENTS_MAX_SUBSCRIBERS", get_events_max_subscribers())
+    print("SSH_CONTROL_DIR", get_ssh_control_dir())
+    print("SSH_CONTROL_PERSIST_S", get_ssh_control_persist_sec())
+    print("SSH_COMMANDS", get_ssh_commands())
+    print("SSH_MAX_STREAMS", get_ssh_max_streams())
+    print("SSH_FAN_OUT_HOSTS", get_ssh_fan_out_hosts())
+    print("SSH_FAN_OUT_CONCURRENCY", get_ssh_fan_out_concurrency())
+    print("")
+    print("UPDATE_CHECK_INTERVAL_S", get_update_check_interval_sec())
+    print("UPDATE_CHECK_MAX_BACKOFF_S", get_update_check_max_backoff_sec())
+    print("DEPLOY_ROOT", get_deploy_root())
+    print("RESPONSE_CACHE_MAX_ENTRIES", get_response_cache_max_entries())
+    print("BULKHEAD_CHEAP_LIMIT", get_bulkhead_cheap_limit())
+    print("BULKHEAD_SLOW_LIMIT", get_bulkhead_slow_limit())
+    print("BULKHEAD_CONTROL_LIMIT", get_bulkhead_control_limit())
+    print("BULKHEAD_POLL_LIMIT", get_bulkhead_poll_limit())
+    print("BULKHEAD_STREAM_LIMIT", get_bulkhead_stream_limit())
+    print("RATE_LIMITS", get_rate_limits())
     print("")
 
 
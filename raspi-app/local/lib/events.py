@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import json
+import mmap
+import queue
+import struct
+import threading
+import time
+
+from local.lib.shared_files import File_Lock, save_json, load_json
+from local.lib.timekeeper_utils import get_current_ems
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Event_Broadcaster:
+
+    '''
+    Fans out events from a single producer to many subscribers (e.g. Server-Sent Events clients).
+    Each subscriber gets its own bounded queue, so a slow client only ever loses its own (oldest) events.
+    Streaming responses hold a server thread each, so the number of subscribers is capped
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, max_subscribers=2, queue_size=32, heartbeat_sec=15):
+
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.heartbeat_sec = heartbeat_sec
+
+        self._lock = threading.Lock()
+        self._subscriber_queues = set()
+        self._next_event_id = 1
+
+    # .................................................................................................................
+
+    def publish(self, event_name, data_dict):
+
+        ''' Sends an event to every subscriber. Never blocks, even if a subscriber isn't keeping up '''
+
+        with self._lock:
+            event_id = self._next_event_id
+            self._next_event_id += 1
+            subscriber_queues = list(self._subscriber_queues)
+
+        event_data = {"event": event_name, "ems": get_current_ems(), **data_dict}
+        event_str = format_sse(event_name, event_data, event_id)
+        for each_queue in subscriber_queues:
+            _put_dropping_oldest(each_queue, event_str)
+
+    # .................................................................................................................
+
+    def subscribe(self):
+
+        ''' Returns a new subscriber queue, or None if we're already at the subscriber limit '''
+
+        with self._lock:
+            if len(self._subscriber_queues) >= self.max_subscribers:
+                return None
+            subscriber_queue = queue.Queue(self.queue_size)
+            self._subscriber_queues.add(subscriber_queue)
+
+        return subscriber_queue
+
+    # .................................................................................................................
+
+    def unsubscribe(self, subscriber_queue):
+        with self._lock:
+            self._subscriber_queues.discard(subscriber_queue)
+
+    # .................................................................................................................
+
+    def num_subscribers(self):
+        with self._lock:
+            return len(self._subscriber_queues)
+
+    # .................................................................................................................
+
+    def stream(self, subscriber_queue, initial_events=()):
+
+        '''
+        Generator of SSE-formatted strings for a subscriber, for use as a streaming response body.
+        Sends a comment line as a heartbeat when idle, which is also how we find out that a client has gone away.
+        The subscriber is removed when the generator is closed
+        '''
+
+        try:
+            for each_event_name, each_data_dict in initial_events:
+                yield format_sse(each_event_name, {"event": each_event_name, "ems": get_current_ems(),
+                                                   **each_data_dict})
+
+            while True:
+                try:
+                    yield subscriber_queue.get(timeout=self.heartbeat_sec)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+
+        finally:
+            self.unsubscribe(subscriber_queue)
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Shared_Event_Channel:
+
+    '''
+    Passes events between processes (e.g. prefork workers), so that events published in any process reach
+    the subscribers of every process. Events are kept in a ring buffer in shared memory, which must be created
+    before forking. Each process follows the channel & passes new events on to its own broadcaster.
+    Has the same publish(...) function as the Event_Broadcaster, so it can be used in its place
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, lock_path, num_slots=64, slot_size=2048, poll_ms=50):
+
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self.poll_ms = poll_ms
+
+        # Stored as: [next sequence number] [slot 0] [slot 1] ..., where each slot is [sequence, length, json]
+        self._memory = mmap.mmap(-1, _SEQUENCE_STRUCT.size + (num_slots * slot_size))
+        self._lock = File_Lock(lock_path)
+        self._follow_thread = None
+
+    # .................................................................................................................
+
+    def publish(self, event_name, data_dict):
+
+        ''' Adds an event to the channel. Events too large to fit in a slot are dropped '''
+
+        event_bytes = json.dumps([event_name, data_dict]).encode("utf-8")
+        max_event_bytes = self.slot_size - _SLOT_HEADER_STRUCT.size
+        if len(event_bytes) > max_event_bytes:
+            print("", "Error (Shared_Event_Channel):",
+                  "  Event '{}' is too large ({} bytes)".format(event_name, len(event_bytes)), sep="\n")
+            return
+
+        with self._lock:
+            sequence = _SEQUENCE_STRUCT.unpack_from(self._memory, 0)[0]
+            slot_offset = self._get_slot_offset(sequence)
+            _SLOT_HEADER_STRUCT.pack_into(self._memory, slot_offset, sequence, len(event_bytes))
+            data_offset = slot_offset + _SLOT_HEADER_STRUCT.size
+            self._memory[data_offset:(data_offset + len(event_bytes))] = event_bytes
+            _SEQUENCE_STRUCT.pack_into(self._memory, 0, sequence + 1)
+
+    # .................................................................................................................
+
+    def read_since(self, sequence):
+
+        '''
+        Returns events published from the given sequence number onwards, as:
+            next sequence number, [(event_name, data_dict), ...]
+        Events that have already been overwritten (by newer events) are skipped
+        '''
+
+        events_list = []
+        with self._lock:
+            next_sequence = _SEQUENCE_STRUCT.unpack_from(self._memory, 0)[0]
+            first_sequence = max(sequence, next_sequence - self.num_slots)
+            for each_sequence in range(first_sequence, next_sequence):
+                slot_offset = self._get_slot_offset(each_sequence)
+                _, data_length = _SLOT_HEADER_STRUCT.unpack_from(self._memory, slot_offset)
+                data_offset = slot_offset + _SLOT_HEADER_STRUCT.size
+                events_list.append(self._memory[data_offset:(data_offset + data_length)])
+
+        return next_sequence, [tuple(json.loads(each_bytes)) for each_bytes in events_list]
+
+    # .................................................................................................................
+
+    def follow(self, broadcaster):
+
+        ''' Starts a background thread which passes new events from the channel on to a (local) broadcaster '''
+
+        def follow_channel():
+            sequence, _ = self.read_since(0)
+            while True:
+                time.sleep(self.poll_ms / 1000.0)
+                sequence, events_list = self.read_since(sequence)
+                for each_event_name, each_data_dict in events_list:
+                    broadcaster.publish(each_event_name, each_data_dict)
+
+        self._follow_thread = threading.Thread(target=follow_channel, name="event-channel", daemon=True)
+        self._follow_thread.start()
+
+    # .................................................................................................................
+
+    def _get_slot_offset(self, sequence):
+        return _SEQUENCE_STRUCT.size + (sequence % self.num_slots) * self.slot_size
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Host_Event_Tracker:
+
+    '''
+    Turns host monitor probe results into online/offline/os_changed events.
+    While the host is online, the OS is re-checked every so often, since a quick reboot into another OS
+    may not show up as an offline period.
+    If a shared state path is given, the host state is kept in that (json) file instead of in memory,
+    so trackers in several processes (e.g. prefork workers) agree on it, and each change or re-check
+    only happens in one of them
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, broadcaster, os_detect_func, os_recheck_sec=10, shared_state_path=None):
+
+        self._broadcaster = broadcaster
+        self._os_detect_func = os_detect_func
+        self.os_recheck_sec = os_recheck_sec
+        self.shared_state_path = shared_state_path
+
+        self._lock = threading.Lock() if shared_state_path is None else File_Lock(shared_state_path + ".lock")
+        self._state = {"is_online": None, "os": None, "last_os_check_mono": None}
+
+    # .................................................................................................................
+
+    def get_snapshot(self):
+        with self._lock:
+            state = self._load_state()
+            return {"is_online": state["is_online"], "os": state["os"]}
+
+    # .................................................................................................................
+
+    def update_online(self, probe_result):
+
+        ''' Call with each new probe result (e.g. as a host monitor listener) '''
+
+        is_online = probe_result["is_online"]
+        with self._lock:
+            state = self._load_state()
+            was_online = state["is_online"]
+            state["is_online"] = is_online
+
+            # Claim the re-check right away, so other threads/processes don't start one as well
+            last_check_mono = state["last_os_check_mono"]
+            os_check_due = is_online and ((last_check_mono is None)
+                                          or (time.monotonic() - last_check_mono) > self.os_recheck_sec)
+            if os_check_due:
+                state["last_os_check_mono"] = time.monotonic()
+            self._save_state(state)
+
+        if is_online != was_online:
+            self._broadcaster.publish("online" if is_online else "offline", {"rtt_ms": probe_result.get("rtt_ms")})
+
+        if os_check_due:
+            self.update_os(self._os_detect_func())
+
+    # .................................................................................................................
+
+    def update_os(self, os_detect_result):
+
+        ''' Call with each new OS detection result (e.g. from /get-current-os) '''
+
+        detected_os = os_detect_result.get("os")
+        with self._lock:
+            state = self._load_state()
+            state["last_os_check_mono"] = time.monotonic()
+            previous_os = state["os"]
+            is_changed = (detected_os not in (None, "unknown", "offline")) and (detected_os != previous_os)
+            if is_changed:
+                state["os"] = detected_os
+            self._save_state(state)
+
+        if not is_changed:
+            return
+
+        self._broadcaster.publish("os_changed", {"os": detected_os,
+                                                 "previous_os": previous_os,
+                                                 "confidence": os_detect_result.get("confidence")})
+
+    # .................................................................................................................
+
+    def _load_state(self):
+
+        # Monotonic times are system-wide (on linux), so they can be shared between processes
+        if self.shared_state_path is not None:
+            self._state = load_json(self.shared_state_path, self._state)
+        return self._state
+
+    # .................................................................................................................
+
+    def _save_state(self, state):
+        self._state = state
+        if self.shared_state_path is not None:
+            save_json(self.shared_state_path, state)
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def format_sse(event_name, data_dict, event_id=None):
+    '''Formats an event as a Server-Sent Events message (data is sent as single-line json)'''
+
+    sse_lines = []
+    if event_id is not None:
+        sse_lines.append("id: {}".format(event_id))
+    sse_lines.append("event: {}".format(event_name))
+    sse_lines.append("data: {}".format(json.dumps(data_dict)))
+
+    return "\n".join(sse_lines) + "\n\n"
+
+# .....................................................................................................................
+
+def _put_dropping_oldest(target_queue, item):
+    '''Puts an item on a bounded queue without blocking, throwing away the oldest entry if the queue is full'''
+
+    while True:
+        try:
+            target_queue.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                target_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Layout of the shared event channel memory
+_SEQUENCE_STRUCT = struct.Struct("<Q")
+_SLOT_HEADER_STRUCT = struct.Struct("<QI")
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    # A slow subscriber only keeps the most recent events
+    ex_broadcaster = Event_Broadcaster(max_subscribers=1, queue_size=3)
+    ex_queue = ex_broadcaster.subscribe()
+    print("Second subscriber allowed:", ex_broadcaster.subscribe() is not None)
+    for idx in range(5):
+        ex_broadcaster.publish("online" if idx % 2 else "offline", {"idx": idx})
+    while not ex_queue.empty():
+        print(ex_queue.get_nowait())
+
+    # Events published in a forked process reach the parent's subscribers through a shared channel
+    import os
+    import tempfile
+    with tempfile.TemporaryDirectory() as ex_folder_path:
+        ex_channel = Shared_Event_Channel(os.path.join(ex_folder_path, "events.lock"))
+        ex_channel.follow(ex_broadcaster)
+        time.sleep(0.1)
+        if os.fork() == 0:
+            ex_channel.publish("wake_sent", {"from_pid": os.getpid()})
+            os._exit(0)
+        os.wait()
+        print("From other process:", ex_queue.get(timeout=1))
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import mmap
+import struct
+import threading
+import time
+import zlib
+
+from local.lib.network import probe_host
+from local.lib.timekeeper_utils import get_current_ems
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Host_Monitor:
+
+    '''
+    Probes a host on a fixed schedule from a background thread and keeps the latest result in memory,
+    so that routes can answer 'is it online?' without probing on every request
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, host, interval_ms=1000, timeout_ms=250, probe_func=probe_host):
+
+        self.host = host
+        self.interval_ms = interval_ms
+        self.timeout_ms = timeout_ms
+        self._probe_func = probe_func
+
+        # Latest probe result is replaced as a whole, so readers never see a half-updated state
+        self._state_lock = threading.Lock()
+        self._latest = None
+
+        # Functions to call with every new probe result
+        self._listeners = []
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # .................................................................................................................
+
+    def add_listener(self, listener_func):
+
+        ''' Registers a function to be called (from the probing thread) with every new probe result '''
+
+        self._listeners.append(listener_func)
+
+    # .................................................................................................................
+
+    def start(self):
+
+        ''' Starts the background probing thread (does nothing if it's already running) '''
+
+        if self.is_running():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="host-monitor", daemon=True)
+        self._thread.start()
+
+    # .................................................................................................................
+
+    def run(self):
+
+        ''' Probes the host on schedule in the calling thread, until stop() is called. Used by start() '''
+
+        # Schedule probes start-to-start, so a slow (offline) probe doesn't stretch the interval
+        next_probe_time = time.monotonic()
+        while not self._stop_event.is_set():
+
+            try:
+                self.probe_now()
+            except Exception as err:
+                print("", "Error (Host_Monitor):", "  {}".format(err), sep="\n")
+
+            next_probe_time += (self.interval_ms / 1000.0)
+            sleep_sec = next_probe_time - time.monotonic()
+            if sleep_sec < 0:
+                # We fell behind (e.g. system was suspended), so don't try to catch up with a burst of probes
+                next_probe_time = time.monotonic()
+                sleep_sec = 0
+            self._stop_event.wait(sleep_sec)
+
+    # .................................................................................................................
+
+    def stop(self, join_timeout_sec=2.0):
+
+        ''' Stops the background probing thread '''
+
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(join_timeout_sec)
+        self._thread = None
+
+    # .................................................................................................................
+
+    def is_running(self):
+        return (self._thread is not None) and self._thread.is_alive()
+
+    # .................................................................................................................
+
+    def get_state(self, max_age_ms=None):
+
+        '''
+        Returns the most recent probe result (with its age), without probing.
+        Returns None if nothing has been probed yet, or if the result is older than max_age_ms
+        '''
+
+        with self._state_lock:
+            latest = self._latest
+
+        if latest is None:
+            return None
+
+        probe_result, checked_at_mono, checked_at_ems = latest
+        age_ms = round(1000 * (time.monotonic() - checked_at_mono), 3)
+        if (max_age_ms is not None) and (age_ms > max_age_ms):
+            return None
+
+        return {**probe_result, "age_ms": age_ms, "checked_at_ems": checked_at_ems}
+
+    # .................................................................................................................
+
+    def probe_now(self, timeout_ms=None):
+
+        ''' Runs a live probe (in the calling thread), updates the cached state and returns it '''
+
+        timeout_ms = self.timeout_ms if timeout_ms is None else timeout_ms
+        probe_result = self._probe_func(self.host, timeout_ms)
+        self._record(probe_result)
+
+        return {**probe_result, "age_ms": 0, "checked_at_ems": get_current_ems()}
+
+    # .................................................................................................................
+
+    def _record(self, probe_result, checked_at_mono=None, checked_at_ems=None):
+
+        checked_at_mono = time.monotonic() if checked_at_mono is None else checked_at_mono
+        checked_at_ems = get_current_ems() if checked_at_ems is None else checked_at_ems
+        new_latest = (probe_result, checked_at_mono, checked_at_ems)
+        with self._state_lock:
+
+            # Results from other processes can arrive after a newer live probe, so don't go backwards in time
+            if (self._latest is not None) and (checked_at_mono < self._latest[1]):
+                return
+            self._latest = new_latest
+
+        for each_listener in self._listeners:
+            try:
+                each_listener(probe_result)
+            except Exception as err:
+                print("", "Error (Host_Monitor listener):", "  {}".format(err), sep="\n")
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Shared_Host_Monitor(Host_Monitor):
+
+    '''
+    Follows the probe results of a Host_Monitor running in another process (through a Shared_Probe_State),
+    so that several server processes share one set of probes, rather than each probing the host on its own.
+    Listeners are called (from the following thread) whenever a new result shows up.
+    Live probes (probe_now) still run in the calling process
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, shared_state, host, interval_ms=1000, timeout_ms=250, probe_func=probe_host, poll_ms=50):
+
+        super().__init__(host, interval_ms, timeout_ms, probe_func)
+        self.poll_ms = poll_ms
+        self._shared_state = shared_state
+
+    # .................................................................................................................
+
+    def run(self):
+
+        ''' Checks the shared state for new results in the calling thread, until stop() is called '''
+
+        last_sequence = None
+        while not self._stop_event.is_set():
+
+            shared_result = self._shared_state.read()
+            if (shared_result is not None) and (shared_result[0] != last_sequence):
+                last_sequence, probe_result, checked_at_mono, checked_at_ems = shared_result
+                self._record(probe_result, checked_at_mono, checked_at_ems)
+
+            self._stop_event.wait(self.poll_ms / 1000.0)
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Shared_Probe_State:
+
+    '''
+    Holds the latest probe result in (anonymous) shared memory, which is inherited by processes forked after
+    this object is created. Meant for a single writer (a Host_Monitor in one process, using write() as a listener)
+    and any number of readers (see Shared_Host_Monitor).
+    Records carry a checksum, so a read that overlaps a write is detected (and retried) without needing a lock,
+    which a crashed process could otherwise leave locked
+    '''
+
+    # Sequence number, flags (online, has rtt, has ttl), rtt_ms, ttl, checked_at_ems, checked_at_mono + checksum
+    _RECORD = struct.Struct("<QBdiqd")
+    _CHECKSUM = struct.Struct("<I")
+
+    # .................................................................................................................
+
+    def __init__(self):
+        self._mmap = mmap.mmap(-1, self._RECORD.size + self._CHECKSUM.size)
+
+    # .................................................................................................................
+
+    def write(self, probe_result):
+
+        ''' Stores a new probe result (should only be called from one process) '''
+
+        # Continue the sequence from what's stored, in case we're a restarted monitor process
+        last_result = self.read()
+        sequence = 1 if last_result is None else (last_result[0] + 1)
+
+        rtt_ms, ttl = probe_result.get("rtt_ms"), probe_result.get("ttl")
+        flags = int(bool(probe_result.get("is_online"))) | (int(rtt_ms is not None) << 1) | (int(ttl is not None) << 2)
+        record_bytes = self._RECORD.pack(sequence, flags, rtt_ms or 0.0, ttl or 0, get_current_ems(), time.monotonic())
+        self._mmap[:] = record_bytes + self._CHECKSUM.pack(zlib.crc32(record_bytes))
+
+    # .................................................................................................................
+
+    def read(self, max_attempts=10):
+
+        '''
+        Returns the latest probe result as: sequence, probe_result, checked_at_mono, checked_at_ems
+        Returns None if nothing has been written yet
+        '''
+
+        for _ in range(max_attempts):
+            stored_bytes = self._mmap[:]
+            record_bytes, checksum_bytes = stored_bytes[:self._RECORD.size], stored_bytes[self._RECORD.size:]
+            if zlib.crc32(record_bytes) == self._CHECKSUM.unpack(checksum_bytes)[0]:
+                break
+        else:
+            return None
+
+        sequence, flags, rtt_ms, ttl, checked_at_ems, checked_at_mono = self._RECORD.unpack(record_bytes)
+        if sequence == 0:
+            return None
+
+        probe_result = {"is_online": bool(flags & 1),
+                        "rtt_ms": rtt_ms if (flags & 2) else None,
+                        "ttl": ttl if (flags & 4) else None}
+
+        return sequence, probe_result, checked_at_mono, checked_at_ems
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    # Watch localhost for a few seconds
+    ex_monitor = Host_Monitor("127.0.0.1", interval_ms=500)
+    ex_monitor.start()
+    for _ in range(5):
+        time.sleep(0.7)
+        print(ex_monitor.get_state())
+    ex_monitor.stop()
+
+    # Probe in a forked process, follow the results through shared memory in this one
+    import os
+    ex_shared_state = Shared_Probe_State()
+    monitor_pid = os.fork()
+    if monitor_pid == 0:
+        child_monitor = Host_Monitor("127.0.0.1", interval_ms=500)
+        child_monitor.add_listener(ex_shared_state.write)
+        threading.Timer(2.0, child_monitor.stop).start()
+        child_monitor.run()
+        os._exit(0)
+
+    ex_follower = Shared_Host_Monitor(ex_shared_state, "127.0.0.1", interval_ms=500)
+    ex_follower.add_listener(lambda probe_result: print("  New shared result:", probe_result))
+    ex_follower.start()
+    os.waitpid(monitor_pid, 0)
+    ex_follower.stop()
+    print("Shared state:", ex_follower.get_state())
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
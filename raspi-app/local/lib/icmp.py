@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import itertools
+import select
+import socket
+import struct
+import threading
+import time
+
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% ICMP helpers
+
+# .....................................................................................................................
+
+def _checksum(data):
+    '''Internet checksum (RFC 1071) of the given bytes'''
+
+    # Pad to an even length so we can sum 16-bit words
+    if len(data) % 2:
+        data += b"\x00"
+
+    total = sum(struct.unpack("!{}H".format(len(data) // 2), data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += (total >> 16)
+
+    return ~total & 0xFFFF
+
+# .....................................................................................................................
+
+def _build_echo_request(identifier, sequence, payload):
+    '''Builds an ICMP echo request packet (type 8, code 0) with a valid checksum'''
+
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    checksum = _checksum(header + payload)
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence)
+
+    return header + payload
+
+# .....................................................................................................................
+
+def _open_icmp_socket():
+    '''
+    Opens an ICMP socket, preferring unprivileged datagram sockets and falling back to raw sockets.
+    Returns: (socket, is_raw)
+
+    Raises PermissionError if neither socket type can be opened.
+    Datagram sockets need the gid of the process to be inside net.ipv4.ping_group_range,
+    raw sockets need root (or CAP_NET_RAW)
+    '''
+
+    global _SOCKET_MODE
+
+    # Try whichever mode worked last time first, so we don't pay for a failed socket() call on every probe
+    mode_order = ("dgram", "raw") if _SOCKET_MODE != "raw" else ("raw",)
+    for each_mode in mode_order:
+        sock_type = socket.SOCK_DGRAM if each_mode == "dgram" else socket.SOCK_RAW
+        try:
+            sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+        except (PermissionError, OSError):
+            continue
+
+        _SOCKET_MODE = each_mode
+        is_raw = (each_mode == "raw")
+
+        # Ask the kernel to hand us the reply TTL (raw sockets get it from the IP header instead)
+        if not is_raw:
+            try:
+                sock.setsockopt(socket.IPPROTO_IP, IP_RECVTTL, 1)
+            except OSError:
+                pass
+
+        return sock, is_raw
+
+    raise PermissionError("Cannot open ICMP datagram or raw socket (check net.ipv4.ping_group_range or run as root)")
+
+# .....................................................................................................................
+
+def _parse_reply(packet, ancillary_data, is_raw):
+    '''
+    Splits a received packet into (icmp_bytes, ttl).
+    Raw sockets deliver the IP header as well, datagram sockets only deliver the ICMP message
+    '''
+
+    ttl = None
+    if is_raw:
+        ip_header_length = (packet[0] & 0x0F) * 4
+        ttl = packet[8]
+        return packet[ip_header_length:], ttl
+
+    for cmsg_level, cmsg_type, cmsg_data in ancillary_data:
+        if cmsg_level == socket.IPPROTO_IP and cmsg_type == socket.IP_TTL and len(cmsg_data) >= 4:
+            ttl = struct.unpack("i", cmsg_data[:4])[0]
+
+    return packet, ttl
+
+# .....................................................................................................................
+
+def _next_sequence():
+    '''Thread-safe 16-bit sequence counter, so concurrent probes never share a sequence number'''
+
+    with _SEQUENCE_LOCK:
+        return next(_SEQUENCE_COUNTER) & 0xFFFF
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% ICMP functions
+
+# .....................................................................................................................
+
+def resolve_host(host, timeout_sec, family=socket.AF_UNSPEC):
+    '''
+    Looks up the address of a host, giving up once timeout_sec runs out. The system resolver can't be
+    interrupted, so name lookups run in a (daemon) thread that is left to finish on its own after a timeout.
+    Address strings (e.g. "192.168.0.10") are returned right away, without a thread.
+    Returns (address family, address) or None if the host can't be resolved in time
+    '''
+
+    # Address strings don't need a lookup
+    try:
+        address_info = socket.getaddrinfo(host, None, family, socket.SOCK_STREAM, 0, socket.AI_NUMERICHOST)
+        return address_info[0][0], address_info[0][4][0]
+    except (socket.gaierror, UnicodeError):
+        pass
+
+    lookup_future = Future()
+    def lookup_in_background():
+        try:
+            address_info = socket.getaddrinfo(host, None, family, socket.SOCK_STREAM)
+            lookup_future.set_result((address_info[0][0], address_info[0][4][0]))
+        except (socket.gaierror, UnicodeError):
+            lookup_future.set_result(None)
+    threading.Thread(target=lookup_in_background, name="resolve-host", daemon=True).start()
+
+    try:
+        return lookup_future.result(max(0, timeout_sec))
+    except FuturesTimeoutError:
+        return None
+
+# .....................................................................................................................
+
+def icmp_echo(host, timeout_ms=100, payload_size=16):
+    '''
+    Sends a single ICMP echo request to host (IPv4) and waits for the matching reply, in-process.
+    The timeout is a hard deadline in milliseconds, covering the host name lookup, the send and the wait for a reply.
+
+    Returns a dictionary:
+        {"is_online": bool, "rtt_ms": float | None, "ttl": int | None}
+
+    Raises PermissionError if ICMP sockets aren't available on this system
+    '''
+
+    # For clarity
+    deadline = time.monotonic() + (timeout_ms / 1000.0)
+    result = {"is_online": False, "rtt_ms": None, "ttl": None}
+
+    # Resolve the host up front, within the deadline (no-op for IP address strings)
+    resolved = resolve_host(host, deadline - time.monotonic(), socket.AF_INET)
+    if resolved is None:
+        return result
+    _, host_ip = resolved
+
+    sock, is_raw = _open_icmp_socket()
+    try:
+        sock.setblocking(False)
+
+        # Build the request. Datagram sockets have their identifier rewritten by the kernel (and filtered for us),
+        # so we also match on sequence + payload to be sure we're looking at our own reply
+        identifier = os.getpid() & 0xFFFF
+        sequence = _next_sequence()
+        payload = os.urandom(payload_size)
+        packet = _build_echo_request(identifier, sequence, payload)
+
+        send_time = time.perf_counter()
+        sock.sendto(packet, (host_ip, 0))
+
+        while True:
+            remaining_sec = deadline - time.monotonic()
+            if remaining_sec <= 0:
+                break
+
+            readable, _, _ = select.select([sock], [], [], remaining_sec)
+            if not readable:
+                break
+
+            try:
+                reply, ancillary_data, _, (reply_ip, _) = sock.recvmsg(RECV_BUFFER_SIZE, ANCILLARY_BUFFER_SIZE)
+            except BlockingIOError:
+                continue
+            recv_time = time.perf_counter()
+
+            # Raw sockets see every ICMP packet on the machine, so skip anything that isn't our echo reply
+            icmp_bytes, ttl = _parse_reply(reply, ancillary_data, is_raw)
+            if len(icmp_bytes) < 8 or reply_ip != host_ip:
+                continue
+            reply_type, _, _, reply_id, reply_seq = struct.unpack("!BBHHH", icmp_bytes[:8])
+            if reply_type != ICMP_ECHO_REPLY or reply_seq != sequence or icmp_bytes[8:] != payload:
+                continue
+            if is_raw and reply_id != identifier:
+                continue
+
+            result["is_online"] = True
+            result["rtt_ms"] = round(1000 * (recv_time - send_time), 3)
+            result["ttl"] = ttl
+            break
+
+    except OSError:
+        # e.g. network unreachable, treat as offline
+        pass
+
+    finally:
+        sock.close()
+
+    return result
+
+# .....................................................................................................................
+
+def icmp_available():
+    '''Returns True if this process is able to open an ICMP socket (datagram or raw)'''
+
+    try:
+        sock, _ = _open_icmp_socket()
+        sock.close()
+    except PermissionError:
+        return False
+
+    return True
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# Not exposed by the socket module on all python versions (value is from linux/in.h)
+IP_RECVTTL = getattr(socket, "IP_RECVTTL", 12)
+
+RECV_BUFFER_SIZE = 1024
+ANCILLARY_BUFFER_SIZE = socket.CMSG_SPACE(struct.calcsize("i"))
+
+# Remember which socket type works, so we don't retry failed socket types on every probe
+_SOCKET_MODE = None
+
+_SEQUENCE_LOCK = threading.Lock()
+_SEQUENCE_COUNTER = itertools.count(int(time.time()) & 0xFFFF)
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    # Quick check against localhost, should be online with a small rtt
+    print("", "ICMP sockets available:", icmp_available(), sep="\n")
+    for each_timeout_ms in (1, 100, 1000):
+        print("127.0.0.1 @ {} ms:".format(each_timeout_ms), icmp_echo("127.0.0.1", each_timeout_ms))
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
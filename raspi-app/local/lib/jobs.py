@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+from contextlib import nullcontext
+
+from local.lib.shared_files import File_Lock, save_json, load_json, is_process_alive
+from local.lib.timekeeper_utils import get_current_ems
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Background_Job:
+
+    ''' Holds the state of a single function call being run in a background thread '''
+
+    # .................................................................................................................
+
+    def __init__(self, job_key, func, args, kwargs, state_path=None):
+
+        self.job_id = uuid.uuid4().hex
+        self.job_key = job_key
+        self.state_path = state_path
+
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+        self.status = "pending"
+        self.result = None
+        self.error = None
+        self.submitted_ems = get_current_ems()
+        self.started_ems = None
+        self.finished_ems = None
+        self.finished_mono = None
+
+        self._done_event = threading.Event()
+
+    # .................................................................................................................
+
+    def run(self):
+
+        self.status = "running"
+        self.started_ems = get_current_ems()
+        self.save_state()
+        try:
+            self.result = self._func(*self._args, **self._kwargs)
+            self.status = "done"
+        except Exception as err:
+            self.error = str(err)
+            self.status = "error"
+
+        self.finished_ems = get_current_ems()
+        self.finished_mono = time.monotonic()
+        self._done_event.set()
+        self.save_state()
+
+    # .................................................................................................................
+
+    def save_state(self):
+
+        ''' Writes the job info to the state file (if there is one), so other server processes can read it '''
+
+        if self.state_path is None:
+            return
+
+        # Record which process runs the job, so others can tell if it was lost (i.e. the process died)
+        try:
+            save_json(self.state_path, {**self.to_dict(), "owner_pid": os.getpid()})
+        except (OSError, TypeError, ValueError) as err:
+            print("", "Error saving job state ({}):".format(self.job_id), "  {}".format(err), sep="\n")
+
+    # .................................................................................................................
+
+    def is_finished(self):
+        return self._done_event.is_set()
+
+    # .................................................................................................................
+
+    def wait(self, timeout_sec=None):
+
+        ''' Blocks until the job finishes (or the timeout runs out). Returns True if the job is finished '''
+
+        return self._done_event.wait(timeout_sec)
+
+    # .................................................................................................................
+
+    def to_dict(self):
+
+        duration_ms = None
+        if self.is_finished():
+            duration_ms = self.finished_ems - self.started_ems
+
+        return {"job_id": self.job_id,
+                "status": self.status,
+                "submitted_ems": self.submitted_ems,
+                "started_ems": self.started_ems,
+                "finished_ems": self.finished_ems,
+                "duration_ms": duration_ms,
+                "result": self.result,
+                "error": self.error}
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Stored_Job:
+
+    '''
+    Read-only view of a job that's running (or ran) in another server process, through its state file.
+    Has the same interface as a Background_Job, as far as routes are concerned
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, job_id, state_path):
+        self.job_id = job_id
+        self.state_path = state_path
+
+    # .................................................................................................................
+
+    def is_finished(self):
+        return self.to_dict()["status"] in {"done", "error"}
+
+    # .................................................................................................................
+
+    def wait(self, timeout_sec=None, poll_sec=0.1):
+
+        ''' Blocks until the job finishes (or the timeout runs out). Returns True if the job is finished '''
+
+        deadline = None if timeout_sec is None else (time.monotonic() + timeout_sec)
+        while not self.is_finished():
+            if (deadline is not None) and (time.monotonic() >= deadline):
+                return False
+            time.sleep(poll_sec)
+
+        return True
+
+    # .................................................................................................................
+
+    def to_dict(self):
+
+        # The file may be gone if the job expired in the other process, so report it as an error
+        job_dict = load_json(self.state_path)
+        if job_dict is None:
+            return self._error_dict("job info is no longer available")
+
+        # Jobs run in threads of the process that started them, so they're lost if that process dies
+        owner_pid = job_dict.pop("owner_pid", None)
+        is_running = job_dict["status"] not in {"done", "error"}
+        if is_running and (owner_pid is not None) and not is_process_alive(owner_pid):
+            return self._error_dict("job was lost (the server process running it exited)", job_dict)
+
+        return job_dict
+
+    # .................................................................................................................
+
+    def _error_dict(self, error_msg, job_dict=None):
+        blank_dict = {"submitted_ems": None, "started_ems": None, "finished_ems": None}
+        return {**blank_dict, **(job_dict or {}),
+                "job_id": self.job_id, "status": "error", "error": error_msg, "duration_ms": None, "result": None}
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Job_Manager:
+
+    '''
+    Runs slow functions as background jobs, so that routes can return a job id right away.
+    Jobs are identified by a key (e.g. ("nmap", host)): at most one job per key runs at a time
+    and finished results are re-used for result_ttl_sec before a new job is started.
+    Failed jobs can still be polled, but are never re-used, so a new submit tries again right away.
+    If a shared folder is given, job info is also written to (json) files there, so that jobs can be polled
+    from any server process (when several processes serve requests, see prefork.py). Submits then take a
+    lock (file) per job key, so the one-job-per-key rule holds across every process sharing the folder
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, result_ttl_sec=300, max_finished_jobs=100, shared_folder_path=None):
+
+        self.result_ttl_sec = result_ttl_sec
+        self.max_finished_jobs = max_finished_jobs
+        self.shared_folder_path = shared_folder_path
+
+        self._lock = threading.Lock()
+        self._jobs_by_id = {}
+        self._latest_id_by_key = {}
+
+    # .................................................................................................................
+
+    def submit(self, job_key, func, *args, force_new=False, **kwargs):
+
+        '''
+        Submits func(*args, **kwargs) to run in the background, unless a job with the same key
+        is already running, or finished recently enough (unless force_new is set). Returns the job
+        '''
+
+        with self._lock, self._get_key_lock(job_key):
+            self._prune_expired()
+
+            # Re-use the existing job for this key if there is one that's still useful
+            existing_job = self._get_latest_job(job_key)
+            if existing_job is not None:
+                if not existing_job.is_finished():
+                    return existing_job
+                if self._is_reusable(existing_job) and not force_new:
+                    return existing_job
+
+            new_job = Background_Job(job_key, func, args, kwargs)
+            new_job.state_path = self._get_state_path(new_job.job_id)
+            new_job.save_state()
+            self._jobs_by_id[new_job.job_id] = new_job
+            self._latest_id_by_key[job_key] = new_job.job_id
+            if self.shared_folder_path is not None:
+                save_json(self._get_key_path(job_key, ".json"), new_job.job_id)
+
+        job_thread = threading.Thread(target=new_job.run, name="job-{}".format(new_job.job_id[:8]), daemon=True)
+        job_thread.start()
+
+        return new_job
+
+    # .................................................................................................................
+
+    def get_job(self, job_id):
+
+        ''' Returns the job with the given id, or None if it doesn't exist (or has expired) '''
+
+        with self._lock:
+            self._prune_expired()
+            job = self._jobs_by_id.get(job_id)
+
+        # Fall back to jobs submitted in other processes
+        state_path = self._get_state_path(job_id)
+        if (job is not None) or (state_path is None) or (not job_id.isalnum()) or (not os.path.exists(state_path)):
+            return job
+
+        stored_job = Stored_Job(job_id, state_path)
+        if self._is_expired(stored_job):
+            return None
+
+        return stored_job
+
+    # .................................................................................................................
+
+    def _get_latest_job(self, job_key):
+
+        ''' Returns the latest job for a key, which may have been submitted by another process (when shared) '''
+
+        if self.shared_folder_path is None:
+            return self._jobs_by_id.get(self._latest_id_by_key.get(job_key))
+
+        job_id = load_json(self._get_key_path(job_key, ".json"))
+        if job_id is None:
+            return None
+
+        job = self._jobs_by_id.get(job_id)
+        state_path = self._get_state_path(job_id)
+        if job is None and os.path.exists(state_path):
+            job = Stored_Job(job_id, state_path)
+
+        return job
+
+    # .................................................................................................................
+
+    def _get_state_path(self, job_id):
+        if self.shared_folder_path is None:
+            return None
+        return os.path.join(self.shared_folder_path, "{}.json".format(job_id))
+
+    # .................................................................................................................
+
+    def _get_key_path(self, job_key, file_ext):
+
+        # Job keys can hold anything (e.g. host names), so files are named by a hash of the key
+        key_hash = hashlib.sha1(repr(job_key).encode("utf-8")).hexdigest()
+        return os.path.join(self.shared_folder_path, "key-{}{}".format(key_hash, file_ext))
+
+    # .................................................................................................................
+
+    def _get_key_lock(self, job_key):
+
+        # Only needed when sharing jobs with other processes, otherwise the (thread) lock is enough
+        if self.shared_folder_path is None:
+            return nullcontext()
+        return File_Lock(self._get_key_path(job_key, ".lock"))
+
+    # .................................................................................................................
+
+    def _is_reusable(self, job):
+
+        # Only successful results are re-used, so failures are retried on the next submit
+        if isinstance(job, Stored_Job):
+            return (job.to_dict()["status"] == "done") and not self._is_expired(job)
+        return (job.status == "done") and not self._is_expired(job)
+
+    # .................................................................................................................
+
+    def _is_expired(self, job):
+
+        # Jobs from other processes only have a (wall clock) finish time to go by
+        if isinstance(job, Stored_Job):
+            finished_ems = job.to_dict()["finished_ems"]
+            return (finished_ems is not None) and ((get_current_ems() - finished_ems) > (1000 * self.result_ttl_sec))
+
+        return job.is_finished() and ((time.monotonic() - job.finished_mono) > self.result_ttl_sec)
+
+    # .................................................................................................................
+
+    def _prune_expired(self):
+
+        # Drop expired jobs, as well as the oldest finished jobs if we're holding too many
+        finished_jobs = [each_job for each_job in self._jobs_by_id.values() if each_job.is_finished()]
+        finished_jobs.sort(key=lambda each_job: each_job.finished_mono)
+        num_over_limit = max(0, len(finished_jobs) - self.max_finished_jobs)
+        for idx, each_job in enumerate(finished_jobs):
+            if (idx < num_over_limit) or self._is_expired(each_job):
+                del self._jobs_by_id[each_job.job_id]
+                if each_job.state_path is not None and os.path.exists(each_job.state_path):
+                    os.remove(each_job.state_path)
+                if self._latest_id_by_key.get(each_job.job_key) == each_job.job_id:
+                    del self._latest_id_by_key[each_job.job_key]
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    def slow_square(value):
+        time.sleep(1)
+        return value ** 2
+
+    # Submitting the same key twice should give back the same job
+    ex_manager = Job_Manager(result_ttl_sec=5)
+    job_a = ex_manager.submit(("square", 3), slow_square, 3)
+    job_b = ex_manager.submit(("square", 3), slow_square, 3)
+    print("Same job:", job_a is job_b)
+    job_a.wait(2)
+    print(job_a.to_dict())
+
+    # Jobs can be read from another manager (e.g. in another process) through a shared folder
+    import tempfile
+    with tempfile.TemporaryDirectory() as shared_folder_path:
+        manager_a = Job_Manager(shared_folder_path=shared_folder_path)
+        manager_b = Job_Manager(shared_folder_path=shared_folder_path)
+        job_c = manager_a.submit(("square", 4), slow_square, 4)
+        stored_job_c = manager_b.get_job(job_c.job_id)
+        print("Stored job:", stored_job_c.to_dict()["status"], "->", stored_job_c.wait(2), stored_job_c.to_dict())
+
+        # Submitting from another process re-uses the job that's already running there
+        job_d = manager_a.submit(("square", 5), slow_square, 5)
+        if os.fork() == 0:
+            other_job = Job_Manager(shared_folder_path=shared_folder_path).submit(("square", 5), slow_square, 5)
+            print("Re-used from other process:", other_job.job_id == job_d.job_id)
+            os._exit(0)
+        os.wait()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
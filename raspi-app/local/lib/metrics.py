@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import glob
+import os
+import threading
+import time
+
+from bisect import bisect_left
+
+from local.lib.shared_files import save_json, load_json, is_process_alive
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Metrics_Registry:
+
+    '''
+    Collects counters, histograms & gauges, and exports them in the Prometheus text format.
+    Recording never takes a lock: each thread records into its own 'shard' of values, and shards are only
+    combined when the metrics are rendered (shards of threads that have finished are folded into a single
+    'retired' shard at that point, so short-lived threads don't pile up).
+    When the server runs as several processes, each process can share its values through a folder
+    (see share_across_processes), so that every process renders the combined metrics
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self):
+
+        # Storage for metric descriptions, as: {name: (type, help, buckets)}
+        self._descriptions = {}
+        self._callbacks = {}
+
+        # Per-thread storage of recorded values, see _get_shard()
+        self._local = threading.local()
+        self._shards_lock = threading.Lock()
+        self._live_shards = []
+        self._retired_shard = _Metrics_Shard()
+
+        # Folder used to share values with other processes, if any
+        self._shared_folder_path = None
+
+    # .................................................................................................................
+
+    def describe(self, name, metric_type, help_str, buckets=None):
+
+        '''
+        Registers a metric name with its type ("counter", "histogram" or "gauge") & description.
+        Gauges registered this way hold the largest value seen (see set_max), other gauges can be added
+        using add_callback(...)
+        Histograms use the given (sorted) bucket upper bounds, or DEFAULT_BUCKETS_SEC
+        '''
+
+        if metric_type == "histogram":
+            buckets = tuple(DEFAULT_BUCKETS_SEC if buckets is None else sorted(buckets))
+        self._descriptions[name] = (metric_type, help_str, buckets)
+
+    # .................................................................................................................
+
+    def add_callback(self, name, help_str, value_func, metric_type="gauge", merge="sum"):
+
+        '''
+        Registers a metric whose value is read (by calling value_func) when the metrics are rendered.
+        The function should return a number, or a dictionary of {labels dict as a tuple of items: number}
+        Values from different processes are added together, unless merge is "max"
+        (e.g. for values that every process reads from the same shared state)
+        '''
+
+        self._callbacks[name] = (metric_type, help_str, value_func, merge)
+
+    # .................................................................................................................
+
+    def inc(self, name, value=1, **labels):
+
+        ''' Adds to a counter (must be described first) '''
+
+        counters = self._get_shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    # .................................................................................................................
+
+    def observe(self, name, value, **labels):
+
+        ''' Records a value (e.g. a duration in seconds) into a histogram (must be described first) '''
+
+        buckets = self._descriptions[name][2]
+        histograms = self._get_shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+
+        # Stored as: [count in bucket 0, count in bucket 1, ..., count above last bucket, sum of values]
+        hist_list = histograms.get(key)
+        if hist_list is None:
+            hist_list = histograms[key] = [0] * (len(buckets) + 2)
+        hist_list[bisect_left(buckets, value)] += 1
+        hist_list[-1] += value
+
+    # .................................................................................................................
+
+    def set_max(self, name, value, **labels):
+
+        ''' Updates a gauge that tracks the largest value seen (must be described first) '''
+
+        maxima = self._get_shard().maxima
+        key = (name, tuple(sorted(labels.items())))
+        maxima[key] = max(maxima.get(key, value), value)
+
+    # .................................................................................................................
+
+    def record_subprocess(self, command_name, duration_sec=None, outcome="ok", cpu_sec=None, max_rss_kb=None):
+
+        '''
+        Counts a subprocess call & records how long it took, how much cpu time it used & its peak memory use.
+        Matches the listener format of the process executor, see executor.set_process_listener(...).
+        Long-running processes (e.g. co-processes that are re-used across calls) are counted when they
+        are spawned, without a duration
+        '''
+
+        self.inc("subprocess_calls_total", command=command_name, outcome=outcome)
+        if duration_sec is not None:
+            self.observe("subprocess_duration_seconds", duration_sec, command=command_name, outcome=outcome)
+        if cpu_sec is not None:
+            self.inc("subprocess_cpu_seconds_total", cpu_sec, command=command_name)
+        if max_rss_kb is not None:
+            self.set_max("subprocess_max_rss_bytes", 1024 * max_rss_kb, command=command_name)
+
+    # .................................................................................................................
+
+    def instrument_flask(self, wsgi_app):
+
+        ''' Records the duration of every request handled by a flask app, by route (not url!), method & status '''
+
+        from flask import g, request
+
+        @wsgi_app.before_request
+        def start_request_timer():
+            g.metrics_start_time = time.perf_counter()
+
+        @wsgi_app.after_request
+        def record_request_time(response):
+            start_time = getattr(g, "metrics_start_time", None)
+            if start_time is not None:
+                route_str = request.url_rule.rule if request.url_rule is not None else "unmatched"
+                self.observe("http_request_duration_seconds", time.perf_counter() - start_time,
+                             route=route_str, method=request.method, status=str(response.status_code))
+            return response
+
+        return wsgi_app
+
+    # .................................................................................................................
+
+    def add_waitress_gauges(self, task_dispatcher):
+
+        '''
+        Adds gauges for the waitress task queue (requests waiting for a thread) & busy threads.
+        Values are read without locking, since they're only used for monitoring
+        '''
+
+        self.add_callback("waitress_queue_depth", "Requests waiting for a free waitress thread",
+                          lambda: len(task_dispatcher.queue))
+        self.add_callback("waitress_active_threads", "Waitress threads currently handling a request",
+                          lambda: task_dispatcher.active_count)
+        self.add_callback("waitress_threads", "Waitress threads in total",
+                          lambda: len(task_dispatcher.threads))
+
+    # .................................................................................................................
+
+    def share_across_processes(self, shared_folder_path, interval_sec=5):
+
+        '''
+        Saves this process' values to the shared folder every so often (from a background thread),
+        and includes the values saved by other processes when rendering. Values of processes that have exited
+        are kept (except for gauges), so counters don't go backwards when a worker is replaced.
+        Values recorded before this is called are dropped, since a forked process would otherwise
+        count the values it inherited from its parent a second time
+        '''
+
+        with self._shards_lock:
+            self._local = threading.local()
+            self._live_shards = []
+            self._retired_shard = _Metrics_Shard()
+
+        self._shared_folder_path = shared_folder_path
+        own_path = os.path.join(shared_folder_path, "metrics-{}.json".format(os.getpid()))
+
+        def save_periodically():
+            while True:
+                try:
+                    save_json(own_path, _snapshot_to_json(self.get_snapshot()))
+                except (OSError, TypeError, ValueError) as err:
+                    print("", "Error saving metrics:", "  {}".format(err), sep="\n")
+                time.sleep(interval_sec)
+
+        threading.Thread(target=save_periodically, name="metrics-sharing", daemon=True).start()
+
+    # .................................................................................................................
+
+    def get_snapshot(self):
+
+        '''
+        Returns the current values of every metric (including callbacks) in this process, as:
+            {name: {"type": str, "help": str, "buckets": tuple, "merge": str, "values": {labels: value}}}
+        '''
+
+        values_by_type = self._collect()
+
+        snapshot = {}
+        for each_name, (each_type, each_help, each_buckets) in self._descriptions.items():
+            snapshot[each_name] = {"type": each_type, "help": each_help, "buckets": each_buckets,
+                                   "merge": "max" if each_type == "gauge" else "sum",
+                                   "values": values_by_type[each_type].get(each_name, {})}
+
+        for each_name, (each_type, each_help, each_func, each_merge) in self._callbacks.items():
+            try:
+                values = each_func()
+            except Exception:
+                values = {}
+            if not isinstance(values, dict):
+                values = {(): values}
+            snapshot[each_name] = {"type": each_type, "help": each_help, "buckets": None,
+                                   "merge": each_merge, "values": values}
+
+        return snapshot
+
+    # .................................................................................................................
+
+    def render(self):
+
+        ''' Returns all metrics as a string, in the Prometheus text exposition format (version 0.0.4) '''
+
+        snapshot = self.get_snapshot()
+        for each_other_snapshot in self._load_other_snapshots():
+            _merge_snapshot(snapshot, each_other_snapshot)
+
+        # Described metrics are listed first, then callbacks
+        described_names = sorted(name for name in snapshot if name in self._descriptions)
+        callback_names = sorted(name for name in snapshot if name not in self._descriptions)
+
+        lines_list = []
+        for each_name in described_names + callback_names:
+            each_entry = snapshot[each_name]
+            each_type = each_entry["type"]
+            lines_list += ["# HELP {} {}".format(each_name, each_entry["help"]),
+                           "# TYPE {} {}".format(each_name, each_type)]
+
+            for each_labels, each_value in sorted(each_entry["values"].items()):
+                if each_type == "histogram":
+                    lines_list += _format_histogram(each_name, each_labels, each_entry["buckets"], each_value)
+                else:
+                    lines_list.append(_format_sample(each_name, each_labels, each_value))
+
+        return "\n".join(lines_list) + "\n"
+
+    # .................................................................................................................
+
+    def _load_other_snapshots(self):
+
+        ''' Returns the values saved by other processes (see share_across_processes), if sharing is enabled '''
+
+        if self._shared_folder_path is None:
+            return []
+
+        snapshots_list = []
+        own_pid = os.getpid()
+        for each_path in glob.glob(os.path.join(self._shared_folder_path, "metrics-*.json")):
+            try:
+                each_pid = int(os.path.basename(each_path)[len("metrics-"):-len(".json")])
+            except ValueError:
+                continue
+            if each_pid == own_pid:
+                continue
+
+            snapshot_json = load_json(each_path)
+            if snapshot_json is None:
+                continue
+
+            # Gauges describe what a process is doing right now, so they don't count once it's gone
+            each_snapshot = _snapshot_from_json(snapshot_json)
+            if not is_process_alive(each_pid):
+                each_snapshot = {each_name: each_entry for each_name, each_entry in each_snapshot.items()
+                                 if each_entry["type"] != "gauge"}
+            snapshots_list.append(each_snapshot)
+
+        return snapshots_list
+
+    # .................................................................................................................
+
+    def _get_shard(self):
+
+        ''' Returns the storage for values recorded by the current thread (creating it on first use) '''
+
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Metrics_Shard()
+            with self._shards_lock:
+                self._live_shards.append((threading.current_thread(), shard))
+
+        return shard
+
+    # .................................................................................................................
+
+    def _collect(self):
+
+        '''
+        Combines the values recorded by all threads, grouped for rendering, as:
+            {"counter" | "histogram" | "gauge": {name: {labels: value}}}
+        '''
+
+        with self._shards_lock:
+
+            # Threads that have finished can't record anything else, so fold them into one shard
+            live_shards = []
+            for each_thread, each_shard in self._live_shards:
+                if each_thread.is_alive():
+                    live_shards.append((each_thread, each_shard))
+                else:
+                    _merge_shard(self._retired_shard, each_shard)
+            self._live_shards = live_shards
+
+            total_shard = _Metrics_Shard()
+            _merge_shard(total_shard, self._retired_shard)
+            for _, each_shard in live_shards:
+                _merge_shard(total_shard, each_shard)
+
+        values_by_type = {"counter": {}, "histogram": {}, "gauge": {}}
+        for each_type, each_values_dict in (("counter", total_shard.counters),
+                                            ("histogram", total_shard.histograms),
+                                            ("gauge", total_shard.maxima)):
+            for (each_name, each_labels), each_value in each_values_dict.items():
+                values_by_type[each_type].setdefault(each_name, {})[each_labels] = each_value
+
+        return values_by_type
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class _Metrics_Shard:
+
+    ''' Values recorded by a single thread. Only the owning thread writes to it, so no locking is needed '''
+
+    # .................................................................................................................
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.maxima = {}
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def _merge_shard(total_shard, shard):
+
+    ''' Adds the values recorded in a shard to the totals (another shard) '''
+
+    # Copy (atomically, thanks to the GIL) before reading, since the owning thread may be adding new keys
+    counters = total_shard.counters
+    for each_key, each_value in shard.counters.copy().items():
+        counters[each_key] = counters.get(each_key, 0) + each_value
+
+    histograms = total_shard.histograms
+    for each_key, each_hist_list in shard.histograms.copy().items():
+        total_list = histograms.get(each_key)
+        if total_list is None:
+            histograms[each_key] = list(each_hist_list)
+        else:
+            histograms[each_key] = [each_total + each_count
+                                    for each_total, each_count in zip(total_list, each_hist_list)]
+
+    maxima = total_shard.maxima
+    for each_key, each_value in shard.maxima.copy().items():
+        maxima[each_key] = max(maxima.get(each_key, each_value), each_value)
+
+# .....................................................................................................................
+
+def _merge_snapshot(total_snapshot, snapshot):
+
+    ''' Adds the values from another process' snapshot to the totals (another snapshot) '''
+
+    for each_name, each_entry in snapshot.items():
+
+        total_entry = total_snapshot.get(each_name)
+        if total_entry is None:
+            total_snapshot[each_name] = each_entry
+            continue
+
+        total_values = total_entry["values"]
+        for each_labels, each_value in each_entry["values"].items():
+            total_value = total_values.get(each_labels)
+            if total_value is None:
+                total_values[each_labels] = each_value
+            elif total_entry["type"] == "histogram":
+                total_values[each_labels] = [each_total + each_count
+                                             for each_total, each_count in zip(total_value, each_value)]
+            elif total_entry["merge"] == "max":
+                total_values[each_labels] = max(total_value, each_value)
+            else:
+                total_values[each_labels] = total_value + each_value
+
+# .....................................................................................................................
+
+def _snapshot_to_json(snapshot):
+
+    # Labels are stored as tuples of (key, value) pairs, which need to be lists (not dictionary keys) in json
+    return {each_name: {**each_entry, "values": [[each_labels, each_value]
+                                                 for each_labels, each_value in each_entry["values"].items()]}
+            for each_name, each_entry in snapshot.items()}
+
+# .....................................................................................................................
+
+def _snapshot_from_json(snapshot_json):
+
+    snapshot = {}
+    for each_name, each_entry in snapshot_json.items():
+        values_dict = {tuple(tuple(each_pair) for each_pair in each_labels): each_value
+                       for each_labels, each_value in each_entry["values"]}
+        buckets = tuple(each_entry["buckets"]) if each_entry["buckets"] is not None else None
+        snapshot[each_name] = {**each_entry, "buckets": buckets, "values": values_dict}
+
+    return snapshot
+
+# .....................................................................................................................
+
+def _format_labels(labels, extra_label=None):
+
+    labels_list = list(labels) if extra_label is None else [*labels, extra_label]
+    if not labels_list:
+        return ""
+
+    escape = lambda value: str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return "{" + ",".join("{}=\"{}\"".format(each_key, escape(each_value)) for each_key, each_value in labels_list) + "}"
+
+# .....................................................................................................................
+
+def _format_sample(name, labels, value):
+    return "{}{} {}".format(name, _format_labels(labels), _format_number(value))
+
+# .....................................................................................................................
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+# .....................................................................................................................
+
+def _format_histogram(name, labels, buckets, hist_list):
+
+    ''' Formats a histogram into its bucket (cumulative), sum & count lines '''
+
+    lines_list = []
+    cumulative_count = 0
+    for each_bound, each_count in zip((*buckets, "+Inf"), hist_list[:-1]):
+        cumulative_count += each_count
+        bound_str = each_bound if isinstance(each_bound, str) else _format_number(float(each_bound))
+        lines_list.append("{}_bucket{} {}".format(name, _format_labels(labels, ("le", bound_str)), cumulative_count))
+
+    lines_list.append("{}_sum{} {}".format(name, _format_labels(labels), _format_number(hist_list[-1])))
+    lines_list.append("{}_count{} {}".format(name, _format_labels(labels), cumulative_count))
+
+    return lines_list
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Bucket upper bounds (in seconds), covering fast cached responses up to slow scans
+DEFAULT_BUCKETS_SEC = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Shared registry, so any module can record into it (exported by the server at /metrics)
+METRICS = Metrics_Registry()
+METRICS.describe("http_request_duration_seconds", "histogram", "Time spent handling requests, by route & status")
+METRICS.describe("subprocess_calls_total", "counter", "Subprocesses spawned (ping, nmap, git, ssh etc.)")
+METRICS.describe("subprocess_duration_seconds", "histogram", "Time from spawning a subprocess until it finished")
+METRICS.describe("subprocess_cpu_seconds_total", "counter", "CPU time (user + system) used by subprocesses")
+METRICS.describe("subprocess_max_rss_bytes", "gauge", "Largest peak memory use (RSS) of a single subprocess")
+METRICS.add_callback("process_cpu_seconds_total", "CPU time (user + system) used by the server",
+                     time.process_time, metric_type="counter")
+METRICS.add_callback("process_threads", "Threads running in the server", threading.active_count)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    # Record from a few threads at once, then time how long recording takes
+    def record_many(num_records):
+        for idx in range(num_records):
+            METRICS.observe("http_request_duration_seconds", idx / 1e5, route="/demo", method="GET", status="200")
+
+    ex_threads = [threading.Thread(target=record_many, args=(10000,)) for _ in range(4)]
+    t1 = time.perf_counter()
+    for each_thread in ex_threads:
+        each_thread.start()
+    for each_thread in ex_threads:
+        each_thread.join()
+    t2 = time.perf_counter()
+
+    METRICS.record_subprocess("sleep", 0.01, "ok", cpu_sec=0.001, max_rss_kb=1024)
+
+    print(METRICS.render())
+    print("Recording: {:.2f} us per observation".format(1e6 * (t2 - t1) / 40000))
+
+    # Values recorded in another process are included once both processes share them
+    import tempfile
+    with tempfile.TemporaryDirectory() as ex_folder_path:
+        METRICS.share_across_processes(ex_folder_path)
+        METRICS.record_subprocess("sleep", 0.01, "ok")
+        if os.fork() == 0:
+            METRICS.share_across_processes(ex_folder_path, interval_sec=0.1)
+            METRICS.record_subprocess("sleep", 0.01, "ok")
+            time.sleep(0.5)
+            os._exit(0)
+        time.sleep(0.25)
+        print("", *[each_line for each_line in METRICS.render().splitlines()
+                    if each_line.startswith("subprocess_calls_total")], sep="\n")
+        os.wait()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
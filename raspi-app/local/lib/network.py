@@ -7,56 +7,23 @@ Created on Tue Jul 1 2021
 """
 
 
-# ---------------------------------------------------------------------------------------------------------------------
-#%% Add local path
-
-import os
-import sys
-
-def find_path_to_local(target_folder = "local"):
-    '''Finds the path to the local folder so that local imports work properly'''
-
-    # Skip path finding if we successfully import the dummy file
-    try:
-        from local.dummy import dummy_func
-        dummy_func()
-        return
-    except ImportError:
-        print("", "Couldn't find local directory!", "Searching for path...", sep="\n")
-
-    # Figure out where this file is located so we can work backwards to find the target folder
-    file_directory = os.path.dirname(os.path.abspath(__file__))
-    path_check = []
-
-    # Check parent directories to see if we hit the main project directory containing the target folder
-    prev_working_path = working_path = file_directory
-    while True:
-        # If we find the target folder in the given directory, add it to the python path (if it's not already there)
-        if target_folder in os.listdir(working_path):
-            if working_path not in sys.path:
-                tilde_swarm = "~"*(4 + len(working_path))
-                print("\n{0}\nPython path updated:\n  {1}\n{0}".format(tilde_swarm, working_path))
-                sys.path.append(working_path)
-            break
-
-        # Stop if we hit the filesystem root directory (parent directory isn't changing)
-        prev_working_path, working_path = working_path, os.path.dirname(working_path)
-        path_check.append(prev_working_path)
-        if prev_working_path == working_path:
-            print("\nTried paths:", *path_check, "", sep="\n  ")
-            raise ImportError("Can't find '{}' directory!".format(target_folder))
-
-find_path_to_local()
-
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Imports
 
+import math
 import platform
-import subprocess
+import threading
 
-import requests
+import xml.etree.ElementTree as ET
 
+from local.eolib.utils.executor import run_process, stream_process, Process_Output_Reader
 from local.lib.environment import get_remote_host, get_remote_web_port
+from local.lib.environment import get_upstream_connect_timeout_sec, get_upstream_read_timeout_sec
+from local.lib.environment import get_upstream_max_retries
+from local.lib.icmp import icmp_echo
+from local.lib.nmap_xml import parse_nmap_xml
+from local.lib.single_flight import SINGLE_FLIGHT
+from local.lib.upstream import Upstream_Client, is_connect_failure
 
 # .....................................................................................................................
 # .....................................................................................................................
@@ -64,37 +31,119 @@ from local.lib.environment import get_remote_host, get_remote_web_port
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Network functions
 
-def ping_machine(host, timeout=100):
+@SINGLE_FLIGHT.coalesce("probe_host")
+def probe_host(host, timeout=100):
     """
-    Returns True if host (str) responds to a ping request.
-    Remember that a host may not respond to a ping (ICMP) request even if the host name is valid.
+    Sends a single ping (ICMP echo) to host (str) and waits at most timeout (ms) for a reply.
+    Uses in-process ICMP sockets where possible, falling back to the system ping command otherwise.
+    Concurrent probes of the same host (with the same timeout) share a single ping & its result.
+
+    Returns a dictionary:
+        {"is_online": bool, "rtt_ms": float | None, "ttl": int | None}
     """
 
-    # Building the command. Ex: "ping -c 1 google.com"
-    command = ['ping', '-c', '1', '-w', str(round(timeout / 1000)), host]
+    global _ICMP_SOCKETS_UNAVAILABLE
 
+    if not _ICMP_SOCKETS_UNAVAILABLE:
+        try:
+            return icmp_echo(host, timeout)
+        except PermissionError:
+            # Only warn once, then stick to the slower fallback
+            print("", "Warning (probe_host):", "  Can't open ICMP sockets, falling back to ping command!", sep="\n")
+            _ICMP_SOCKETS_UNAVAILABLE = True
+
+    return _ping_command(host, timeout)
+
+# .....................................................................................................................
+
+def _ping_command(host, timeout=100):
+    """Fallback for probe_host, using the system ping command (forks a process per call!)"""
+
+    # Building the command. Ex: "ping -c 1 -w 1 google.com"
+    # -> ping only accepts whole seconds, so round up and let the executor timeout enforce the real deadline
+    deadline_sec = max(1, math.ceil(timeout / 1000))
+    command = ["ping", "-n", "-c", "1", "-w", str(deadline_sec), host]
+
+    result = {"is_online": False, "rtt_ms": None, "ttl": None}
     try:
-        is_online = subprocess.call(command, timeout=timeout / 1000) == 0
-    except subprocess.TimeoutExpired:
-        is_online = False
+        ping_result = run_process(command, "ping", timeout / 1000, max_output_bytes=4096)
+        result["is_online"] = (ping_result["returncode"] == 0)
+
+        # Pull rtt & ttl out of the reply line if we can. Ex: "64 bytes from ...: icmp_seq=1 ttl=64 time=0.045 ms"
+        for each_field in ping_result["stdout"].decode("utf-8", errors="replace").split():
+            if each_field.startswith("ttl="):
+                result["ttl"] = int(each_field[4:])
+            elif each_field.startswith("time="):
+                result["rtt_ms"] = float(each_field[5:])
+
+    except (FileNotFoundError, ValueError):
+        pass
+
+    return result
+
+# .....................................................................................................................
+
+def ping_machine(host, timeout=100):
+    """
+    Returns True if host (str) responds to a ping request within timeout (ms).
+    Remember that a host may not respond to a ping (ICMP) request even if the host name is valid.
+    """
 
-    return is_online
+    return probe_host(host, timeout)["is_online"]
 
 # .....................................................................................................................
 
+@SINGLE_FLIGHT.coalesce("nmap_host_info")
 def nmap_host_info(host):
+    """
+    Runs an nmap OS + service version scan on host (str). Takes 10-60 seconds!
+    Concurrent scans of the same host share a single nmap run & its result.
+    The XML output is parsed as nmap writes it, see nmap_xml.parse_nmap_xml(...) for the result format
+    """
+
     if platform.system().lower()=='windows':
         return {"error": "cannot run nmap on windows"}
-    else:
-        command = ["nmap", "-O", "-sV", host]
 
-        result = subprocess.run(command, capture_output=True, text=True)
+    command = ["nmap", "-O", "-sV", "-oX", "-", host]
+
+    # The executor reads stdout & stderr together, so nmap can't block on a full stderr pipe while we parse stdout
+    nmap_reader = Process_Output_Reader(stream_process(command, "nmap", NMAP_TIMEOUT_SEC))
+    try:
+        with nmap_reader:
+            scan_dict = parse_nmap_xml(nmap_reader)
+
+            # Read to the end, so we get the exit info (nmap is normally done once the xml is closed)
+            while nmap_reader.read(4096):
+                pass
+
+    except FileNotFoundError:
+        return {"error": "nmap is not installed"}
 
-        # result.stdout will be a string separated with '\n'
-        # Parse this by splitting and returning an array
-        result_arr = result.stdout.split("\n")
+    except ET.ParseError:
+        # Nmap bailed out without finishing its output (e.g. no permission to run OS detection) or ran out of time
+        if nmap_reader.result is not None and nmap_reader.result["timed_out"]:
+            return {"error": "nmap scan timed out after {} seconds".format(NMAP_TIMEOUT_SEC)}
+        error_str = nmap_reader.stderr.decode("utf-8", errors="replace").strip()
+        return {"error": error_str or "failed to parse nmap output"}
 
-        return {"result": result_arr}
+    return scan_dict
+
+# .....................................................................................................................
+
+def get_ubuntu_app_client():
+    '''Returns the (shared) client used for all calls to the ubuntu-app running on the desktop'''
+
+    global _UBUNTU_APP_CLIENT
+
+    with _UBUNTU_APP_CLIENT_LOCK:
+        if _UBUNTU_APP_CLIENT is None:
+            remote_web_base = "http://{}:{}".format(get_remote_host(), get_remote_web_port())
+            _UBUNTU_APP_CLIENT = Upstream_Client(remote_web_base,
+                                                 connect_timeout_sec=get_upstream_connect_timeout_sec(),
+                                                 read_timeout_sec=get_upstream_read_timeout_sec(),
+                                                 max_retries=get_upstream_max_retries())
+
+    return _UBUNTU_APP_CLIENT
 
 # .....................................................................................................................
 
@@ -105,14 +154,25 @@ def reboot_desktop_to_os(os_select):
     os_select: "windows" | "ubuntu"
     '''
 
-    remote_web_base = "http://" + get_remote_host() + ":" + get_remote_web_port()
-    req_url = remote_web_base + "/reboot-with-os/" + os_select
+    # Requests is only loaded once the client exists (see upstream.py), so import it here for the error types
+    client = get_ubuntu_app_client()
+    import requests
+
+    req_path = "/reboot-with-os/" + os_select
 
     try:
-        http_response = requests.get(req_url)
+        http_response = client.get(req_path, stats_name="/reboot-with-os")
         response = http_response.json()
-    # If we error (e.g. from no response from the remote, )
-    except (requests.exceptions.ConnectionError):
+
+    # If we can't connect at all, the desktop is asleep or not running ubuntu
+    except requests.exceptions.ConnectionError as err:
+        if is_connect_failure(err):
+            response = {"error": "could not connect to ubuntu-app ({})".format(client.base_url)}
+        else:
+            response = {"result": "success with error"}
+
+    # If we error after connecting (e.g. no response from the remote, since it's rebooting)
+    except (requests.exceptions.Timeout, ValueError):
         response = {"result": "success with error"}
     
     return response
@@ -123,12 +183,27 @@ def reboot_desktop_to_os(os_select):
 
 # ---------------------------------------------------------------------------------------------------------------------
 
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Set if the in-process ICMP probe can't open a socket, so we stop retrying it
+_ICMP_SOCKETS_UNAVAILABLE = False
+
+# Hard limit on nmap scans, which normally take 10-60 seconds
+NMAP_TIMEOUT_SEC = 300
+
+# Created on first use, so every call to the ubuntu-app shares one connection pool
+_UBUNTU_APP_CLIENT = None
+_UBUNTU_APP_CLIENT_LOCK = threading.Lock()
+
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Demo
 
 if __name__ == "__main__":
 
-    pass
+    # Quick sanity check against localhost
+    print(probe_host("127.0.0.1", 100))
+    print(ping_machine("127.0.0.1", 100))
 
 
 # ---------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import sys
+import xml.etree.ElementTree as ET
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Element helpers
+
+# .....................................................................................................................
+
+def _to_int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+# .....................................................................................................................
+
+def _to_float(value, default=None):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+# .....................................................................................................................
+
+def _parse_port(port_elem):
+    '''Converts a <port> element into a dictionary'''
+
+    state_elem = port_elem.find("state")
+    service_elem = port_elem.find("service")
+
+    service_dict = None
+    if service_elem is not None:
+        service_dict = {"name": service_elem.get("name"),
+                        "product": service_elem.get("product"),
+                        "version": service_elem.get("version"),
+                        "extra_info": service_elem.get("extrainfo"),
+                        "os_type": service_elem.get("ostype"),
+                        "method": service_elem.get("method"),
+                        "confidence": _to_int(service_elem.get("conf")),
+                        "cpe": [each_cpe.text for each_cpe in service_elem.findall("cpe")]}
+
+    return {"protocol": port_elem.get("protocol"),
+            "port": _to_int(port_elem.get("portid")),
+            "state": state_elem.get("state") if state_elem is not None else None,
+            "reason": state_elem.get("reason") if state_elem is not None else None,
+            "service": service_dict}
+
+# .....................................................................................................................
+
+def _parse_os_match(osmatch_elem):
+    '''Converts an <osmatch> element into a dictionary'''
+
+    os_classes = []
+    for each_class in osmatch_elem.findall("osclass"):
+        os_classes.append({"type": each_class.get("type"),
+                           "vendor": each_class.get("vendor"),
+                           "family": each_class.get("osfamily"),
+                           "generation": each_class.get("osgen"),
+                           "accuracy": _to_int(each_class.get("accuracy")),
+                           "cpe": [each_cpe.text for each_cpe in each_class.findall("cpe")]})
+
+    return {"name": osmatch_elem.get("name"),
+            "accuracy": _to_int(osmatch_elem.get("accuracy")),
+            "classes": os_classes}
+
+# .....................................................................................................................
+
+def _parse_host(host_elem):
+    '''Converts a (complete) <host> element into a dictionary'''
+
+    status_elem = host_elem.find("status")
+
+    addresses = {}
+    for each_addr in host_elem.findall("address"):
+        addresses[each_addr.get("addrtype")] = each_addr.get("addr")
+        if each_addr.get("vendor"):
+            addresses["vendor"] = each_addr.get("vendor")
+
+    hostnames = [each_name.get("name") for each_name in host_elem.findall("hostnames/hostname")]
+    ports = [_parse_port(each_port) for each_port in host_elem.findall("ports/port")]
+    os_matches = [_parse_os_match(each_match) for each_match in host_elem.findall("os/osmatch")]
+
+    # Nmap lists the best guess first, but sort anyways in case that ever changes
+    os_matches.sort(key=lambda each_match: each_match["accuracy"] or 0, reverse=True)
+
+    uptime_elem = host_elem.find("uptime")
+    distance_elem = host_elem.find("distance")
+    times_elem = host_elem.find("times")
+
+    return {"state": status_elem.get("state") if status_elem is not None else None,
+            "addresses": addresses,
+            "hostnames": hostnames,
+            "ports": ports,
+            "open_ports": [each_port["port"] for each_port in ports if each_port["state"] == "open"],
+            "os_matches": os_matches,
+            "uptime_sec": _to_int(uptime_elem.get("seconds")) if uptime_elem is not None else None,
+            "distance_hops": _to_int(distance_elem.get("value")) if distance_elem is not None else None,
+            "srtt_us": _to_int(times_elem.get("srtt")) if times_elem is not None else None,
+            "started_ems": 1000 * _to_int(host_elem.get("starttime"), 0) or None,
+            "finished_ems": 1000 * _to_int(host_elem.get("endtime"), 0) or None}
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Parsing functions
+
+# .....................................................................................................................
+
+def parse_nmap_xml(xml_source):
+    '''
+    Parses nmap XML output (i.e. from 'nmap -oX -') incrementally, from a file path or binary file-like object.
+    Each <host> is converted and then discarded as soon as it's complete, so memory use doesn't grow with
+    the size of the scan output. This means it can read directly from the stdout of a running nmap process
+
+    Returns a dictionary:
+        {"scanner", "version", "args", "hosts": [...], "timing": {...}, "hosts_summary": {...}}
+    '''
+
+    # Initialize output
+    scan_dict = {"scanner": None, "version": None, "args": None, "hosts": [],
+                 "timing": {"started_ems": None, "finished_ems": None, "elapsed_sec": None,
+                            "exit": None, "summary": None},
+                 "hosts_summary": {"up": None, "down": None, "total": None}}
+
+    root_elem = None
+    depth = 0
+    for each_event, each_elem in ET.iterparse(xml_source, events=("start", "end")):
+
+        # Track nesting, so we only clear out top-level children of the root element
+        if each_event == "start":
+            depth += 1
+            if depth == 1:
+                root_elem = each_elem
+                scan_dict["scanner"] = each_elem.get("scanner")
+                scan_dict["version"] = each_elem.get("version")
+                scan_dict["args"] = each_elem.get("args")
+                scan_dict["timing"]["started_ems"] = 1000 * _to_int(each_elem.get("start"), 0) or None
+            continue
+
+        depth -= 1
+        each_tag = each_elem.tag
+        if each_tag == "host":
+            scan_dict["hosts"].append(_parse_host(each_elem))
+
+        elif each_tag == "finished":
+            scan_dict["timing"]["finished_ems"] = 1000 * _to_int(each_elem.get("time"), 0) or None
+            scan_dict["timing"]["elapsed_sec"] = _to_float(each_elem.get("elapsed"))
+            scan_dict["timing"]["exit"] = each_elem.get("exit")
+            scan_dict["timing"]["summary"] = each_elem.get("summary")
+
+        elif each_tag == "hosts":
+            for each_key in ("up", "down", "total"):
+                scan_dict["hosts_summary"][each_key] = _to_int(each_elem.get(each_key))
+
+        # Throw away finished top-level elements (hosts, task progress entries etc.) to keep memory use flat
+        if depth == 1 and root_elem is not None:
+            root_elem.clear()
+
+    return scan_dict
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    # Parse a recorded scan, e.g. from: nmap -O -sV -oX scan.xml <host>
+    import json
+    if len(sys.argv) < 2:
+        print("", "Usage: python -m local.lib.nmap_xml <path to nmap xml file>", sep="\n")
+    else:
+        print(json.dumps(parse_nmap_xml(sys.argv[1]), indent=2))
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
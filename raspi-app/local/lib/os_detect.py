@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import errno
+import selectors
+import socket
+import threading
+import time
+
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+
+from local.lib.environment import get_remote_web_port, get_remote_ssh_port
+from local.lib.icmp import resolve_host
+from local.lib.network import probe_host
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Probe helpers
+
+# .....................................................................................................................
+
+def _check_ports(family, address, port_list, deadline):
+    '''
+    Starts non-blocking TCP connects to every port at once and waits (until the deadline) for them to finish.
+    Returns a dictionary of {port: "open" | "closed" | "filtered"}, plus the still-connected open sockets
+    '''
+
+    port_states = {each_port: "filtered" for each_port in port_list}
+    open_sockets = {}
+
+    with selectors.DefaultSelector() as selector:
+        try:
+            for each_port in port_list:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                try:
+                    sock.setblocking(False)
+                    connect_err = sock.connect_ex((address, each_port))
+                except OSError:
+                    connect_err = None
+                if connect_err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    port_states[each_port] = "closed" if connect_err == errno.ECONNREFUSED else "filtered"
+                    sock.close()
+                    continue
+                selector.register(sock, selectors.EVENT_WRITE, each_port)
+
+            while selector.get_map():
+                remaining_sec = deadline - time.monotonic()
+                if remaining_sec <= 0:
+                    break
+
+                for each_key, _ in selector.select(remaining_sec):
+                    sock, each_port = each_key.fileobj, each_key.data
+                    selector.unregister(sock)
+                    connect_err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if connect_err == 0:
+                        port_states[each_port] = "open"
+                        open_sockets[each_port] = sock
+                        continue
+                    if connect_err == errno.ECONNREFUSED:
+                        port_states[each_port] = "closed"
+                    sock.close()
+
+        except BaseException:
+            for each_sock in open_sockets.values():
+                each_sock.close()
+            raise
+
+        finally:
+            # Anything still waiting on the deadline counts as filtered
+            for each_key in list(selector.get_map().values()):
+                selector.unregister(each_key.fileobj)
+                each_key.fileobj.close()
+
+    return port_states, open_sockets
+
+# .....................................................................................................................
+
+def _read_banner(sock, deadline, max_bytes=256):
+    '''Reads whatever the server sends first (e.g. an SSH version string), until the deadline'''
+
+    remaining_sec = deadline - time.monotonic()
+    if remaining_sec <= 0:
+        return None
+
+    with selectors.DefaultSelector() as selector:
+        selector.register(sock, selectors.EVENT_READ)
+        if not selector.select(remaining_sec):
+            return None
+
+    try:
+        return sock.recv(max_bytes).decode("ascii", errors="replace").strip()
+    except OSError:
+        return None
+
+# .....................................................................................................................
+
+def _os_from_ttl(ttl):
+    '''Guesses the OS from the reply TTL, assuming we're only a few hops away (Linux starts at 64, Windows at 128)'''
+
+    if ttl is None:
+        return None
+    if ttl <= 64:
+        return "ubuntu"
+    if ttl <= 128:
+        return "windows"
+
+    return None
+
+# .....................................................................................................................
+
+def _os_from_banner(banner):
+    '''Guesses the OS from a service banner, e.g. "SSH-2.0-OpenSSH_8.2p1 Ubuntu-4ubuntu0.3"'''
+
+    banner_lower = banner.lower()
+    if "windows" in banner_lower:
+        return "windows"
+    if ("ubuntu" in banner_lower) or ("debian" in banner_lower):
+        return "ubuntu"
+
+    return None
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Detection functions
+
+# .....................................................................................................................
+
+def get_default_port_hints():
+    '''
+    Returns {port: os} for ports that (on our desktop) are only open under one OS.
+    Ubuntu runs sshd + the ubuntu-app, Windows has remote desktop + SMB
+    '''
+
+    return {get_remote_ssh_port(): "ubuntu",
+            get_remote_web_port(): "ubuntu",
+            3389: "windows",
+            445: "windows"}
+
+# .....................................................................................................................
+
+def detect_os_fast(host, timeout_ms=80, port_hints=None, read_banner=True):
+    '''
+    Quickly guesses which OS a host is running by combining several cheap signals, all run concurrently:
+        - ICMP reply TTL (Linux 64 vs. Windows 128)
+        - TCP connects to ports that are only open under one OS (see get_default_port_hints)
+        - The SSH banner, if the ssh port is open (optional)
+
+    The whole check finishes within timeout_ms. Returns a dictionary:
+        {"os": "ubuntu" | "windows" | "unknown" | "offline", "confidence": 0.0-1.0, "evidence": [...],
+         "elapsed_ms": float}
+
+    The confidence is the vote share of the winning OS, scaled down when there's little evidence
+    (e.g. a TTL on its own isn't worth much). A host name that can't be resolved in time is reported as offline
+    '''
+
+    # For clarity
+    start_time = time.perf_counter()
+    deadline = time.monotonic() + (timeout_ms / 1000.0)
+    port_hints = get_default_port_hints() if port_hints is None else port_hints
+
+    # Resolve the host once up front (within the deadline), so a bad or slow name doesn't hold up every probe
+    resolved = resolve_host(host, deadline - time.monotonic())
+    if resolved is None:
+        return {"os": "offline",
+                "confidence": 0.0,
+                "evidence": [],
+                "ports": {each_port: "filtered" for each_port in port_hints},
+                "error": "Couldn't resolve host: {}".format(host),
+                "elapsed_ms": round(1000 * (time.perf_counter() - start_time), 3)}
+    family, address = resolved
+
+    # Ping in a separate thread, so it runs at the same time as the port checks
+    ping_future = Future()
+    def ping_in_background():
+        try:
+            ping_future.set_result(probe_host(address, timeout_ms))
+        except BaseException as err:
+            ping_future.set_exception(err)
+    threading.Thread(target=ping_in_background, name="os-detect-ping", daemon=True).start()
+
+    # Check ports & read the ssh banner while the ping is in flight
+    port_states, open_sockets = _check_ports(family, address, list(port_hints.keys()), deadline)
+    banner = None
+    try:
+        ssh_sock = open_sockets.get(get_remote_ssh_port())
+        if read_banner and ssh_sock is not None:
+            banner = _read_banner(ssh_sock, deadline)
+    finally:
+        for each_sock in open_sockets.values():
+            each_sock.close()
+
+    # Only use the ping result if it's in by the deadline (a late reply is treated as no reply)
+    try:
+        ping_result = ping_future.result(max(0, deadline - time.monotonic()))
+    except FuturesTimeoutError:
+        ping_result = {}
+
+    # Tally up votes for each OS, with stronger signals getting more weight
+    votes = {}
+    evidence = []
+    def add_vote(os_name, weight, description):
+        votes[os_name] = votes.get(os_name, 0) + weight
+        evidence.append({"signal": description, "os": os_name, "weight": weight})
+
+    ttl_os = _os_from_ttl(ping_result.get("ttl"))
+    if ttl_os is not None:
+        add_vote(ttl_os, TTL_WEIGHT, "icmp ttl={}".format(ping_result["ttl"]))
+
+    for each_port, each_state in port_states.items():
+        if each_state == "open":
+            add_vote(port_hints[each_port], PORT_WEIGHT, "tcp port {} open".format(each_port))
+
+    banner_os = _os_from_banner(banner) if banner else None
+    if banner_os is not None:
+        add_vote(banner_os, BANNER_WEIGHT, "banner '{}'".format(banner))
+
+    # Decide on the OS with the most votes, only trusting it fully once there's enough evidence
+    host_responded = ping_result.get("is_online", False) or any(state != "filtered" for state in port_states.values())
+    detected_os = "unknown" if host_responded else "offline"
+    confidence = 0.0
+    if votes:
+        detected_os = max(votes, key=votes.get)
+        total_votes = sum(votes.values())
+        vote_share = votes[detected_os] / total_votes
+        evidence_scale = min(1.0, total_votes / FULL_EVIDENCE_WEIGHT)
+        confidence = round(vote_share * evidence_scale, 3)
+
+    return {"os": detected_os,
+            "confidence": confidence,
+            "evidence": evidence,
+            "ports": port_states,
+            "elapsed_ms": round(1000 * (time.perf_counter() - start_time), 3)}
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# How much each type of signal counts towards the final decision
+TTL_WEIGHT = 1
+PORT_WEIGHT = 2
+BANNER_WEIGHT = 3
+
+# Total weight of votes needed for full confidence (e.g. ttl + an open port + a banner)
+FULL_EVIDENCE_WEIGHT = TTL_WEIGHT + PORT_WEIGHT + BANNER_WEIGHT
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    print(detect_os_fast("127.0.0.1"))
+    print(detect_os_fast("no-such-host.invalid", 300))
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import signal
+import socket
+import sys
+import time
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Prefork_Supervisor:
+
+    '''
+    Runs a server as several (forked) worker processes, plus an optional 'monitor' process,
+    and starts them again if they exit or crash. The supervisor (master) process doesn't serve anything itself,
+    it only waits on its children, so it stays single-threaded (which keeps forking safe).
+    Workers that crash right after starting are restarted with an increasing delay, rather than in a tight loop.
+    SIGTERM/SIGINT sent to the supervisor are passed on to every child, then we wait for them to exit
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, num_workers, worker_func, monitor_func=None,
+                 stop_timeout_sec=10, min_uptime_sec=5, max_restart_delay_sec=30):
+
+        '''
+        worker_func is called (with no arguments) in each worker process & should serve until stopped.
+        monitor_func (if given) is run in one extra process, for work that should only happen once
+        (e.g. probing the remote host), rather than once per worker
+        '''
+
+        self.num_workers = max(1, num_workers)
+        self.worker_func = worker_func
+        self.monitor_func = monitor_func
+        self.stop_timeout_sec = stop_timeout_sec
+        self.min_uptime_sec = min_uptime_sec
+        self.max_restart_delay_sec = max_restart_delay_sec
+
+        # Child processes, stored as {pid: (role, started_mono)}, with quick-crash counts by role
+        self._children = {}
+        self._num_quick_exits = {}
+        self._is_stopping = False
+        self._num_restarts = 0
+
+    # .................................................................................................................
+
+    def run(self):
+
+        ''' Starts every child process & keeps them running until the supervisor is told to stop (blocking) '''
+
+        signal.signal(signal.SIGTERM, self._handle_stop_signal)
+        signal.signal(signal.SIGINT, self._handle_stop_signal)
+
+        roles_list = ["worker-{}".format(idx) for idx in range(self.num_workers)]
+        if self.monitor_func is not None:
+            roles_list.insert(0, "monitor")
+        for each_role in roles_list:
+            self._start_child(each_role)
+
+        # Wait for children to exit & replace them, until we're told to stop
+        while self._children:
+
+            try:
+                exited_pid, exit_status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            role, started_mono = self._children.pop(exited_pid, (None, None))
+            if role is None or self._is_stopping:
+                continue
+
+            self._restart_child(role, started_mono, exited_pid, exit_status)
+
+        signal.alarm(0)
+        print("", "Supervisor done! ({} restarts)".format(self._num_restarts), sep="\n")
+
+    # .................................................................................................................
+
+    def _start_child(self, role):
+
+        # Flush first, so buffered output isn't printed by both processes
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        child_pid = os.fork()
+        if child_pid == 0:
+            self._run_child(role)
+
+        self._children[child_pid] = (role, time.monotonic())
+
+        return child_pid
+
+    # .................................................................................................................
+
+    def _run_child(self, role):
+
+        # Children shouldn't use the supervisor's signal handling
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+        exit_code = 0
+        try:
+            child_func = self.monitor_func if role == "monitor" else self.worker_func
+            child_func()
+        except KeyboardInterrupt:
+            pass
+        except BaseException as err:
+            print("", "Error in {} process ({}):".format(role, os.getpid()), "  {}".format(err), sep="\n")
+            exit_code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+        # Skip clean-up (e.g. atexit functions) that belongs to the supervisor
+        os._exit(exit_code)
+
+    # .................................................................................................................
+
+    def _restart_child(self, role, started_mono, exited_pid, exit_status):
+
+        # Back off if the child keeps crashing soon after starting (e.g. a bad config), otherwise restart right away
+        uptime_sec = time.monotonic() - started_mono
+        num_quick_exits = (self._num_quick_exits.get(role, 0) + 1) if uptime_sec < self.min_uptime_sec else 0
+        self._num_quick_exits[role] = num_quick_exits
+        restart_delay_sec = min(self.max_restart_delay_sec, (2 ** num_quick_exits) - 1)
+
+        print("", "Process {} ({}) exited (status: {}), restarting in {} sec".format(role, exited_pid,
+                                                                                    exit_status, restart_delay_sec),
+              sep="\n")
+        time.sleep(restart_delay_sec)
+
+        # We may have been told to stop while waiting
+        if not self._is_stopping:
+            self._start_child(role)
+            self._num_restarts += 1
+
+    # .................................................................................................................
+
+    def _handle_stop_signal(self, signal_number, _):
+
+        # Ignore repeated signals (e.g. ctrl+c in a terminal goes to every process in the group)
+        if self._is_stopping:
+            return
+        self._is_stopping = True
+
+        print("", "Stop signal received by supervisor ({}), stopping child processes".format(signal_number), sep="\n")
+        self._signal_children(signal.SIGTERM)
+
+        # Kill any children that haven't stopped after a while
+        signal.signal(signal.SIGALRM, lambda *_: self._signal_children(signal.SIGKILL))
+        signal.alarm(max(1, int(self.stop_timeout_sec)))
+
+    # .................................................................................................................
+
+    def _signal_children(self, signal_number):
+        for each_pid in list(self._children.keys()):
+            try:
+                os.kill(each_pid, signal_number)
+            except ProcessLookupError:
+                pass
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def create_listen_socket(host, port, backlog=1024):
+
+    '''
+    Creates a listening TCP socket, which forked worker processes inherit & accept connections from.
+    Every worker shares the same socket (and connection queue), so connections waiting on a worker
+    that crashes are picked up by the others, rather than being dropped
+    '''
+
+    address_info = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE)
+    family, socktype, proto, _, socket_address = address_info[0]
+
+    listen_socket = socket.socket(family, socktype, proto)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listen_socket.bind(socket_address)
+    listen_socket.listen(backlog)
+    listen_socket.set_inheritable(True)
+
+    return listen_socket
+
+# .....................................................................................................................
+
+def get_supervisor_pid():
+
+    ''' Returns the pid of the supervisor (i.e. parent) process, when called from a child process '''
+
+    return os.getppid()
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from urllib.request import urlopen
+
+    class Pid_Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(str(os.getpid()).encode("utf-8"))
+
+        def log_message(self, *args):
+            pass
+
+    ex_socket = create_listen_socket("127.0.0.1", 0)
+    ex_port = ex_socket.getsockname()[1]
+
+    # Each worker serves from the shared socket (the demo kills one of them part way through)
+    def serve_pids():
+        ex_server = HTTPServer(ex_socket.getsockname(), Pid_Handler, bind_and_activate=False)
+        ex_server.socket = ex_socket
+        ex_server.serve_forever()
+
+    ex_supervisor = Prefork_Supervisor(3, serve_pids, min_uptime_sec=0.1)
+    supervisor_pid = os.fork()
+    if supervisor_pid == 0:
+        ex_supervisor.run()
+        os._exit(0)
+
+    # Responses should come from different workers, including workers that replace crashed ones
+    time.sleep(0.5)
+    for idx in range(6):
+        with urlopen("http://127.0.0.1:{}".format(ex_port), timeout=5) as response:
+            worker_pid = int(response.read())
+        print("Response from worker:", worker_pid)
+        if idx == 2:
+            os.kill(worker_pid, signal.SIGKILL)
+            time.sleep(0.5)
+
+    os.kill(supervisor_pid, signal.SIGTERM)
+    os.waitpid(supervisor_pid, 0)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
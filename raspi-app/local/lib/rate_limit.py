@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import fcntl
+import hashlib
+import math
+import mmap
+import struct
+import tempfile
+import threading
+import time
+
+from local.lib.response_helpers import server_error_response
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Rate_Limiter:
+
+    '''
+    Limits how often each client (by ip address) can call a route, using one token bucket per (route, client).
+    Each bucket holds up to 'burst' tokens and refills at a steady rate, every request takes one token and
+    requests that find the bucket empty are turned away (429), with a Retry-After for when a token is available.
+    Checks are O(1). Buckets that have been idle long enough to refill completely hold no information,
+    so they're dropped every so often (compaction), which keeps memory use bounded by the number of active clients
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, limits_dict, compact_interval_sec=60, shared_buckets=None):
+
+        '''
+        limits_dict holds: {route rule (e.g. "/bring-online"): (requests per minute, burst)}
+        Routes that aren't listed aren't limited.
+        If shared buckets are given (see Shared_Token_Buckets), they're used instead of the in-memory buckets,
+        so that several processes (e.g. prefork workers) share the same limits
+        '''
+
+        self.compact_interval_sec = compact_interval_sec
+        self.shared_buckets = shared_buckets
+
+        # Store as (tokens per second, bucket size)
+        self._limits = {each_route: (max(1e-6, per_minute / 60.0), max(1, burst))
+                        for each_route, (per_minute, burst) in limits_dict.items()}
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._counts = {each_route: {"allowed": 0, "limited": 0} for each_route in self._limits}
+        self._next_compact_mono = time.monotonic() + compact_interval_sec
+
+    # .................................................................................................................
+
+    def check(self, route, client_key):
+
+        '''
+        Takes a token from the client's bucket for the route, if there is one.
+        Returns the number of seconds until the client may try again (0 means the request is allowed)
+        '''
+
+        limit = self._limits.get(route)
+        if limit is None:
+            return 0
+        tokens_per_sec, burst = limit
+
+        if self.shared_buckets is not None:
+            is_allowed, tokens = self.shared_buckets.take(route, client_key, tokens_per_sec, burst)
+            with self._lock:
+                self._counts[route]["allowed" if is_allowed else "limited"] += 1
+            return 0 if is_allowed else (1 - tokens) / tokens_per_sec
+
+        with self._lock:
+            now_mono = time.monotonic()
+            if now_mono >= self._next_compact_mono:
+                self._compact(now_mono)
+
+            # Buckets start out full, then refill based on how long it's been since the last request
+            bucket_key = (route, client_key)
+            tokens, updated_mono = self._buckets.get(bucket_key, (burst, now_mono))
+            tokens = min(burst, tokens + (now_mono - updated_mono) * tokens_per_sec)
+
+            is_allowed = (tokens >= 1)
+            if is_allowed:
+                tokens -= 1
+            self._buckets[bucket_key] = (tokens, now_mono)
+            self._counts[route]["allowed" if is_allowed else "limited"] += 1
+
+        return 0 if is_allowed else (1 - tokens) / tokens_per_sec
+
+    # .................................................................................................................
+
+    def install(self, wsgi_app):
+
+        '''
+        Checks every request to a limited route (by its url rule, not the url itself) before it runs.
+        Clients are told apart by ip address. Proxy headers (e.g. X-Forwarded-For) are ignored,
+        since clients can set these to anything they like
+        '''
+
+        from flask import request
+
+        @wsgi_app.before_request
+        def check_rate_limit():
+
+            # Don't count CORS pre-flight checks against the client
+            if request.url_rule is None or request.method == "OPTIONS":
+                return None
+
+            retry_after_sec = self.check(request.url_rule.rule, request.remote_addr)
+            if retry_after_sec <= 0:
+                return None
+
+            # Round up, so that a client waiting for the Retry-After time will find a token waiting
+            retry_after_sec = math.ceil(retry_after_sec)
+            error_msg = "Too many requests, try again in {} second(s)".format(retry_after_sec)
+            response, status_code = server_error_response(error_msg, 429)
+            response.headers["Retry-After"] = str(retry_after_sec)
+
+            return response, status_code
+
+        return wsgi_app
+
+    # .................................................................................................................
+
+    def get_counts(self):
+
+        '''
+        Returns the number of requests allowed/limited per route: {route: {"allowed": int, "limited": int}}
+        These are counted per process, even if the buckets are shared
+        '''
+
+        with self._lock:
+            return {each_route: dict(each_counts) for each_route, each_counts in self._counts.items()}
+
+    # .................................................................................................................
+
+    def get_num_buckets(self):
+
+        if self.shared_buckets is not None:
+            return self.shared_buckets.get_num_buckets()
+
+        with self._lock:
+            return len(self._buckets)
+
+    # .................................................................................................................
+
+    def _compact(self, now_mono):
+
+        # Drop buckets that would be full by now, since they behave the same as a new bucket
+        idle_keys = []
+        for each_key, (each_tokens, each_updated_mono) in self._buckets.items():
+            tokens_per_sec, burst = self._limits[each_key[0]]
+            if each_tokens + (now_mono - each_updated_mono) * tokens_per_sec >= burst:
+                idle_keys.append(each_key)
+
+        for each_key in idle_keys:
+            del self._buckets[each_key]
+
+        self._next_compact_mono = now_mono + self.compact_interval_sec
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Shared_Token_Buckets:
+
+    '''
+    Holds token buckets in a fixed-size table in (anonymous) shared memory, which is inherited by processes
+    forked after this object is created, so nothing is written to disk.
+    Each (route, client) key hashes to one small group of slots, so taking a token is O(1) no matter how many
+    clients are being tracked. Groups are locked separately, using byte-range (fcntl) locks on the memory file,
+    which the OS releases if the process holding one dies.
+    A slot whose bucket has refilled completely holds no information, so any key can take it over. This replaces
+    the periodic compaction of the in-memory buckets, and every process sees the same result. If every slot in
+    a group is in use, the least recently used one is taken over (its client starts again with a full bucket)
+    '''
+
+    # Key hash (0 for an empty slot), tokens, updated (monotonic) time, time when the bucket will be full again
+    _SLOT = struct.Struct("<Qddd")
+
+    # .................................................................................................................
+
+    def __init__(self, num_groups=512, slots_per_group=8):
+
+        self.num_groups = num_groups
+        self.slots_per_group = slots_per_group
+        self._group_size = slots_per_group * self._SLOT.size
+
+        # Memory-backed file (not on disk) so it can be both mapped & locked. Monotonic times are system-wide
+        # (on linux), so they can be shared between processes
+        if hasattr(os, "memfd_create"):
+            self._fd = os.memfd_create("rate-limit-buckets")
+        else:
+            self._temp_file = tempfile.TemporaryFile()
+            self._fd = self._temp_file.fileno()
+        os.ftruncate(self._fd, num_groups * self._group_size)
+        self._mmap = mmap.mmap(self._fd, num_groups * self._group_size)
+
+        # fcntl locks are held per process, so threads in the same process also need to take turns
+        self._thread_lock = threading.Lock()
+
+    # .................................................................................................................
+
+    def take(self, route, client_key, tokens_per_sec, burst):
+
+        '''
+        Takes a token from the bucket for the route & client, if there is one.
+        Returns: is_allowed, tokens (left in the bucket afterwards)
+        '''
+
+        key_hash = _hash_bucket_key(route, client_key)
+        group_offset = (key_hash % self.num_groups) * self._group_size
+
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self._group_size, group_offset, os.SEEK_SET)
+            try:
+                now_mono = time.monotonic()
+                slot_offset, tokens, updated_mono = self._find_slot(group_offset, key_hash, now_mono, burst)
+
+                # Buckets start out full, then refill based on how long it's been since the last request
+                tokens = min(burst, tokens + (now_mono - updated_mono) * tokens_per_sec)
+                is_allowed = (tokens >= 1)
+                if is_allowed:
+                    tokens -= 1
+                full_at_mono = now_mono + (burst - tokens) / tokens_per_sec
+                self._SLOT.pack_into(self._mmap, slot_offset, key_hash, tokens, now_mono, full_at_mono)
+
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self._group_size, group_offset, os.SEEK_SET)
+
+        return is_allowed, tokens
+
+    # .................................................................................................................
+
+    def get_num_buckets(self):
+
+        ''' Counts the buckets that haven't refilled completely (reads without locking, so it's approximate) '''
+
+        now_mono = time.monotonic()
+        num_buckets = 0
+        for key_hash, _, _, full_at_mono in self._SLOT.iter_unpack(self._mmap):
+            if key_hash != 0 and full_at_mono > now_mono:
+                num_buckets += 1
+
+        return num_buckets
+
+    # .................................................................................................................
+
+    def _find_slot(self, group_offset, key_hash, now_mono, burst):
+
+        '''
+        Finds the slot (in a locked group) holding the key's bucket, or a slot to start a new (full) bucket in.
+        Returns: slot_offset, tokens, updated_mono
+        '''
+
+        free_offset = None
+        oldest_offset, oldest_mono = None, None
+        for slot_idx in range(self.slots_per_group):
+            slot_offset = group_offset + slot_idx * self._SLOT.size
+            slot_hash, tokens, updated_mono, full_at_mono = self._SLOT.unpack_from(self._mmap, slot_offset)
+            if slot_hash == key_hash:
+                return slot_offset, tokens, updated_mono
+
+            if free_offset is None and (slot_hash == 0 or full_at_mono <= now_mono):
+                free_offset = slot_offset
+            if oldest_mono is None or updated_mono < oldest_mono:
+                oldest_offset, oldest_mono = slot_offset, updated_mono
+
+        new_offset = oldest_offset if free_offset is None else free_offset
+
+        return new_offset, burst, now_mono
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def _hash_bucket_key(route, client_key):
+
+    ''' Helper which gives a (non-zero) 64-bit hash of a bucket key, which is the same in every process '''
+
+    key_bytes = "{}\x1f{}".format(route, client_key).encode("utf-8")
+    key_hash = int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little")
+
+    return max(1, key_hash)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    from flask import Flask
+
+    # Small app allowing 60 requests per minute (1 per second) with bursts of up to 3
+    ex_app = Flask(__name__)
+    ex_limiter = Rate_Limiter({"/expensive": (60, 3)}, compact_interval_sec=0.5)
+    ex_limiter.install(ex_app)
+
+    @ex_app.route("/expensive")
+    def expensive_route():
+        return "done"
+
+    @ex_app.route("/cheap")
+    def cheap_route():
+        return "done"
+
+    with ex_app.test_client() as client:
+
+        # The first 3 calls use up the burst, then we have to wait for a refill
+        retry_after_sec = 0
+        for each_route in ["/expensive"] * 5 + ["/cheap"] * 2:
+            response = client.get(each_route)
+            retry_after_sec = int(response.headers.get("Retry-After", retry_after_sec))
+            print(each_route, response.status_code, "Retry-After:", response.headers.get("Retry-After"))
+
+        # Waiting for Retry-After should always be enough
+        time.sleep(retry_after_sec)
+        print("After waiting:", client.get("/expensive").status_code)
+
+        # Other clients have their own buckets
+        print("Other client:", client.get("/expensive", environ_base={"REMOTE_ADDR": "10.0.0.2"}).status_code)
+
+    # Once idle for long enough to refill, buckets are compacted away
+    print("Buckets:", ex_limiter.get_num_buckets())
+    time.sleep(3)
+    ex_limiter.check("/expensive", "10.0.0.3")
+    print("Buckets after compaction:", ex_limiter.get_num_buckets(), "| Counts:", ex_limiter.get_counts())
+
+    # Limiters in separate (forked) processes can share their buckets through shared memory
+    ex_limiter = Rate_Limiter({"/expensive": (60, 3)}, shared_buckets=Shared_Token_Buckets())
+    for _ in range(2):
+        if os.fork() == 0:
+            ex_limiter.check("/expensive", "10.0.0.4")
+            os._exit(0)
+        os.wait()
+    print("Shared retry times (sec):", [round(ex_limiter.check("/expensive", "10.0.0.4"), 1) for _ in range(2)])
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import sys
+import shutil
+import threading
+
+from local.eolib.utils.executor import run_process
+from local.eolib.utils.use_git import Git_Writer
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Release_Manager:
+
+    '''
+    Manages self-updates using one git worktree per release, laid out as:
+
+        <deploy_root>/releases/<release_id>/        <- worktree checked out at a specific commit
+        <deploy_root>/releases/<release_id>.ready   <- marker, written once the release is fully prepared
+        <deploy_root>/current -> releases/<id>      <- what the service runs (systemd points here)
+        <deploy_root>/previous -> releases/<id>     <- the release before current, for rollbacks
+
+    New releases are checked out & compiled next to the running one, then the 'current' link is
+    swapped atomically, so a restart only needs to swap processes
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, git_folder_parent_path, deploy_root, compile_subfolder=None, keep_releases=3,
+                 compile_timeout_sec=300):
+
+        self.git_writer = Git_Writer(git_folder_parent_path)
+        self.deploy_root = deploy_root
+        self.compile_subfolder = compile_subfolder
+        self.keep_releases = keep_releases
+        self.compile_timeout_sec = compile_timeout_sec
+
+        self.releases_folder_path = os.path.join(deploy_root, "releases")
+        self.current_link_path = os.path.join(deploy_root, "current")
+        self.previous_link_path = os.path.join(deploy_root, "previous")
+
+        # Only allow one update/rollback at a time
+        self._update_lock = threading.Lock()
+
+    # .................................................................................................................
+
+    def get_status(self):
+
+        ''' Returns info about the current/previous releases, all prepared releases and what we're running from '''
+
+        release_ids_list = []
+        if os.path.isdir(self.releases_folder_path):
+            release_ids_list = sorted(each_name[:-len(".ready")] for each_name in os.listdir(self.releases_folder_path)
+                                      if each_name.endswith(".ready"))
+
+        return {"deploy_root": self.deploy_root,
+                "current_release": self._read_link_release_id(self.current_link_path),
+                "previous_release": self._read_link_release_id(self.previous_link_path),
+                "running_release": self.get_running_release_id(),
+                "releases": release_ids_list}
+
+    # .................................................................................................................
+
+    def get_running_release_id(self):
+
+        ''' Returns the id of the release this process was started from, or None if not running from a release '''
+
+        this_file_path = os.path.realpath(__file__)
+        releases_folder_path = os.path.realpath(self.releases_folder_path)
+        if not this_file_path.startswith(releases_folder_path + os.sep):
+            return None
+
+        relative_path = os.path.relpath(this_file_path, releases_folder_path)
+
+        return relative_path.split(os.sep)[0]
+
+    # .................................................................................................................
+
+    def update_to(self, revision_str):
+
+        '''
+        Prepares (if needed) & switches to a release for the given commit/tag/branch.
+        Raises an AttributeError if the revision doesn't exist and a RuntimeError if the release can't be built
+        Returns:
+            {"commit_id", "previous_release", "current_release", "changed"}
+        '''
+
+        if not self._update_lock.acquire(blocking=False):
+            raise RuntimeError("Another update is already in progress")
+
+        try:
+            commit_id = self.git_writer.resolve_commit_id(revision_str)
+            release_id = self.prepare_release(commit_id)
+            previous_release_id = self._activate_release(release_id)
+            self.prune_releases()
+
+        finally:
+            self._update_lock.release()
+
+        return {"commit_id": commit_id,
+                "previous_release": previous_release_id,
+                "current_release": release_id,
+                "changed": (previous_release_id != release_id)}
+
+    # .................................................................................................................
+
+    def rollback(self):
+
+        '''
+        Switches back to the previous release (which is still on disk, so this is instant)
+        Returns:
+            {"previous_release", "current_release", "changed"}
+        '''
+
+        if not self._update_lock.acquire(blocking=False):
+            raise RuntimeError("Another update is already in progress")
+
+        try:
+            rollback_release_id = self._read_link_release_id(self.previous_link_path)
+            if rollback_release_id is None or not self._is_release_ready(rollback_release_id):
+                raise RuntimeError("No previous release to roll back to")
+            previous_release_id = self._activate_release(rollback_release_id)
+
+        finally:
+            self._update_lock.release()
+
+        return {"previous_release": previous_release_id,
+                "current_release": rollback_release_id,
+                "changed": (previous_release_id != rollback_release_id)}
+
+    # .................................................................................................................
+
+    def prepare_release(self, commit_id):
+
+        '''
+        Checks out the given (full) commit id into its own worktree & pre-compiles it,
+        without touching the running release. Re-uses the release if it was already prepared
+        Returns: release_id
+        '''
+
+        release_id = commit_id[:12]
+        if self._is_release_ready(release_id):
+            return release_id
+
+        # Clear out anything left behind by a previous (failed) attempt
+        release_folder_path = self._get_release_folder_path(release_id)
+        self._remove_release(release_id)
+        os.makedirs(self.releases_folder_path, exist_ok=True)
+
+        # Check out the commit next to the running release & compile it, so the first start doesn't have to
+        try:
+            self.git_writer.add_worktree(release_folder_path, commit_id)
+            compile_folder_path = release_folder_path
+            if self.compile_subfolder is not None:
+                compile_folder_path = os.path.join(release_folder_path, self.compile_subfolder)
+            compile_cmd = [sys.executable, "-m", "compileall", "-q", "-j", "0", compile_folder_path]
+            compile_result = run_process(compile_cmd, "compileall", self.compile_timeout_sec)
+            if compile_result["timed_out"]:
+                raise RuntimeError("Timed out compiling release {} (after {} seconds)".format(release_id,
+                                                                                              self.compile_timeout_sec))
+            if compile_result["returncode"] != 0:
+                compile_output = (compile_result["stdout"] + compile_result["stderr"]).decode("utf-8", errors="replace")
+                raise RuntimeError("Error compiling release {}:\n{}".format(release_id, compile_output.strip()))
+
+        except AttributeError as err:
+            self._remove_release(release_id)
+            raise RuntimeError("Error preparing release {}: {}".format(release_id, err))
+
+        except RuntimeError:
+            self._remove_release(release_id)
+            raise
+
+        # Only mark the release as usable once everything above succeeded
+        with open(self._get_ready_marker_path(release_id), "w") as out_file:
+            out_file.write(commit_id)
+
+        return release_id
+
+    # .................................................................................................................
+
+    def prune_releases(self):
+
+        ''' Removes old releases, always keeping the current & previous ones '''
+
+        release_ids_list = self.get_status()["releases"]
+        protected_ids = {self._read_link_release_id(self.current_link_path),
+                         self._read_link_release_id(self.previous_link_path),
+                         self.get_running_release_id()}
+
+        # Keep the most recently prepared releases
+        newest_first_ids = sorted(release_ids_list,
+                                  key=lambda release_id: os.path.getmtime(self._get_ready_marker_path(release_id)),
+                                  reverse=True)
+        for each_release_id in newest_first_ids[self.keep_releases:]:
+            if each_release_id not in protected_ids:
+                self._remove_release(each_release_id)
+
+    # .................................................................................................................
+
+    def _activate_release(self, release_id):
+
+        ''' Points the 'current' link at the given release (atomically), returns the release it used to point at '''
+
+        previous_release_id = self._read_link_release_id(self.current_link_path)
+        if previous_release_id == release_id:
+            return previous_release_id
+
+        if previous_release_id is not None:
+            _replace_symlink(self.previous_link_path, os.path.join("releases", previous_release_id))
+        _replace_symlink(self.current_link_path, os.path.join("releases", release_id))
+
+        return previous_release_id
+
+    # .................................................................................................................
+
+    def _remove_release(self, release_id):
+
+        release_folder_path = self._get_release_folder_path(release_id)
+        marker_path = self._get_ready_marker_path(release_id)
+        if os.path.exists(marker_path):
+            os.remove(marker_path)
+
+        if os.path.exists(release_folder_path):
+            try:
+                self.git_writer.remove_worktree(release_folder_path)
+            except AttributeError:
+                pass
+            shutil.rmtree(release_folder_path, ignore_errors=True)
+
+    # .................................................................................................................
+
+    def _read_link_release_id(self, link_path):
+        try:
+            return os.path.basename(os.readlink(link_path).rstrip(os.sep))
+        except OSError:
+            return None
+
+    # .................................................................................................................
+
+    def _is_release_ready(self, release_id):
+        return os.path.exists(self._get_ready_marker_path(release_id)) \
+               and os.path.isdir(self._get_release_folder_path(release_id))
+
+    # .................................................................................................................
+
+    def _get_release_folder_path(self, release_id):
+        return os.path.join(self.releases_folder_path, release_id)
+
+    # .................................................................................................................
+
+    def _get_ready_marker_path(self, release_id):
+        return os.path.join(self.releases_folder_path, "{}.ready".format(release_id))
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def _replace_symlink(link_path, target_path):
+
+    ''' Helper which (re-)points a symlink, such that anything reading the link sees either the old or new target '''
+
+    # Create the new link under a temporary name, then rename it over the old one (rename is atomic)
+    tmp_link_path = "{}.tmp-{}".format(link_path, os.getpid())
+    if os.path.lexists(tmp_link_path):
+        os.remove(tmp_link_path)
+    os.symlink(target_path, tmp_link_path)
+    os.replace(tmp_link_path, link_path)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    from local.lib.environment import get_deploy_root
+
+    # Show the state of the releases, without changing anything
+    ex_manager = Release_Manager(None, get_deploy_root())
+    print("", "Release status:", ex_manager.get_status(), sep="\n")
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import functools
+import hashlib
+import re
+import threading
+import time
+
+import datetime as dt
+
+from collections import OrderedDict
+from email.utils import formatdate
+
+from flask import Response, make_response, request
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Response_Cache:
+
+    '''
+    Stores finished (200) responses for read-mostly routes, in a bounded LRU.
+    Entries are re-used while a cheap 'validator' (e.g. a file stat signature or timestamp of the underlying data)
+    is unchanged and/or until a time-to-live runs out. Responses get a strong ETag (hash of the body) and
+    Last-Modified header, so repeat requests with If-None-Match/If-Modified-Since get a 304 without re-running
+    the route at all
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, max_entries=128):
+
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0}
+
+    # .................................................................................................................
+
+    def cached(self, validator_func=None, ttl_sec=None, max_age_func=None, bypass_func=None, serve_func=None):
+
+        '''
+        Decorator for flask routes (place it below the @route decorator). Cached entries are re-used while:
+            - validator_func() returns the same value as when the entry was stored (if given)
+              (returning None means the data can't be validated right now, so the route runs uncached)
+            - the entry is younger than ttl_sec (if given)
+        The Cache-Control max-age sent to clients is max_age_func() (if given), otherwise the remaining ttl
+        If bypass_func() returns True, the route runs normally without touching the cache
+        If given, serve_func(response) is called on every full (200) response served from the cache, to fill in
+        per-request values (e.g. ages) that would otherwise be frozen into the stored body. The ETag stays tied
+        to the stored body
+        '''
+
+        if validator_func is None and ttl_sec is None:
+            raise ValueError("Need a validator function and/or ttl for cached responses!")
+
+        def decorator(route_func):
+
+            @functools.wraps(route_func)
+            def cached_route(*args, **kwargs):
+
+                # Skip the cache entirely when asked to
+                if bypass_func is not None and bypass_func():
+                    return route_func(*args, **kwargs)
+
+                validator = None
+                if validator_func is not None:
+                    validator = validator_func()
+                    if validator is None:
+                        return route_func(*args, **kwargs)
+
+                # Re-use a stored response, or run the route and store its response
+                cache_key = (request.endpoint, request.full_path)
+                entry = self._get_entry(cache_key, validator, ttl_sec)
+                if entry is None:
+                    response = make_response(route_func(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    entry = _Cache_Entry(response, validator)
+                    self._store_entry(cache_key, entry)
+
+                # Figure out how long clients can use the response without checking back with us
+                if max_age_func is not None:
+                    max_age_sec = max_age_func()
+                elif ttl_sec is not None:
+                    max_age_sec = ttl_sec - entry.get_age_sec()
+                else:
+                    max_age_sec = 0
+
+                response = self._build_response(entry, max_age_sec)
+                if serve_func is not None and response.status_code == 200:
+                    serve_func(response)
+
+                return response
+
+            return cached_route
+
+        return decorator
+
+    # .................................................................................................................
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # .................................................................................................................
+
+    def get_stats(self):
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "max_entries": self.max_entries}
+
+    # .................................................................................................................
+
+    def _get_entry(self, cache_key, validator, ttl_sec):
+
+        ''' Returns a stored entry (marking it as recently used), or None if it's missing/outdated '''
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            is_valid = (entry is not None) \
+                       and (entry.validator == validator) \
+                       and (ttl_sec is None or entry.get_age_sec() < ttl_sec)
+            if not is_valid:
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(cache_key)
+            self._stats["hits"] += 1
+
+        return entry
+
+    # .................................................................................................................
+
+    def _store_entry(self, cache_key, entry):
+
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    # .................................................................................................................
+
+    def _build_response(self, entry, max_age_sec):
+
+        ''' Builds a response from a cached entry, answering with a 304 if the client already has it '''
+
+        # Clients that send both headers should be judged on the ETag alone
+        if_none_match_str = request.headers.get("If-None-Match", "")
+        if if_none_match_str.strip():
+            not_modified = entry.matches_any_etag(if_none_match_str)
+        else:
+            not_modified = entry.is_unmodified_since(request.if_modified_since)
+
+        if not_modified:
+            with self._lock:
+                self._stats["not_modified"] += 1
+            response = Response(status=304)
+        else:
+            response = Response(entry.body, status=200, headers=entry.headers)
+
+        # Headers that let clients (and any proxies) cache & re-validate the response
+        max_age_sec = max(0, int(max_age_sec))
+        response.set_etag(entry.etag)
+        response.headers["Last-Modified"] = entry.last_modified_str
+        response.headers["Cache-Control"] = "max-age={}".format(max_age_sec) if max_age_sec > 0 else "no-cache"
+        response.headers["Age"] = str(int(entry.get_age_sec()))
+
+        return response
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class _Cache_Entry:
+
+    ''' Storage for a single cached response '''
+
+    # .................................................................................................................
+
+    def __init__(self, response, validator):
+
+        self.validator = validator
+        self.body = response.get_data()
+        self.headers = [(each_key, each_value) for each_key, each_value in response.headers.items()
+                        if each_key.lower() not in ("content-length", "etag", "last-modified", "date")]
+
+        # Strong ETag, since the stored body bytes are served exactly as-is
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]
+
+        # HTTP dates only have 1 second resolution, so keep the truncated time for comparisons
+        self.created_mono = time.monotonic()
+        self.last_modified_sec = int(time.time())
+        self.last_modified_str = formatdate(self.last_modified_sec, usegmt=True)
+
+    # .................................................................................................................
+
+    def get_age_sec(self):
+        return time.monotonic() - self.created_mono
+
+    # .................................................................................................................
+
+    def matches_any_etag(self, if_none_match_str):
+
+        '''
+        Checks an If-None-Match header value (a comma-separated list of ETags, or "*") against the entry's ETag.
+        Uses the weak comparison that If-None-Match calls for: a 'W/' prefix is ignored, but the tag must match exactly
+        '''
+
+        if if_none_match_str.strip() == "*":
+            return True
+
+        for quoted_tag, unquoted_tag in _ETAG_LIST_REGEX.findall(if_none_match_str):
+            if (quoted_tag or unquoted_tag) == self.etag:
+                return True
+
+        return False
+
+    # .................................................................................................................
+
+    def is_unmodified_since(self, if_modified_since_dt):
+
+        ''' Checks an If-Modified-Since (datetime) header value against the entry's creation time '''
+
+        if if_modified_since_dt is None:
+            return False
+
+        # Older versions of werkzeug give naive datetimes (in UTC)
+        if if_modified_since_dt.tzinfo is None:
+            if_modified_since_dt = if_modified_since_dt.replace(tzinfo=dt.timezone.utc)
+
+        return self.last_modified_sec <= if_modified_since_dt.timestamp()
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Picks out each (optionally weak) tag in an If-None-Match list, e.g. 'W/"abc", "d,ef"' -> abc, d,ef
+# -> Quoted tags may contain commas, unquoted tags (sent by some non-compliant clients) may not
+_ETAG_LIST_REGEX = re.compile(r'(?:W/)?(?:"([^"]*)"|([^\s,"]+))')
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    from flask import Flask
+
+    # Serve a slow route through the cache, and check that repeat/conditional requests skip the slow part
+    ex_app = Flask(__name__)
+    ex_cache = Response_Cache(max_entries=8)
+
+    @ex_app.route("/slow")
+    @ex_cache.cached(ttl_sec=10)
+    def slow_route():
+        time.sleep(0.25)
+        return "some slow result"
+
+    with ex_app.test_client() as ex_client:
+        for ex_headers in ({}, {}, {"If-None-Match": '"not-a-match"'}):
+            t1 = time.perf_counter()
+            ex_response = ex_client.get("/slow", headers=ex_headers)
+            t2 = time.perf_counter()
+            print(ex_response.status_code, ex_response.headers.get("ETag"), "({:.1f} ms)".format(1000 * (t2 - t1)))
+
+        ex_response = ex_client.get("/slow", headers={"If-None-Match": ex_response.headers["ETag"]})
+        print(ex_response.status_code, ex_response.headers.get("Cache-Control"), ex_cache.get_stats())
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -6,53 +6,16 @@ Created on Wed May 26 2021
 """
 
 
-# ---------------------------------------------------------------------------------------------------------------------
-#%% Add local path
-
-import os
-import sys
-
-def find_path_to_local(target_folder = "local"):
-    '''Finds the path to the local folder so that local imports work properly'''
-
-    # Skip path finding if we successfully import the dummy file
-    try:
-        from local.dummy import dummy_func
-        dummy_func()
-        return
-    except ImportError:
-        print("", "Couldn't find local directory!", "Searching for path...", sep="\n")
-
-    # Figure out where this file is located so we can work backwards to find the target folder
-    file_directory = os.path.dirname(os.path.abspath(__file__))
-    path_check = []
-
-    # Check parent directories to see if we hit the main project directory containing the target folder
-    prev_working_path = working_path = file_directory
-    while True:
-        # If we find the target folder in the given directory, add it to the python path (if it's not already there)
-        if target_folder in os.listdir(working_path):
-            if working_path not in sys.path:
-                tilde_swarm = "~"*(4 + len(working_path))
-                print("\n{0}\nPython path updated:\n  {1}\n{0}".format(tilde_swarm, working_path))
-                sys.path.append(working_path)
-            break
-
-        # Stop if we hit the filesystem root directory (parent directory isn't changing)
-        prev_working_path, working_path = working_path, os.path.dirname(working_path)
-        path_check.append(prev_working_path)
-        if prev_working_path == working_path:
-            print("\nTried paths:", *path_check, "", sep="\n  ")
-            raise ImportError("Can't find '{}' directory!".format(target_folder))
-
-find_path_to_local()
-
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Imports
 
+import os
 import signal
 
+from local.eolib.utils.executor import set_process_listener
 from local.eolib.utils.use_git import Git_Reader
+from local.eolib.utils.git_direct import find_git_folders, get_folder_tree_signature
+from local.lib.metrics import METRICS
 
 # .....................................................................................................................
 # .....................................................................................................................
@@ -89,9 +52,69 @@ def force_server_shutdown():
 # .....................................................................................................................
 
 def check_git_version():
-    
-    ''' Helper function used to generate versioning info to be displayed on main web page '''
-    
+
+    '''
+    Helper function used to generate versioning info to be displayed on main web page
+    Results are cached until the git HEAD/refs change on disk, so repeat calls don't need to run git
+    '''
+
+    global _GIT_VERSION_CACHE
+
+    # Re-use the previous result if nothing in the repo has moved since then
+    git_state = get_git_state_signature()
+    cached_state, cached_version = _GIT_VERSION_CACHE
+    if (git_state is not None) and (git_state == cached_state):
+        return cached_version
+
+    version_info = _read_git_version()
+    _GIT_VERSION_CACHE = (git_state, version_info)
+
+    return version_info
+
+# .....................................................................................................................
+
+def get_git_state_signature():
+
+    '''
+    Returns a tuple that changes whenever the checked out commit (or its tags) could have changed,
+    based only on file stats: .git/HEAD, the ref it points to, packed-refs and the loose tags folders
+    (including sub-folders, e.g. refs/tags/release/). Returns None if the git folder can't be read
+    '''
+
+    try:
+        # Worktrees have their own HEAD, but refs are stored in the main repo's (common) git folder
+        git_folder_path, common_folder_path = find_git_folders(GIT_READER.git_folder_parent_path)
+        head_path = os.path.join(git_folder_path, "HEAD")
+        with open(head_path, "r") as in_file:
+            head_str = in_file.read().strip()
+
+        # HEAD is either a commit id (detached) or something like: "ref: refs/heads/master"
+        check_paths = [head_path, os.path.join(common_folder_path, "packed-refs")]
+        if head_str.startswith("ref:"):
+            check_paths.append(os.path.join(common_folder_path, head_str[4:].strip()))
+
+        signature_list = [head_str]
+        for each_path in check_paths:
+            try:
+                path_stat = os.stat(each_path)
+                signature_list.append((path_stat.st_mtime_ns, path_stat.st_size, path_stat.st_ino))
+            except FileNotFoundError:
+                signature_list.append(None)
+
+        # Adding a tag only changes the modified time of the folder holding it, which may be a sub-folder
+        signature_list.append(get_folder_tree_signature(os.path.join(common_folder_path, "refs", "tags")))
+
+    except (OSError, TypeError):
+        return None
+
+    return tuple(signature_list)
+
+# .....................................................................................................................
+
+def _read_git_version():
+
+    ''' Reads the current version info using git (uncached, see check_git_version) '''
+
     # Initialize output in case of errors
     is_valid = False
     version_indicator_str = "unknown"
@@ -128,5 +151,35 @@ def check_git_version():
 # Set up git repo access
 GIT_READER = Git_Reader(None)
 
+# Record every subprocess (git, ping, ssh etc.) in the server metrics
+set_process_listener(METRICS.record_subprocess)
+
+# Holds (git state signature, version info), see check_git_version()
+_GIT_VERSION_CACHE = (None, None)
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    import time
+
+    # Compare the cost of reading the version with & without the cache
+    num_repeats = 20
+    t_start = time.perf_counter()
+    for _ in range(num_repeats):
+        _read_git_version()
+    uncached_ms = 1000 * (time.perf_counter() - t_start) / num_repeats
+
+    check_git_version()
+    t_start = time.perf_counter()
+    for _ in range(num_repeats):
+        check_git_version()
+    cached_ms = 1000 * (time.perf_counter() - t_start) / num_repeats
+
+    print("", "Version:", check_git_version(), sep="\n")
+    print("Uncached: {:.3f} ms per call".format(uncached_ms))
+    print("Cached:   {:.3f} ms per call".format(cached_ms))
+
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Scrap
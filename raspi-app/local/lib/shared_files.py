@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import fcntl
+import json
+import os
+import threading
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class File_Lock:
+
+    '''
+    Lock that works across processes (e.g. prefork workers) as well as threads, using flock on a lock file.
+    The lock is released by the OS if the process holding it dies, so a crashed worker can't leave it held.
+    Use as a context manager: with File_Lock(path): ...
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, lock_path):
+
+        self.lock_path = lock_path
+
+        # flock only excludes other open files, so threads in the same process also need to take turns
+        self._thread_lock = threading.Lock()
+        self._lock_file = None
+
+    # .................................................................................................................
+
+    def __enter__(self):
+
+        self._thread_lock.acquire()
+        try:
+            self._lock_file = open(self.lock_path, "a")
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self._close()
+            raise
+
+        return self
+
+    # .................................................................................................................
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self._close()
+
+    # .................................................................................................................
+
+    def _close(self):
+
+        # Closing the file releases the flock
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        self._thread_lock.release()
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def save_json(file_path, data):
+
+    ''' Saves data to a json file, through a temporary file, so readers never see a half-written file '''
+
+    temp_path = "{}.{}.tmp".format(file_path, os.getpid())
+    with open(temp_path, "w") as out_file:
+        json.dump(data, out_file)
+    os.replace(temp_path, file_path)
+
+# .....................................................................................................................
+
+def load_json(file_path, default=None):
+
+    ''' Loads data from a json file, returning the default if the file doesn't exist (or can't be read) '''
+
+    try:
+        with open(file_path, "r") as in_file:
+            return json.load(in_file)
+    except (OSError, ValueError):
+        return default
+
+# .....................................................................................................................
+
+def is_process_alive(pid):
+
+    ''' Checks if a process (e.g. another worker) is still running '''
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    import tempfile
+    import time
+
+    # Forked processes each add to a shared counter file, which only works if they take turns
+    with tempfile.TemporaryDirectory() as ex_folder_path:
+        counter_path = os.path.join(ex_folder_path, "counter.json")
+        ex_lock = File_Lock(os.path.join(ex_folder_path, "counter.lock"))
+        save_json(counter_path, 0)
+
+        child_pids = []
+        for _ in range(4):
+            child_pid = os.fork()
+            if child_pid == 0:
+                for _ in range(50):
+                    with ex_lock:
+                        count = load_json(counter_path)
+                        time.sleep(0.0001)
+                        save_json(counter_path, count + 1)
+                os._exit(0)
+            child_pids.append(child_pid)
+
+        for each_pid in child_pids:
+            os.waitpid(each_pid, 0)
+
+        print("Count: {} (expecting 200)".format(load_json(counter_path)))
+        print("Children alive:", [is_process_alive(each_pid) for each_pid in child_pids])
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
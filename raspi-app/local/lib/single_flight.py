@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import functools
+import threading
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class _Flight:
+
+    ''' Holds the outcome of a single (in-flight) call, shared with every caller waiting on it '''
+
+    def __init__(self):
+        self.done_event = threading.Event()
+        self.result = None
+        self.error = None
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Single_Flight_Group:
+
+    '''
+    Coalesces concurrent calls that would do the same work (e.g. three clients asking for an nmap scan
+    of the same host at once). The first caller for a key runs the function, callers that arrive while
+    it's still running wait for it & get the same result (or error) back, rather than starting their own.
+    Nothing is cached: once a call finishes, the next call for the same key runs the function again.
+    Note that waiting callers all get the same result object, so it should be treated as read-only!
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._counts = {}
+
+    # .................................................................................................................
+
+    def call(self, key, func, *args, **kwargs):
+
+        '''
+        Runs func(*args, **kwargs), unless a call with the same key is already running, in which case
+        we wait for that call to finish and return its result (or raise its error) instead.
+        If the running call is interrupted (e.g. KeyboardInterrupt), waiting callers get a RuntimeError.
+        The key should be hashable, with the operation name as its first entry, e.g. ("nmap", host)
+        '''
+
+        with self._lock:
+            flight = self._flights.get(key)
+            is_leader = (flight is None)
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+
+            operation_counts = self._counts.setdefault(key[0], {"executed": 0, "coalesced": 0})
+            operation_counts["executed" if is_leader else "coalesced"] += 1
+
+        # Wait on the call that's already running
+        if not is_leader:
+            flight.done_event.wait()
+            if isinstance(flight.error, Exception):
+                raise flight.error
+            if flight.error is not None:
+                # Don't pass on things like KeyboardInterrupt/SystemExit, which were meant for the leader's thread
+                error_name = type(flight.error).__name__
+                raise RuntimeError("Coalesced call was interrupted ({})".format(error_name)) from flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args, **kwargs)
+
+        except BaseException as err:
+            flight.error = err
+            raise
+
+        finally:
+            # Remove the flight before waking the waiters, so later callers start a new call
+            with self._lock:
+                del self._flights[key]
+            flight.done_event.set()
+
+        return flight.result
+
+    # .................................................................................................................
+
+    def coalesce(self, operation_name):
+
+        '''
+        Decorator which coalesces concurrent calls to a function. Calls are keyed by
+        (operation_name, args, kwargs), so only calls with identical arguments share a result
+        '''
+
+        def decorator(func):
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (operation_name, args, tuple(sorted(kwargs.items())))
+                return self.call(key, func, *args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    # .................................................................................................................
+
+    def get_counts(self):
+
+        '''
+        Returns the number of calls that ran the function ('executed') vs. waited on another call
+        ('coalesced'), per operation, as a dictionary: {operation: {"executed": int, "coalesced": int}}
+        '''
+
+        with self._lock:
+            return {each_op: dict(each_counts) for each_op, each_counts in self._counts.items()}
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Shared by everything that probes the remote host, so callers from different modules coalesce with each other
+SINGLE_FLIGHT = Single_Flight_Group()
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Deliberately slow stand-in for a probe, which counts how often it really runs
+    num_probes = []
+    ex_group = Single_Flight_Group()
+
+    @ex_group.coalesce("slow_probe")
+    def slow_probe(host, timeout_ms=100):
+        num_probes.append(host)
+        time.sleep(0.5)
+        if host == "bad-host":
+            raise OSError("Can't reach {}".format(host))
+        return {"host": host, "is_online": True}
+
+    # Five concurrent calls for one host should run the probe once & share its result
+    with ThreadPoolExecutor(5) as pool:
+        results = list(pool.map(lambda _: slow_probe("desktop"), range(5)))
+    print("", "Probes run: {} (for 5 calls)".format(len(num_probes)), sep="\n")
+    print("Shared result:", all(each_result is results[0] for each_result in results))
+
+    # Different arguments don't coalesce
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda timeout_ms: slow_probe("desktop", timeout_ms=timeout_ms), (100, 200)))
+    print("Probes run: {} (after 2 calls with different timeouts)".format(len(num_probes)))
+
+    # Errors are shared too
+    def call_bad_host(_):
+        try:
+            return slow_probe("bad-host")
+        except OSError as err:
+            return "error: {}".format(err)
+    with ThreadPoolExecutor(3) as pool:
+        print("Errors:", list(pool.map(call_bad_host, range(3))))
+
+    # Calls made after the first one finishes run again (nothing is cached)
+    slow_probe("desktop")
+    print("Probes run: {}".format(len(num_probes)))
+    print("Counts:", ex_group.get_counts())
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -8,85 +8,361 @@ Created on Tue Jul 1 2021
 
 
 # ---------------------------------------------------------------------------------------------------------------------
-#%% Add local path
+#%% Imports
 
 import os
-import sys
+import codecs
+import hashlib
+import socket
+import threading
+import time
 
-def find_path_to_local(target_folder = "local"):
-    '''Finds the path to the local folder so that local imports work properly'''
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-    # Skip path finding if we successfully import the dummy file
-    try:
-        from local.dummy import dummy_func
-        dummy_func()
-        return
-    except ImportError:
-        print("", "Couldn't find local directory!", "Searching for path...", sep="\n")
-
-    # Figure out where this file is located so we can work backwards to find the target folder
-    file_directory = os.path.dirname(os.path.abspath(__file__))
-    path_check = []
-
-    # Check parent directories to see if we hit the main project directory containing the target folder
-    prev_working_path = working_path = file_directory
-    while True:
-        # If we find the target folder in the given directory, add it to the python path (if it's not already there)
-        if target_folder in os.listdir(working_path):
-            if working_path not in sys.path:
-                tilde_swarm = "~"*(4 + len(working_path))
-                print("\n{0}\nPython path updated:\n  {1}\n{0}".format(tilde_swarm, working_path))
-                sys.path.append(working_path)
-            break
-
-        # Stop if we hit the filesystem root directory (parent directory isn't changing)
-        prev_working_path, working_path = working_path, os.path.dirname(working_path)
-        path_check.append(prev_working_path)
-        if prev_working_path == working_path:
-            print("\nTried paths:", *path_check, "", sep="\n  ")
-            raise ImportError("Can't find '{}' directory!".format(target_folder))
-
-find_path_to_local()
+from local.eolib.utils.executor import run_process, stream_process
+from local.lib.environment import get_ssh_control_dir, get_ssh_control_persist_sec
+
+# .....................................................................................................................
+# .....................................................................................................................
 
 # ---------------------------------------------------------------------------------------------------------------------
-#%% Imports
+#%% Define classes
 
-import subprocess
+class SSH_Session_Manager:
+
+    '''
+    Runs commands over ssh, re-using one authenticated master connection per (user, host, port)
+    through OpenSSH connection multiplexing (ControlMaster/ControlPersist). Only the first command to a host
+    pays for the key exchange & authentication, later (and concurrent) commands open a new channel on the
+    existing connection. Assumes key-based ssh access has already been set up for the given user
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, control_dir=None, control_persist_sec=None, connect_timeout_sec=5,
+                 ssh_executable="ssh", extra_options=()):
+
+        self.control_dir = get_ssh_control_dir() if control_dir is None else control_dir
+        self.control_persist_sec = get_ssh_control_persist_sec() if control_persist_sec is None else control_persist_sec
+        self.connect_timeout_sec = connect_timeout_sec
+        self.ssh_executable = ssh_executable
+        self.extra_options = list(extra_options)
+
+        # One lock per destination, so only one thread at a time sets up a master connection to it
+        self._locks_lock = threading.Lock()
+        self._master_locks = {}
+
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+
+    # .................................................................................................................
+
+    def run_command(self, host, user, cmd, port=22, timeout_sec=10):
+
+        '''
+        Runs a single command on the host and waits for it to finish, or for the timeout to run out
+        (in which case the local ssh process is killed). Safe to call from several threads at once
+
+        Returns a dictionary:
+            {"exit_status": int | None, "stdout": str, "stderr": str, "duration_ms": float, "timed_out": bool}
+        '''
+
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + timeout_sec
+        self.ensure_master(host, user, port, timeout_sec)
+
+        # The executor kills the whole process group on timeout (not just the top-level process)
+        remaining_sec = max(0, deadline - time.monotonic())
+        ssh_result = run_process(self.build_command(host, user, cmd, port), "ssh", remaining_sec)
+
+        return {"exit_status": ssh_result["returncode"],
+                "stdout": ssh_result["stdout"].decode("utf-8", errors="replace"),
+                "stderr": ssh_result["stderr"].decode("utf-8", errors="replace"),
+                "duration_ms": round(1000 * (time.perf_counter() - start_time), 3),
+                "timed_out": ssh_result["timed_out"]}
+
+    # .................................................................................................................
+
+    def stream_command(self, host, user, cmd, port=22, timeout_sec=300, chunk_size=4096):
+
+        '''
+        Runs a command on the host, yielding its output as it arrives, as ("stdout" | "stderr", text) tuples.
+        The last item is ("exit", {"exit_status", "duration_ms", "timed_out", "stdout_bytes", "stderr_bytes"}).
+        Output is read in chunks of at most chunk_size bytes and handed off right away, so memory use doesn't
+        depend on how much the command prints. Closing the generator early kills the command
+        '''
+
+        start_time = time.perf_counter()
+        deadline = time.monotonic() + timeout_sec
+        self.ensure_master(host, user, port, timeout_sec)
+
+        # The executor reads whichever pipe has data, without ever blocking on one while the other fills up
+        remaining_sec = max(0, deadline - time.monotonic())
+        ssh_iter = stream_process(self.build_command(host, user, cmd, port), "ssh", remaining_sec,
+                                  chunk_size=chunk_size)
+        decoders = {each_name: codecs.getincrementaldecoder("utf-8")(errors="replace")
+                    for each_name in ("stdout", "stderr")}
+        byte_counts = {"stdout": 0, "stderr": 0}
+
+        try:
+            for pipe_name, data in ssh_iter:
+                if pipe_name == "exit":
+                    ssh_result = data
+                    continue
+
+                byte_counts[pipe_name] += len(data)
+                text = decoders[pipe_name].decode(data)
+                if text:
+                    yield pipe_name, text
+
+        finally:
+            # Closing this generator early closes the executor's as well, which kills the command
+            ssh_iter.close()
+
+        yield "exit", {"exit_status": ssh_result["returncode"],
+                       "duration_ms": round(1000 * (time.perf_counter() - start_time), 3),
+                       "timed_out": ssh_result["timed_out"],
+                       "stdout_bytes": byte_counts["stdout"],
+                       "stderr_bytes": byte_counts["stderr"]}
+
+    # .................................................................................................................
+
+    def fan_out(self, destinations, cmd, max_concurrency=4, timeout_sec=60):
+
+        '''
+        Runs the same command on several hosts at once (at most max_concurrency at a time).
+        destinations is a list of {"host", "user", "port"} dictionaries (see parse_ssh_destination).
+        Yields ("host_result", {...}) as each host finishes (in order of completion, not submission),
+        then a final ("summary", {...}) comparing the total wall time to the sum of the per-host times
+        '''
+
+        start_time = time.perf_counter()
+        worker_pool = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="ssh-fan-out")
+        try:
+            future_to_dest = {}
+            for each_dest in destinations:
+                each_future = worker_pool.submit(self.run_command, each_dest["host"], each_dest["user"], cmd,
+                                                 each_dest["port"], timeout_sec)
+                future_to_dest[each_future] = each_dest
+
+            num_succeeded = 0
+            sum_ms = 0
+            for each_future in as_completed(future_to_dest):
+                each_dest = future_to_dest[each_future]
+                try:
+                    each_result = each_future.result()
+                except OSError as err:
+                    each_result = {"exit_status": None, "stdout": "", "stderr": str(err),
+                                   "duration_ms": 0, "timed_out": False}
+
+                sum_ms += each_result["duration_ms"]
+                num_succeeded += int(each_result["exit_status"] == 0)
+                yield "host_result", {**each_dest, **each_result}
+
+        finally:
+            # If we're stopped early, don't start any more hosts (running ones stop at their own timeout)
+            for each_future in future_to_dest:
+                each_future.cancel()
+            worker_pool.shutdown(wait=False)
+
+        wall_ms = round(1000 * (time.perf_counter() - start_time), 3)
+        yield "summary", {"hosts": len(destinations),
+                          "succeeded": num_succeeded,
+                          "failed": len(destinations) - num_succeeded,
+                          "wall_ms": wall_ms,
+                          "sum_host_ms": round(sum_ms, 3),
+                          "speedup": round(sum_ms / wall_ms, 2) if wall_ms > 0 else None}
+
+    # .................................................................................................................
+
+    def build_command(self, host, user, cmd, port=22):
+
+        ''' Returns the ssh command list for running cmd through the (shared) master connection '''
+
+        return [self.ssh_executable, *self._get_options(host, user, port), "-o", "ControlMaster=no",
+                "{}@{}".format(user, host), cmd]
+
+    # .................................................................................................................
+
+    def ensure_master(self, host, user, port=22, timeout_sec=None):
+
+        '''
+        Starts a background master connection to the host, unless one is already running.
+        The master is started on its own (with no pipes attached), since a ControlPersist master spawned
+        by a regular command keeps that command's output pipes open for as long as it lives
+        '''
+
+        # Quick check without spawning anything, by connecting to the control socket
+        control_path = self._get_control_path(host, user, port)
+        if _is_master_running(control_path):
+            return True
+
+        timeout_sec = self.connect_timeout_sec if timeout_sec is None else timeout_sec
+        with self._get_master_lock(host, user, port):
+
+            # Another thread may have started the master while we were waiting for the lock
+            if _is_master_running(control_path):
+                return True
+
+            # A master that died without cleaning up (e.g. killed, or the pi lost power) leaves its socket behind,
+            # which ssh would refuse to replace
+            _remove_stale_socket(control_path)
+
+            master_command = [self.ssh_executable, *self._get_options(host, user, port),
+                              "-o", "ControlMaster=yes", "-N", "-f", "{}@{}".format(user, host)]
+            run_process(master_command, "ssh_master", timeout_sec, capture_output=False)
+
+        # If this failed, commands still work (each one connecting on its own), just slower
+        return _is_master_running(control_path)
+
+    # .................................................................................................................
+
+    def close(self, host, user, port=22):
+
+        ''' Shuts down the master connection to the host, if there is one '''
+
+        control_path = self._get_control_path(host, user, port)
+        if not _is_master_running(control_path):
+            _remove_stale_socket(control_path)
+            return
+
+        exit_command = [self.ssh_executable, "-o", "ControlPath={}".format(control_path), "-O", "exit",
+                        "{}@{}".format(user, host)]
+        run_process(exit_command, "ssh_master", self.connect_timeout_sec, capture_output=False)
+
+    # .................................................................................................................
+
+    def _get_options(self, host, user, port):
+
+        return ["-p", str(port),
+                "-o", "BatchMode=yes",
+                "-o", "ConnectTimeout={}".format(int(self.connect_timeout_sec)),
+                "-o", "ControlPath={}".format(self._get_control_path(host, user, port)),
+                "-o", "ControlPersist={}".format(int(self.control_persist_sec)),
+                *self.extra_options]
+
+    # .................................................................................................................
+
+    def _get_control_path(self, host, user, port):
+
+        # Hash the destination, since unix socket paths have a short length limit
+        destination_hash = hashlib.sha1("{}@{}:{}".format(user, host, port).encode("utf-8")).hexdigest()[:16]
+
+        return os.path.join(self.control_dir, "cm-{}".format(destination_hash))
+
+    # .................................................................................................................
+
+    def _get_master_lock(self, host, user, port):
+
+        destination_key = (user, host, port)
+        with self._locks_lock:
+            master_lock = self._master_locks.get(destination_key)
+            if master_lock is None:
+                master_lock = self._master_locks[destination_key] = threading.Lock()
+
+        return master_lock
+
+    # .................................................................................................................
+    # .................................................................................................................
 
-# .....................................................................................................................
-# .....................................................................................................................
 
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Network functions
 
+def get_ssh_manager():
+    '''Returns the (shared) ssh session manager, so all commands to a host share one master connection'''
+
+    global _SSH_MANAGER
+
+    with _SSH_MANAGER_LOCK:
+        if _SSH_MANAGER is None:
+            _SSH_MANAGER = SSH_Session_Manager()
+
+    return _SSH_MANAGER
+
+# .....................................................................................................................
+
+def parse_ssh_destination(destination_str, default_user=None, default_port=22):
+    '''Converts a "user@host:port" string (user & port are optional) into a {"host", "user", "port"} dictionary'''
+
+    user = default_user
+    host_port = destination_str.strip()
+    if "@" in host_port:
+        user, host_port = host_port.split("@", 1)
+
+    host, port = host_port, default_port
+    if ":" in host_port:
+        host, port_str = host_port.rsplit(":", 1)
+        port = int(port_str)
+
+    return {"host": host, "user": user, "port": port}
+
+# .....................................................................................................................
+
 def run_single_command(host, user, cmd, port=22, timeout=1):
     '''
     Runs a single command on the host. Assumes SSH access has been set up with a key for the given user
+    Returns the lines of output of the command (see SSH_Session_Manager.run_command for exit status/stderr)
     '''
 
-    ssh_connection_string = user + "@" + host + ":" + port
-    ssh_command = ["ssh", "-o", "ConnectionTimeout=" + str(timeout), ssh_connection_string, cmd]
+    result = get_ssh_manager().run_command(host, user, cmd, port, timeout_sec=timeout)
 
-    conn = subprocess.Popen(ssh_command, shell=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE)
+    return result["stdout"].splitlines()
 
-    response = conn.stdout.readlines()
+# .....................................................................................................................
 
-    return response
+def _is_master_running(control_path):
+    '''
+    Checks if a master connection is listening on the control socket, by connecting to it (without spawning ssh).
+    A socket file can outlive its master (e.g. if the master was killed), so the file existing isn't enough
+    '''
+
+    control_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        control_sock.settimeout(1)
+        control_sock.connect(control_path)
+    except OSError:
+        return False
+    finally:
+        control_sock.close()
+
+    return True
+
+# .....................................................................................................................
+
+def _remove_stale_socket(control_path):
+    '''Deletes a control socket left behind by a master that is no longer running (if there is one)'''
+
+    try:
+        os.unlink(control_path)
+    except FileNotFoundError:
+        pass
 
 # .....................................................................................................................
 # .....................................................................................................................
 
 
 # ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Created on first use, see get_ssh_manager()
+_SSH_MANAGER = None
+_SSH_MANAGER_LOCK = threading.Lock()
 
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Demo
 
 if __name__ == "__main__":
 
-    pass
+    from local.lib.environment import get_remote_host, get_remote_ssh_user, get_remote_ssh_port
+
+    # Run a few commands on the remote host, only the first one should pay for setting up the connection
+    # (see tests/test_ssh.py for checks using a stand-in for ssh, which don't need a remote host)
+    ex_manager = get_ssh_manager()
+    ex_host, ex_user, ex_port = get_remote_host(), get_remote_ssh_user(), get_remote_ssh_port()
+    for _ in range(3):
+        ex_result = ex_manager.run_command(ex_host, ex_user, "hostname", ex_port, timeout_sec=5)
+        print("Exit status: {} | {} ms".format(ex_result["exit_status"], ex_result["duration_ms"]))
+    ex_manager.close(ex_host, ex_user, ex_port)
 
 
 # ---------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import random
+import threading
+import time
+
+from collections import deque
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Latency_Stats:
+
+    ''' Thread-safe record of recent call latencies, used to report simple summary stats '''
+
+    # .................................................................................................................
+
+    def __init__(self, max_samples=256):
+
+        self._lock = threading.Lock()
+        self._samples_ms = deque(maxlen=max_samples)
+        self.num_calls = 0
+        self.num_errors = 0
+        self.num_retries = 0
+
+    # .................................................................................................................
+
+    def record(self, duration_ms, is_error, num_retries):
+        with self._lock:
+            self._samples_ms.append(duration_ms)
+            self.num_calls += 1
+            self.num_errors += int(is_error)
+            self.num_retries += num_retries
+
+    # .................................................................................................................
+
+    def summarize(self):
+
+        with self._lock:
+            sorted_samples = sorted(self._samples_ms)
+            summary = {"calls": self.num_calls, "errors": self.num_errors, "retries": self.num_retries}
+
+        def percentile(fraction):
+            idx = min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))
+            return round(sorted_samples[idx], 3)
+
+        if sorted_samples:
+            summary.update({"mean_ms": round(sum(sorted_samples) / len(sorted_samples), 3),
+                            "p50_ms": percentile(0.50),
+                            "p95_ms": percentile(0.95),
+                            "max_ms": round(sorted_samples[-1], 3)})
+
+        return summary
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Upstream_Client:
+
+    '''
+    Shared HTTP client for calls from this server to another one (e.g. the ubuntu-app on the desktop).
+    Keeps connections alive in a pool, always uses explicit connect/read timeouts and retries failed
+    connection attempts (only, since the request never reached the server) with jittered backoff
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, base_url, connect_timeout_sec=1.0, read_timeout_sec=5.0,
+                 max_retries=2, backoff_sec=0.1, pool_size=4):
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout_sec, read_timeout_sec)
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+
+        # Requests is slow to import (it's most of our startup time), so it isn't loaded until a client is needed
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        # Retries are handled here (with jitter) rather than by urllib3
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._stats_lock = threading.Lock()
+        self._stats_by_name = {}
+
+    # .................................................................................................................
+
+    def get(self, path, stats_name=None, **request_kwargs):
+
+        '''
+        Sends a GET request to base_url + path. Returns a requests.Response
+        Raises the usual requests exceptions (ConnectionError, Timeout) once retries are exhausted
+        '''
+
+        return self.request("GET", path, stats_name, **request_kwargs)
+
+    # .................................................................................................................
+
+    def request(self, method, path, stats_name=None, **request_kwargs):
+
+        # Already loaded when the client was created
+        import requests
+
+        # For clarity
+        url = self.base_url + path
+        stats_name = path if stats_name is None else stats_name
+        request_kwargs.setdefault("timeout", self.timeout)
+
+        start_time = time.perf_counter()
+        num_retries = 0
+        try:
+            while True:
+                try:
+                    response = self._session.request(method, url, **request_kwargs)
+                    break
+
+                except requests.exceptions.RequestException as err:
+                    # Only retry if we never managed to connect, otherwise the server may have acted on the request
+                    if num_retries >= self.max_retries or not is_connect_failure(err):
+                        raise
+                    num_retries += 1
+                    backoff_sec = self.backoff_sec * (2 ** (num_retries - 1))
+                    time.sleep(backoff_sec * random.uniform(0.5, 1.5))
+
+        except requests.exceptions.RequestException:
+            self._record(stats_name, start_time, True, num_retries)
+            raise
+
+        self._record(stats_name, start_time, False, num_retries)
+
+        return response
+
+    # .................................................................................................................
+
+    def get_stats(self):
+
+        ''' Returns latency stats for each type of call made through the client so far '''
+
+        with self._stats_lock:
+            stats_items = list(self._stats_by_name.items())
+
+        return {each_name: each_stats.summarize() for each_name, each_stats in stats_items}
+
+    # .................................................................................................................
+
+    def close(self):
+        self._session.close()
+
+    # .................................................................................................................
+
+    def _record(self, stats_name, start_time, is_error, num_retries):
+
+        duration_ms = 1000 * (time.perf_counter() - start_time)
+        with self._stats_lock:
+            stats = self._stats_by_name.get(stats_name)
+            if stats is None:
+                stats = self._stats_by_name[stats_name] = Latency_Stats()
+        stats.record(duration_ms, is_error, num_retries)
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def is_connect_failure(error):
+    '''Returns True if the error happened before the request could be sent (refused, unreachable, connect timeout)'''
+
+    import requests
+
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+
+    if not isinstance(error, requests.exceptions.ConnectionError):
+        return False
+
+    # Connection errors wrap a urllib3 MaxRetryError, whose 'reason' tells us where it failed
+    wrapped_error = error.args[0] if error.args else None
+    reason = getattr(wrapped_error, "reason", wrapped_error)
+    reason_name = type(reason).__name__
+
+    return reason_name in ("NewConnectionError", "ConnectTimeoutError")
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    import requests
+
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Stub_Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+        def do_GET(self):
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        def log_message(self, *args):
+            pass
+
+    # Run a local stub server, then hit it repeatedly to show keep-alive latency
+    stub_server = ThreadingHTTPServer(("127.0.0.1", 0), Stub_Handler)
+    threading.Thread(target=stub_server.serve_forever, daemon=True).start()
+    stub_url = "http://127.0.0.1:{}".format(stub_server.server_address[1])
+
+    ex_client = Upstream_Client(stub_url)
+    for _ in range(50):
+        ex_client.get("/ping").json()
+    print("Stub server:", ex_client.get_stats())
+
+    # Nothing listening here, so we should see retries then a connection error
+    dead_client = Upstream_Client("http://127.0.0.1:9", max_retries=2)
+    try:
+        dead_client.get("/ping")
+    except requests.exceptions.ConnectionError as err:
+        print("Dead server:", type(err).__name__, dead_client.get_stats())
+
+    stub_server.shutdown()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import time
+
+from local.lib.network import probe_host
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def send_wake_packets(mac_address, repeats=3, repeat_interval_sec=0.1):
+    '''Sends the wake-on-lan magic packet a few times, since a single UDP broadcast can get lost'''
+
+    # Only needed when actually waking the host, so don't load it at startup
+    from wakeonlan import send_magic_packet
+
+    for idx in range(repeats):
+        if idx > 0:
+            time.sleep(repeat_interval_sec)
+        send_magic_packet(mac_address)
+
+    return repeats
+
+# .....................................................................................................................
+
+def get_next_poll_delay(elapsed_sec, previous_delay_sec, boot_window_sec=(5, 45),
+                        sparse_interval_sec=1.0, dense_interval_sec=0.5, backoff_factor=1.5, max_interval_sec=5.0):
+    '''
+    Returns how long to wait before the next online check, given the time since the wake packet was sent:
+        - Before the boot window, the host can't be up yet (unless waking from suspend), so poll sparsely
+        - Inside the boot window, poll densely so we notice the host as soon as it's up
+        - After the boot window, back off exponentially, since the host is probably not coming up
+    '''
+
+    window_start_sec, window_end_sec = boot_window_sec
+    if elapsed_sec < window_start_sec:
+        return min(sparse_interval_sec, window_start_sec - elapsed_sec)
+    if elapsed_sec < window_end_sec:
+        return dense_interval_sec
+
+    return min(max_interval_sec, max(dense_interval_sec, previous_delay_sec) * backoff_factor)
+
+# .....................................................................................................................
+
+def wake_and_wait(mac_address, host, wait_sec, probe_func=None, probe_timeout_ms=250,
+                  packet_repeats=3, boot_window_sec=(5, 45)):
+    '''
+    Sends the wake-on-lan packet, then polls the host (on an adaptive schedule, see get_next_poll_delay)
+    until it comes online or wait_sec runs out.
+    probe_func(timeout_ms) can be given to replace the default ping of the host (e.g. to update a cache)
+
+    Returns a dictionary:
+        {"is_online": bool, "time_to_online_ms": float | None, "probes_sent": int, "packets_sent": int,
+         "waited_ms": float}
+    '''
+
+    # For clarity
+    if probe_func is None:
+        probe_func = lambda timeout_ms: probe_host(host, timeout_ms)
+
+    start_time = time.monotonic()
+    deadline = start_time + wait_sec
+    packets_sent = send_wake_packets(mac_address, packet_repeats)
+
+    is_online = False
+    time_to_online_ms = None
+    probes_sent = 0
+    delay_sec = 0
+    while True:
+
+        # Never probe for longer than the time we have left
+        remaining_ms = 1000 * (deadline - time.monotonic())
+        if remaining_ms <= 0:
+            break
+
+        probes_sent += 1
+        if probe_func(min(probe_timeout_ms, remaining_ms))["is_online"]:
+            is_online = True
+            time_to_online_ms = round(1000 * (time.monotonic() - start_time), 3)
+            break
+
+        elapsed_sec = time.monotonic() - start_time
+        delay_sec = get_next_poll_delay(elapsed_sec, delay_sec, boot_window_sec)
+        time.sleep(max(0, min(delay_sec, deadline - time.monotonic())))
+
+    return {"is_online": is_online,
+            "time_to_online_ms": time_to_online_ms,
+            "probes_sent": probes_sent,
+            "packets_sent": packets_sent,
+            "waited_ms": round(1000 * (time.monotonic() - start_time), 3)}
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    # Print out the polling schedule for a host that never comes up
+    elapsed_sec, delay_sec, num_polls = 0, 0, 0
+    while elapsed_sec < 120:
+        delay_sec = get_next_poll_delay(elapsed_sec, delay_sec)
+        elapsed_sec += delay_sec
+        num_polls += 1
+    print("Polls over 120 seconds:", num_polls, "(fixed 0.5s interval would use {})".format(int(120 / 0.5)))
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from http.client import HTTPConnection
+from multiprocessing import Pool
+from urllib.error import URLError
+from urllib.request import urlopen
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def start_server(launch_path, port, num_workers, extra_env=None):
+
+    ''' Starts the server (non-debug) as a separate process, using the given number of workers '''
+
+    server_env = dict(os.environ, DEBUG_MODE="0", SERVICE_PORT=str(port), SERVICE_WORKERS=str(num_workers))
+    server_env.update(extra_env or {})
+
+    return subprocess.Popen([sys.executable, launch_path], cwd=os.path.dirname(launch_path), env=server_env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+# .....................................................................................................................
+
+def stop_server(server_process, timeout_sec=15):
+    server_process.send_signal(signal.SIGTERM)
+    try:
+        server_process.wait(timeout_sec)
+    except subprocess.TimeoutExpired:
+        server_process.kill()
+        server_process.wait()
+
+# .....................................................................................................................
+
+def wait_until_ready(url, timeout_sec=30):
+
+    ''' Polls the server until it responds. Returns True if it's ready before the timeout '''
+
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(url, timeout=2) as response:
+                response.read()
+                return True
+        except (URLError, OSError):
+            time.sleep(0.2)
+
+    return False
+
+# .....................................................................................................................
+
+def run_client(client_args):
+
+    '''
+    Calls a route back-to-back (re-using one keep-alive connection) for the given duration.
+    Returns: number of errors, list of durations (ms) of successful requests
+    '''
+
+    port, route, duration_sec = client_args
+
+    num_errors = 0
+    durations_ms = []
+    connection = HTTPConnection("127.0.0.1", port, timeout=10)
+    end_time = time.perf_counter() + duration_sec
+    while time.perf_counter() < end_time:
+        start_time = time.perf_counter()
+        try:
+            connection.request("GET", route)
+            response = connection.getresponse()
+            response.read()
+            is_ok = (response.status == 200)
+        except (OSError, ValueError):
+            # Start over with a new connection
+            connection.close()
+            connection = HTTPConnection("127.0.0.1", port, timeout=10)
+            is_ok = False
+
+        if is_ok:
+            durations_ms.append(1000 * (time.perf_counter() - start_time))
+        else:
+            num_errors += 1
+    connection.close()
+
+    return num_errors, durations_ms
+
+# .....................................................................................................................
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+# .....................................................................................................................
+
+def benchmark(launch_path, port, num_workers, route, num_clients, duration_sec, extra_env=None):
+
+    ''' Starts a server with the given number of workers, loads it with clients, then stops it. Returns a summary '''
+
+    server_process = start_server(launch_path, port, num_workers, extra_env)
+    try:
+        if not wait_until_ready("http://127.0.0.1:{}{}".format(port, route)):
+            raise RuntimeError("Server didn't start (workers: {})".format(num_workers))
+
+        with Pool(num_clients) as client_pool:
+            client_results = client_pool.map(run_client, [(port, route, duration_sec)] * num_clients)
+
+    finally:
+        stop_server(server_process)
+
+    num_errors = sum(each_errors for each_errors, _ in client_results)
+    durations_ms = sorted(each_ms for _, each_durations_ms in client_results for each_ms in each_durations_ms)
+
+    return {"workers": num_workers,
+            "requests_per_sec": len(durations_ms) / duration_sec,
+            "p50_ms": percentile(durations_ms, 0.5),
+            "p99_ms": percentile(durations_ms, 0.99),
+            "errors": num_errors}
+
+# .....................................................................................................................
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(description="Compare server throughput using a single process vs. several workers")
+    parser.add_argument("-w", "--workers", default=4, type=int, help="Number of workers to compare against 1")
+    parser.add_argument("-r", "--route", default="/check-online", help="Route to call")
+    parser.add_argument("-c", "--clients", default=16, type=int, help="Number of concurrent clients (processes)")
+    parser.add_argument("-d", "--duration", default=10, type=float, help="Seconds to load each server for")
+    parser.add_argument("-p", "--port", default=5090, type=int, help="Port to run the benchmark servers on")
+    parser.add_argument("--no-limits", action="store_true",
+                        help="Disable the per-client rate limits (all clients share one ip address)")
+
+    return parser.parse_args()
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run benchmark
+
+if __name__ == "__main__":
+
+    args = parse_args()
+    launch_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "launch.py")
+    extra_env = {"RATE_LIMITS": "{}"} if args.no_limits else None
+
+    print("", "Route: {} ({} clients, {} sec each)".format(args.route, args.clients, args.duration),
+          "CPUs: {}".format(os.cpu_count()), "", "Results:", sep="\n")
+
+    results_list = []
+    for each_num_workers in (1, args.workers):
+        result = benchmark(launch_path, args.port, each_num_workers, args.route, args.clients, args.duration, extra_env)
+        results_list.append(result)
+        print("  workers: {:>2}   {:>8.1f} req/s   p50: {:>7.1f} ms   p99: {:>7.1f} ms   errors: {}".format(
+            result["workers"], result["requests_per_sec"], result["p50_ms"], result["p99_ms"], result["errors"]))
+
+    single_rps, multi_rps = results_list[0]["requests_per_sec"], results_list[1]["requests_per_sec"]
+    print("", "Speed-up: {:.2f}x".format(multi_rps / single_rps if single_rps > 0 else float("nan")), sep="\n")
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
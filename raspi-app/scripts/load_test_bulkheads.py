@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import argparse
+import json
+import sys
+import threading
+import time
+
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def timed_get(url, timeout_sec=30):
+
+    '''
+    Makes a single GET request, reading the whole response.
+    Returns: status_code (None if the request failed), duration_ms
+    '''
+
+    start_time = time.perf_counter()
+    try:
+        with urlopen(url, timeout=timeout_sec) as response:
+            response.read()
+            status_code = response.status
+    except HTTPError as err:
+        status_code = err.code
+    except (URLError, OSError):
+        status_code = None
+
+    return status_code, 1000 * (time.perf_counter() - start_time)
+
+# .....................................................................................................................
+
+def measure_route(url, num_requests, interval_sec=0.05):
+
+    ''' Calls a route repeatedly (one at a time). Returns: {status_code: count}, sorted list of durations (ms) '''
+
+    status_counts = {}
+    durations_ms = []
+    for _ in range(num_requests):
+        status_code, duration_ms = timed_get(url)
+        status_counts[status_code] = status_counts.get(status_code, 0) + 1
+        durations_ms.append(duration_ms)
+        time.sleep(interval_sec)
+
+    return status_counts, sorted(durations_ms)
+
+# .....................................................................................................................
+
+def saturate_route(url, num_clients, stop_event):
+
+    '''
+    Starts num_clients threads which call a (slow) route back-to-back until the stop event is set.
+    Returns the threads and a {status_code: count} dictionary that fills in as responses come back
+    '''
+
+    status_counts = {}
+    counts_lock = threading.Lock()
+
+    def call_until_stopped():
+        while not stop_event.is_set():
+            status_code, _ = timed_get(url)
+            with counts_lock:
+                status_counts[status_code] = status_counts.get(status_code, 0) + 1
+
+            # Back off a little when turned away, like a client respecting Retry-After would (but faster)
+            if status_code == 503:
+                stop_event.wait(0.2)
+
+    client_threads = [threading.Thread(target=call_until_stopped, daemon=True) for _ in range(num_clients)]
+    for each_thread in client_threads:
+        each_thread.start()
+
+    return client_threads, status_counts
+
+# .....................................................................................................................
+
+def get_nmap_job_route(server_url, wait_sec):
+
+    '''
+    Starts an nmap scan of the remote host (a read-only job that takes 10-60 seconds)
+    and returns a long-polling route for it, which holds a server thread while the scan runs
+    '''
+
+    with urlopen("{}/get-host-info?refresh=1".format(server_url), timeout=30) as response:
+        job_id = json.loads(response.read())["job_id"]
+
+    return "/jobs/{}?wait={}".format(job_id, wait_sec)
+
+# .....................................................................................................................
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+# .....................................................................................................................
+
+def summarize(label, status_counts, durations_ms):
+    p50_ms, p99_ms, max_ms = percentile(durations_ms, 0.5), percentile(durations_ms, 0.99), durations_ms[-1]
+    print("  {:<22} p50: {:>7.1f} ms   p99: {:>7.1f} ms   max: {:>7.1f} ms   status: {}".format(label, p50_ms, p99_ms,
+                                                                                           max_ms, status_counts))
+
+# .....................................................................................................................
+
+def parse_args():
+
+    parser = argparse.ArgumentParser(description="Check that cheap routes stay fast while slow routes are saturated")
+    parser.add_argument("-u", "--url", default="http://localhost:5000", help="Server url (without a trailing /)")
+    parser.add_argument("-c", "--cheap-route", default="/check-online", help="Route whose latency is measured")
+    parser.add_argument("-s", "--slow-route", default=None,
+                        help="Route used to saturate a pool (default: long-poll a fresh nmap job, i.e. the poll pool)")
+    parser.add_argument("-n", "--clients", default=12, type=int, help="Number of clients calling the slow route")
+    parser.add_argument("-r", "--requests", default=100, type=int, help="Number of cheap requests per measurement")
+    parser.add_argument("--wait", default=10, type=int, help="Long-poll time (seconds) of the default slow route")
+    parser.add_argument("--max-slowdown", default=3.0, type=float,
+                        help="Fail if the cheap p99 latency grows by more than this factor (plus 20 ms) under load")
+
+    return parser.parse_args()
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run load test
+
+if __name__ == "__main__":
+
+    args = parse_args()
+    server_url = args.url.rstrip("/")
+    cheap_url = server_url + args.cheap_route
+    slow_route = get_nmap_job_route(server_url, args.wait) if args.slow_route is None else args.slow_route
+
+    print("", "Cheap route: {}".format(args.cheap_route),
+          "Slow route: {} (x{} clients)".format(slow_route, args.clients), "", "Results:", sep="\n")
+
+    # Measure the cheap route on its own first, so we have something to compare against
+    base_counts, base_durations_ms = measure_route(cheap_url, args.requests)
+    summarize("cheap (idle server)", base_counts, base_durations_ms)
+
+    # Keep the slow route busy with more clients than the pool (or the server) allows, then measure again
+    stop_event = threading.Event()
+    client_threads, slow_counts = saturate_route(server_url + slow_route, args.clients, stop_event)
+    time.sleep(1)
+    load_counts, load_durations_ms = measure_route(cheap_url, args.requests)
+    summarize("cheap (slow saturated)", load_counts, load_durations_ms)
+
+    stop_event.set()
+    print("  {:<22} status: {}".format("slow", slow_counts))
+
+    # Show what the server recorded (rejections by pool)
+    try:
+        with urlopen(server_url + "/metrics", timeout=10) as response:
+            metrics_lines = response.read().decode("utf-8").splitlines()
+        print("", *[each_line for each_line in metrics_lines if each_line.startswith("bulkhead_")], sep="\n")
+    except (URLError, OSError):
+        pass
+
+    # Cheap requests shouldn't be turned away, or slowed down much, by the slow ones
+    base_p99_ms, load_p99_ms = percentile(base_durations_ms, 0.99), percentile(load_durations_ms, 0.99)
+    is_ok = (load_counts.get(200, 0) == args.requests) and (load_p99_ms <= args.max_slowdown * base_p99_ms + 20)
+    print("", "OK" if is_ok else "Cheap route was affected by the slow route!", sep="\n")
+    sys.exit(0 if is_ok else 1)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from local.eolib.utils.git_direct import Git_Direct_Reader, OBJ_OFS_DELTA, OBJ_REF_DELTA
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Fixture_Repo:
+
+    '''
+    Builds a small throw-away repo using the git cli, with fixed names & dates so results are repeatable.
+    Every commit rewrites a large-ish file with small changes, so packing it produces delta objects
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, repo_path):
+
+        self.repo_path = repo_path
+        self._num_commits = 0
+
+        os.makedirs(repo_path)
+        self.git("init", "-q", "-b", "master")
+        self.git("config", "core.abbrev", "auto")
+
+    # .................................................................................................................
+
+    def git(self, *args, cwd=None):
+
+        ''' Runs a git command in the repo (or the given folder), returning its (stripped) output '''
+
+        commit_date = "{} +0000".format(1700000000 + 3600 * self._num_commits)
+        git_env = dict(os.environ, GIT_CONFIG_NOSYSTEM="1", GIT_CONFIG_GLOBAL=os.devnull, HOME=self.repo_path,
+                       GIT_AUTHOR_NAME="Fixture Author", GIT_AUTHOR_EMAIL="author@example.com",
+                       GIT_COMMITTER_NAME="Fixture Committer", GIT_COMMITTER_EMAIL="committer@example.com",
+                       GIT_AUTHOR_DATE=commit_date, GIT_COMMITTER_DATE=commit_date)
+
+        result = subprocess.run(["git", *args], cwd=cwd or self.repo_path, env=git_env,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+
+        return result.stdout.decode("utf-8").strip()
+
+    # .................................................................................................................
+
+    def commit(self, message, cwd=None, file_name="shared.txt"):
+
+        ''' Makes a commit which slightly changes a (large-ish) file. Returns the new commit id '''
+
+        folder_path = cwd or self.repo_path
+        lines_list = ["line {} of the file, which barely changes between commits".format(k) for k in range(200)]
+        lines_list[self._num_commits % 200] = "changed in: {}".format(message)
+        with open(os.path.join(folder_path, file_name), "w") as out_file:
+            out_file.write("\n".join(lines_list))
+
+        self._num_commits += 1
+        self.git("add", "-A", cwd=folder_path)
+        self.git("commit", "-q", "-m", message, cwd=folder_path)
+
+        return self.git("rev-parse", "HEAD", cwd=folder_path)
+
+    # .................................................................................................................
+
+    def build_history(self):
+
+        '''
+        Makes a branching history with lightweight, annotated & nested (e.g. 'release/v1.1') tags.
+        Returns the list of commit ids on master
+        '''
+
+        master_ids = [self.commit("first")]
+        self.git("tag", "v0.1")
+
+        self.git("checkout", "-q", "-b", "feature")
+        feature_id = self.commit("feature work", file_name="feature.txt")
+        self.git("tag", "-a", "-m", "feature tag", "feature-done")
+
+        self.git("checkout", "-q", "master")
+        master_ids.append(self.commit("second"))
+        self.git("tag", "-a", "-m", "release 1.0", "v1.0")
+        self.git("tag", "release/v1.1")
+        self.git("merge", "-q", "--no-ff", "-m", "merge feature", feature_id)
+        master_ids.append(self.git("rev-parse", "HEAD"))
+        self._num_commits += 1
+        master_ids.append(self.commit("third"))
+        self.git("tag", "-a", "-m", "nested annotated", "release/rc/v2.0")
+
+        return master_ids
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Test_Git_Direct_Reader(unittest.TestCase):
+
+    '''
+    Compares the direct reader against the git cli, on repos with loose objects, packed objects
+    (ofs & ref deltas), packed-refs, annotated & nested tags and a worktree.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        if shutil.which("git") is None:
+            self.skipTest("git isn't installed")
+
+        self._temp_folder = tempfile.TemporaryDirectory()
+        self.repo = Fixture_Repo(os.path.join(self._temp_folder.name, "repo"))
+        self.master_ids = self.repo.build_history()
+
+    # .................................................................................................................
+
+    def tearDown(self):
+        self._temp_folder.cleanup()
+
+    # .................................................................................................................
+
+    def test_loose_repo(self):
+        self.assertEqual(self._count_pack_files(), 0)
+        self.assert_matches_git(self.repo.repo_path)
+
+    # .................................................................................................................
+
+    def test_packed_repo_with_ofs_deltas(self):
+        self.repo.git("gc", "-q", "--aggressive", "--prune=now")
+        self.assertGreater(self._count_pack_files(), 0)
+        self.assertIn(OBJ_OFS_DELTA, self._get_pack_object_types())
+        self.assert_matches_git(self.repo.repo_path)
+
+    # .................................................................................................................
+
+    def test_packed_repo_with_ref_deltas(self):
+        self.repo.git("config", "repack.useDeltaBaseOffset", "false")
+        self.repo.git("gc", "-q", "--aggressive", "--prune=now")
+        self.assertIn(OBJ_REF_DELTA, self._get_pack_object_types())
+        self.assert_matches_git(self.repo.repo_path)
+
+    # .................................................................................................................
+
+    def test_packed_refs_with_loose_overrides(self):
+
+        self.repo.git("pack-refs", "--all")
+        self.assertTrue(os.path.exists(os.path.join(self.repo.repo_path, ".git", "packed-refs")))
+
+        # Move a packed tag with a (loose) newer version
+        self.repo.git("tag", "-f", "v0.1", self.master_ids[1])
+        self.assert_matches_git(self.repo.repo_path)
+
+    # .................................................................................................................
+
+    def test_new_nested_tags_are_found(self):
+
+        # Build the tag index first, then add tags to existing sub-folders of refs/tags
+        reader = Git_Direct_Reader.create_if_supported(self.repo.repo_path)
+        self.assert_tags_match_git(reader, self.repo.repo_path)
+
+        self.repo.git("tag", "release/v1.2", self.master_ids[0])
+        self.repo.git("tag", "-a", "-m", "nested annotated", "release/rc/v2.1", self.master_ids[1])
+        self.assert_tags_match_git(reader, self.repo.repo_path)
+
+        # Same again, with the older tags packed
+        self.repo.git("pack-refs", "--all")
+        self.repo.git("tag", "release/rc/v2.2", self.master_ids[2])
+        self.assert_tags_match_git(reader, self.repo.repo_path)
+
+    # .................................................................................................................
+
+    def test_worktree(self):
+
+        worktree_path = os.path.join(self._temp_folder.name, "worktree")
+        self.repo.git("worktree", "add", "-q", "-b", "wt-branch", worktree_path, self.master_ids[1])
+        self.repo.commit("worktree commit", cwd=worktree_path)
+        self.repo.git("tag", "worktree-tag", cwd=worktree_path)
+
+        self.assertTrue(os.path.isfile(os.path.join(worktree_path, ".git")))
+        self.assert_matches_git(worktree_path)
+
+        # The main checkout's HEAD is separate from the worktree's
+        main_reader = Git_Direct_Reader.create_if_supported(self.repo.repo_path)
+        self.assertEqual(main_reader.resolve("HEAD"), self.master_ids[-1])
+
+    # .................................................................................................................
+
+    def assert_matches_git(self, checkout_path):
+
+        ''' Compares resolving, logs, tags & object reads between the direct reader & the git cli '''
+
+        reader = Git_Direct_Reader.create_if_supported(checkout_path)
+        self.assertIsNotNone(reader)
+        run_git = lambda *args: self.repo.git(*args, cwd=checkout_path)
+
+        # Resolving refs, tags & (short) ids
+        head_id = run_git("rev-parse", "HEAD")
+        revisions_list = ["HEAD", "master", "feature", "refs/heads/master", head_id, head_id[:8]]
+        revisions_list += run_git("tag", "--list").split()
+        for each_revision in revisions_list:
+            with self.subTest(revision=each_revision):
+                self.assertEqual(reader.resolve(each_revision), run_git("rev-parse", each_revision))
+        with self.assertRaises(AttributeError):
+            reader.resolve("no-such-branch")
+
+        # Logs, including ranges
+        log_ids = [each_commit["id"] for each_commit in reader.iter_log([head_id])]
+        self.assertEqual(log_ids, run_git("log", "--format=%H", "HEAD").split())
+        feature_id = run_git("rev-parse", "feature")
+        range_ids = [each_commit["id"] for each_commit in reader.iter_log([head_id], [feature_id])]
+        self.assertEqual(range_ids, run_git("log", "--format=%H", "feature..HEAD").split())
+
+        # Commit details & abbreviations
+        for each_id in log_ids:
+            commit_dict = reader.read_commit(each_id)
+            self.assertEqual(commit_dict["commit_time"], int(run_git("log", "-1", "--format=%ct", each_id)))
+            self.assertEqual(commit_dict["parents"], run_git("log", "-1", "--format=%P", each_id).split())
+            self.assertEqual(commit_dict["message"].strip(), run_git("log", "-1", "--format=%B", each_id))
+            self.assertEqual(reader.abbreviate(each_id), run_git("rev-parse", "--short", each_id))
+
+        self.assert_tags_match_git(reader, checkout_path)
+
+        # Every object (loose or packed, including deltas) should read back the same as git's copy
+        all_objects_str = run_git("cat-file", "--batch-all-objects", "--batch-check=%(objectname) %(objecttype)")
+        for each_line in all_objects_str.splitlines():
+            object_id, object_type = each_line.split()
+            git_bytes = subprocess.run(["git", "cat-file", object_type, object_id], cwd=checkout_path,
+                                       stdout=subprocess.PIPE, check=True).stdout
+            self.assertEqual(reader.read_object(object_id), (object_type, git_bytes))
+
+    # .................................................................................................................
+
+    def assert_tags_match_git(self, reader, checkout_path):
+
+        ''' Compares tag listings & the tags found for each commit with the git cli '''
+
+        run_git = lambda *args: self.repo.git(*args, cwd=checkout_path)
+
+        refs_str = run_git("for-each-ref", "--format=%(refname) %(objectname)", "refs/tags/")
+        git_refs_dict = dict(each_line.split() for each_line in refs_str.splitlines())
+        self.assertEqual(reader.list_refs("refs/tags/"), git_refs_dict)
+
+        for each_id in run_git("rev-list", "--all").split():
+            with self.subTest(commit=each_id):
+                git_tags_list = sorted(run_git("tag", "--points-at", each_id).split())
+                self.assertEqual(reader.get_tags_for_commit(each_id), git_tags_list)
+
+    # .................................................................................................................
+
+    def _count_pack_files(self):
+        pack_folder_path = os.path.join(self.repo.repo_path, ".git", "objects", "pack")
+        return len([each_name for each_name in os.listdir(pack_folder_path) if each_name.endswith(".pack")])
+
+    # .................................................................................................................
+
+    def _get_pack_object_types(self):
+
+        ''' Returns the set of (pack) type numbers used by objects in the repo's pack files '''
+
+        reader = Git_Direct_Reader.create_if_supported(self.repo.repo_path)
+        all_ids = self.repo.git("cat-file", "--batch-all-objects", "--batch-check=%(objectname)").split()
+
+        type_numbers = set()
+        for each_index in reader._get_pack_indexes():
+            with open(each_index.pack_path, "rb") as pack_file:
+                for each_id in all_ids:
+                    pack_offset = each_index.find_offset(bytes.fromhex(each_id))
+                    if pack_offset is not None:
+                        pack_file.seek(pack_offset)
+                        type_numbers.add((pack_file.read(1)[0] >> 4) & 0x07)
+
+        return type_numbers
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
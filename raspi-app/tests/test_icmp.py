@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import socket
+import time
+import unittest
+
+from unittest import mock
+
+from local.lib import network
+from local.lib.icmp import icmp_echo, icmp_available, resolve_host
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define tests
+
+class Test_Icmp_Echo(unittest.TestCase):
+
+    '''
+    Checks in-process pings against localhost & an unroutable address.
+    These are skipped if this process can't open ICMP sockets (see net.ipv4.ping_group_range).
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+        if not icmp_available():
+            self.skipTest("ICMP sockets aren't available")
+
+    # .................................................................................................................
+
+    def test_localhost_is_online(self):
+
+        result = icmp_echo("127.0.0.1", 1000)
+
+        self.assertTrue(result["is_online"])
+        self.assertIsInstance(result["rtt_ms"], float)
+        self.assertGreaterEqual(result["rtt_ms"], 0)
+        self.assertLess(result["rtt_ms"], 1000)
+        self.assertIsInstance(result["ttl"], int)
+        self.assertGreater(result["ttl"], 0)
+
+    # .................................................................................................................
+
+    def test_unroutable_times_out(self):
+
+        # TEST-NET-3 addresses are reserved for documentation, so nothing should ever reply
+        timeout_ms = 200
+        start_time = time.monotonic()
+        result = icmp_echo("203.0.113.1", timeout_ms)
+        elapsed_ms = 1000 * (time.monotonic() - start_time)
+
+        self.assertEqual(result, {"is_online": False, "rtt_ms": None, "ttl": None})
+        self.assertLess(elapsed_ms, timeout_ms + 100)
+
+    # .................................................................................................................
+
+    def test_unresolvable_host(self):
+        result = icmp_echo("no-such-host.invalid", 200)
+        self.assertFalse(result["is_online"])
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Test_Resolve_Host(unittest.TestCase):
+
+    ''' Checks that host name lookups (e.g. against a slow DNS server) never run past the deadline '''
+
+    # .................................................................................................................
+
+    def test_address_strings_skip_lookup(self):
+
+        with mock.patch.object(socket, "getaddrinfo", wraps=socket.getaddrinfo) as mock_getaddrinfo:
+            self.assertEqual(resolve_host("127.0.0.1", 0), (socket.AF_INET, "127.0.0.1"))
+            self.assertEqual(resolve_host("::1", 0), (socket.AF_INET6, "::1"))
+            self.assertEqual(mock_getaddrinfo.call_count, 2)
+
+    # .................................................................................................................
+
+    def test_slow_lookup_gives_up_at_deadline(self):
+
+        with mock.patch.object(socket, "getaddrinfo", side_effect=self.slow_getaddrinfo):
+            start_time = time.monotonic()
+            self.assertIsNone(resolve_host("slow-dns.example", 0.1))
+            self.assertLess(time.monotonic() - start_time, 0.3)
+
+            # Same for pings, which share their deadline with the lookup
+            start_time = time.monotonic()
+            result = icmp_echo("slow-dns.example", 100)
+            self.assertFalse(result["is_online"])
+            self.assertLess(time.monotonic() - start_time, 0.3)
+
+    # .................................................................................................................
+
+    def test_lookup_within_deadline(self):
+        self.assertEqual(resolve_host("localhost", 2, socket.AF_INET), (socket.AF_INET, "127.0.0.1"))
+        self.assertIsNone(resolve_host("no-such-host.invalid", 2))
+
+    # .................................................................................................................
+
+    @staticmethod
+    def slow_getaddrinfo(host, *args):
+        ''' Stand-in for a lookup that has to wait on an unresponsive DNS server '''
+        if len(args) > 4 and (args[4] & socket.AI_NUMERICHOST):
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        time.sleep(1)
+        raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Test_Probe_Host_Fallback(unittest.TestCase):
+
+    ''' Checks that probe_host falls back to the ping command (for good) when ICMP sockets aren't allowed '''
+
+    # .................................................................................................................
+
+    def test_permission_error_falls_back_to_ping_command(self):
+
+        ping_result = {"is_online": True, "rtt_ms": 0.5, "ttl": 64}
+        with mock.patch.object(network, "_ICMP_SOCKETS_UNAVAILABLE", False), \
+             mock.patch.object(network, "icmp_echo", side_effect=PermissionError) as mock_icmp_echo, \
+             mock.patch.object(network, "_ping_command", return_value=ping_result) as mock_ping_command, \
+             mock.patch("builtins.print"):
+
+            self.assertEqual(network.probe_host("203.0.113.10", 150), ping_result)
+            mock_icmp_echo.assert_called_once_with("203.0.113.10", 150)
+            mock_ping_command.assert_called_once_with("203.0.113.10", 150)
+
+            # Later probes go straight to the ping command, without trying sockets again
+            self.assertEqual(network.probe_host("203.0.113.11", 150), ping_result)
+            self.assertEqual(mock_icmp_echo.call_count, 1)
+            self.assertEqual(mock_ping_command.call_count, 2)
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
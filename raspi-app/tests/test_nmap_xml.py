@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import io
+import os
+import unittest
+import xml.etree.ElementTree as ET
+
+from local.lib.nmap_xml import parse_nmap_xml
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define tests
+
+class Test_Parse_Nmap_Xml(unittest.TestCase):
+
+    '''
+    Checks parsing against recorded nmap output (see tests/fixtures), so no nmap install is needed.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def test_full_scan(self):
+
+        scan_dict = parse_nmap_xml(get_fixture_path("nmap_scan.xml"))
+
+        ssh_service = {"name": "ssh", "product": "OpenSSH", "version": "8.2p1 Ubuntu 4ubuntu0.5",
+                       "extra_info": "Ubuntu Linux; protocol 2.0", "os_type": "Linux", "method": "probed",
+                       "confidence": 10, "cpe": ["cpe:/a:openbsd:openssh:8.2p1", "cpe:/o:linux:linux_kernel"]}
+        web_service = {"name": "http", "product": "Waitress httpd", "version": None, "extra_info": None,
+                       "os_type": None, "method": "probed", "confidence": 10, "cpe": []}
+
+        # Os matches are listed best-first, even though the recording has them the other way around
+        best_match = {"name": "Linux 5.0 - 5.4", "accuracy": 98,
+                      "classes": [{"type": "general purpose", "vendor": "Linux", "family": "Linux",
+                                   "generation": "5.X", "accuracy": 98, "cpe": ["cpe:/o:linux:linux_kernel:5"]}]}
+        other_match = {"name": "Linux 4.15 - 5.6", "accuracy": 95,
+                       "classes": [{"type": "general purpose", "vendor": "Linux", "family": "Linux",
+                                    "generation": "4.X", "accuracy": 95, "cpe": ["cpe:/o:linux:linux_kernel:4"]},
+                                   {"type": "general purpose", "vendor": "Linux", "family": "Linux",
+                                    "generation": "5.X", "accuracy": 95, "cpe": ["cpe:/o:linux:linux_kernel:5"]}]}
+
+        expected_host = {"state": "up",
+                         "addresses": {"ipv4": "192.168.1.50", "mac": "D8:BB:C1:12:34:56",
+                                       "vendor": "Micro-Star Intl"},
+                         "hostnames": ["desktop.lan"],
+                         "ports": [{"protocol": "tcp", "port": 22, "state": "open", "reason": "syn-ack",
+                                    "service": ssh_service},
+                                   {"protocol": "tcp", "port": 6969, "state": "open", "reason": "syn-ack",
+                                    "service": web_service}],
+                         "open_ports": [22, 6969],
+                         "os_matches": [best_match, other_match],
+                         "uptime_sec": 86412,
+                         "distance_hops": 1,
+                         "srtt_us": 412,
+                         "started_ems": 1792332131000,
+                         "finished_ems": 1792332142000}
+
+        expected_dict = {"scanner": "nmap", "version": "7.80", "args": "nmap -O -sV -oX - 192.168.1.50",
+                         "hosts": [expected_host],
+                         "timing": {"started_ems": 1792332131000, "finished_ems": 1792332142000,
+                                    "elapsed_sec": 11.21, "exit": "success",
+                                    "summary": "Nmap done at Sun Oct 18 14:02:22 2026;"
+                                               " 1 IP address (1 host up) scanned in 11.21 seconds"},
+                         "hosts_summary": {"up": 1, "down": 0, "total": 1}}
+
+        self.maxDiff = None
+        self.assertEqual(scan_dict, expected_dict)
+
+    # .................................................................................................................
+
+    def test_scan_without_os_match(self):
+
+        scan_dict = parse_nmap_xml(get_fixture_path("nmap_scan_no_os.xml"))
+
+        self.assertEqual(len(scan_dict["hosts"]), 1)
+        host_dict = scan_dict["hosts"][0]
+        self.assertEqual(host_dict["state"], "up")
+        self.assertEqual(host_dict["addresses"], {"ipv4": "192.168.1.50"})
+        self.assertEqual(host_dict["hostnames"], [])
+        self.assertEqual(host_dict["ports"], [])
+        self.assertEqual(host_dict["open_ports"], [])
+        self.assertEqual(host_dict["os_matches"], [])
+        self.assertIsNone(host_dict["uptime_sec"])
+        self.assertIsNone(host_dict["distance_hops"])
+        self.assertEqual(host_dict["srtt_us"], 655)
+        self.assertEqual(scan_dict["timing"]["exit"], "success")
+
+    # .................................................................................................................
+
+    def test_truncated_scan(self):
+
+        # Output of an nmap process that was killed part way through
+        with self.assertRaises(ET.ParseError):
+            parse_nmap_xml(get_fixture_path("nmap_scan_truncated.xml"))
+
+    # .................................................................................................................
+
+    def test_file_object_input(self):
+
+        # Same as reading from the stdout of a running nmap process
+        with open(get_fixture_path("nmap_scan.xml"), "rb") as in_file:
+            stream_dict = parse_nmap_xml(io.BytesIO(in_file.read()))
+
+        self.assertEqual(stream_dict, parse_nmap_xml(get_fixture_path("nmap_scan.xml")))
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def get_fixture_path(file_name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", file_name)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import socket
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from local.lib import os_detect
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define tests
+
+class Test_Detect_OS_Fast(unittest.TestCase):
+
+    '''
+    Checks that OS detection keeps to its deadline (slow name lookups & late ping replies included),
+    using a listening socket on localhost as the 'ubuntu' port & a stand-in for the ping.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        self.listen_sock = socket.socket()
+        self.listen_sock.bind(("127.0.0.1", 0))
+        self.listen_sock.listen(8)
+        self.port_hints = {self.listen_sock.getsockname()[1]: "ubuntu"}
+        self.release_event = threading.Event()
+
+    # .................................................................................................................
+
+    def tearDown(self):
+        self.release_event.set()
+        self.listen_sock.close()
+
+    # .................................................................................................................
+
+    def test_ping_result_is_used(self):
+
+        with mock.patch.object(os_detect, "probe_host", side_effect=self.make_probe(0)):
+            result = os_detect.detect_os_fast("127.0.0.1", 500, self.port_hints, read_banner=False)
+
+        self.assertEqual(result["os"], "ubuntu")
+        self.assertEqual([each_dict["signal"] for each_dict in result["evidence"]],
+                         ["icmp ttl=64", "tcp port {} open".format(*self.port_hints)])
+
+    # .................................................................................................................
+
+    def test_late_ping_is_ignored(self):
+
+        # The ping reply only comes in after the deadline, by which point it mustn't be counted
+        timeout_ms = 100
+        with mock.patch.object(os_detect, "probe_host", side_effect=self.make_probe(None)) as mock_probe_host:
+            result = os_detect.detect_os_fast("127.0.0.1", timeout_ms, self.port_hints, read_banner=False)
+            self.release_event.set()
+
+        mock_probe_host.assert_called_once_with("127.0.0.1", timeout_ms)
+        self.assertEqual([each_dict["signal"] for each_dict in result["evidence"]],
+                         ["tcp port {} open".format(*self.port_hints)])
+        self.assertLess(result["elapsed_ms"], timeout_ms + 100)
+
+    # .................................................................................................................
+
+    def test_slow_lookup_keeps_deadline(self):
+
+        def slow_getaddrinfo(host, *args):
+            if len(args) > 4 and (args[4] & socket.AI_NUMERICHOST):
+                raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+            self.release_event.wait(5)
+            raise socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution")
+
+        timeout_ms = 100
+        with mock.patch.object(socket, "getaddrinfo", side_effect=slow_getaddrinfo), \
+             mock.patch.object(os_detect, "probe_host") as mock_probe_host:
+            result = os_detect.detect_os_fast("slow-dns.example", timeout_ms, self.port_hints)
+
+        self.assertEqual(result["os"], "offline")
+        self.assertIn("error", result)
+        self.assertLess(result["elapsed_ms"], timeout_ms + 100)
+        mock_probe_host.assert_not_called()
+
+    # .................................................................................................................
+
+    def make_probe(self, delay_sec):
+
+        ''' Stand-in for probe_host, replying with a Linux-like TTL after a delay (or once released if None) '''
+
+        def probe_host(host, timeout_ms):
+            if delay_sec is None:
+                self.release_event.wait(5)
+            else:
+                time.sleep(delay_sec)
+            return {"is_online": True, "rtt_ms": 0.1, "ttl": 64}
+
+        return probe_host
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import unittest
+
+try:
+    from flask import Flask
+    from local.lib.response_cache import Response_Cache
+except ImportError:
+    Flask = None
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define tests
+
+@unittest.skipIf(Flask is None, "flask isn't installed")
+class Test_Conditional_Requests(unittest.TestCase):
+
+    '''
+    Checks which If-None-Match headers get a 304 from a cached route.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        self.num_calls = 0
+        test_app = Flask(__name__)
+        test_cache = Response_Cache()
+
+        @test_app.route("/data")
+        @test_cache.cached(ttl_sec=60)
+        def data_route():
+            self.num_calls += 1
+            return "some data"
+
+        self.client = test_app.test_client()
+        self.etag = self.client.get("/data").headers["ETag"].strip('"')
+
+    # .................................................................................................................
+
+    def test_matching_tags(self):
+
+        for each_header in ('"{}"', 'W/"{}"', '"other", "{}"', '"other",W/"{}" , "more"', "*", " * ", "{}"):
+            with self.subTest(if_none_match=each_header):
+                response = self.client.get("/data", headers={"If-None-Match": each_header.format(self.etag)})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.get_data(), b"")
+
+        # Every request was answered from the cache
+        self.assertEqual(self.num_calls, 1)
+
+    # .................................................................................................................
+
+    def test_other_tags(self):
+
+        # Tags must match exactly (not just contain or start with the ETag)
+        for each_header in ('"other"', '"{}0"', '"{}"'.format(self.etag[:-1]), '"x{}"', '"other, {}"', ", ,"):
+            with self.subTest(if_none_match=each_header):
+                response = self.client.get("/data", headers={"If-None-Match": each_header.format(self.etag)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.get_data(), b"some data")
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import threading
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from local.lib.single_flight import Single_Flight_Group
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Slow_Probe:
+
+    '''
+    Stand-in for a slow host probe, which holds every call until release() is called.
+    Counts how often it really runs, and raises the given error (if any) instead of returning a result
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls_list = []
+        self._release_event = threading.Event()
+
+    # .................................................................................................................
+
+    def __call__(self, host, timeout_ms=100):
+
+        self.calls_list.append((host, timeout_ms))
+        self._release_event.wait(5)
+        if self.error is not None:
+            raise self.error
+
+        return {"host": host, "is_online": True}
+
+    # .................................................................................................................
+
+    def release(self):
+        self._release_event.set()
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Test_Single_Flight_Group(unittest.TestCase):
+
+    '''
+    Checks that concurrent identical calls share one run of a (slow) probe, its result & its errors.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+        self.group = Single_Flight_Group()
+
+    # .................................................................................................................
+
+    def test_concurrent_calls_share_one_run(self):
+
+        num_callers = 5
+        probe = Slow_Probe()
+        coalesced_probe = self.group.coalesce("probe")(probe)
+
+        with ThreadPoolExecutor(num_callers) as pool:
+            futures_list = [pool.submit(coalesced_probe, "desktop") for _ in range(num_callers)]
+            self.wait_for_waiters("probe", num_callers - 1)
+            probe.release()
+            results_list = [each_future.result(5) for each_future in futures_list]
+
+        # Every caller gets the very same result object, from a single run
+        self.assertEqual(probe.calls_list, [("desktop", 100)])
+        self.assertEqual(results_list[0], {"host": "desktop", "is_online": True})
+        for each_result in results_list:
+            self.assertIs(each_result, results_list[0])
+        self.assertEqual(self.group.get_counts(), {"probe": {"executed": 1, "coalesced": num_callers - 1}})
+
+    # .................................................................................................................
+
+    def test_different_arguments_run_separately(self):
+
+        probe = Slow_Probe()
+        probe.release()
+        coalesced_probe = self.group.coalesce("probe")(probe)
+
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(lambda timeout_ms: coalesced_probe("desktop", timeout_ms=timeout_ms), (100, 200)))
+
+        self.assertEqual(sorted(probe.calls_list), [("desktop", 100), ("desktop", 200)])
+
+    # .................................................................................................................
+
+    def test_later_calls_run_again(self):
+
+        probe = Slow_Probe()
+        probe.release()
+        coalesced_probe = self.group.coalesce("probe")(probe)
+
+        # Nothing is cached once a call finishes
+        coalesced_probe("desktop")
+        coalesced_probe("desktop")
+        self.assertEqual(len(probe.calls_list), 2)
+
+    # .................................................................................................................
+
+    def test_errors_reach_every_caller(self):
+
+        num_callers = 3
+        probe = Slow_Probe(error=OSError("Can't reach host"))
+        coalesced_probe = self.group.coalesce("probe")(probe)
+
+        with ThreadPoolExecutor(num_callers) as pool:
+            futures_list = [pool.submit(coalesced_probe, "bad-host") for _ in range(num_callers)]
+            self.wait_for_waiters("probe", num_callers - 1)
+            probe.release()
+            errors_list = [each_future.exception(5) for each_future in futures_list]
+
+        self.assertEqual(len(probe.calls_list), 1)
+        for each_error in errors_list:
+            self.assertIs(each_error, probe.error)
+
+        # The failed call isn't re-used either
+        probe.error = None
+        self.assertEqual(coalesced_probe("bad-host"), {"host": "bad-host", "is_online": True})
+
+    # .................................................................................................................
+
+    def test_interrupted_call_fails_waiters(self):
+
+        probe = Slow_Probe(error=KeyboardInterrupt())
+        coalesced_probe = self.group.coalesce("probe")(probe)
+
+        # The caller that runs the probe gets the interrupt, callers waiting on it get an error (not None!)
+        def call_probe():
+            try:
+                return coalesced_probe("desktop")
+            except KeyboardInterrupt:
+                return "interrupted"
+
+        with ThreadPoolExecutor(2) as pool:
+            leader_future = pool.submit(call_probe)
+            self.wait_for_waiters("probe", 0)
+            waiter_future = pool.submit(call_probe)
+            self.wait_for_waiters("probe", 1)
+            probe.release()
+
+            self.assertEqual(leader_future.result(5), "interrupted")
+            with self.assertRaises(RuntimeError):
+                waiter_future.result(5)
+
+    # .................................................................................................................
+
+    def wait_for_waiters(self, operation_name, num_waiters, timeout_sec=5):
+
+        ''' Waits until the probe is running, with the given number of callers waiting on it '''
+
+        end_time = time.monotonic() + timeout_sec
+        while time.monotonic() < end_time:
+            counts = self.group.get_counts().get(operation_name, {"executed": 0, "coalesced": 0})
+            if counts["executed"] >= 1 and counts["coalesced"] >= num_waiters:
+                return
+            time.sleep(0.005)
+
+        self.fail("Timed out waiting for {} coalesced call(s)".format(num_waiters))
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+
+from local.lib.ssh import SSH_Session_Manager, parse_ssh_destination, _is_master_running
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define stand-in for ssh
+
+# Runs commands locally. When asked to start a master (-N -f), it listens on the control socket from the background
+# (like a real master), until told to exit (-O exit) or left idle for a while. Every call is logged, one per line
+STAND_IN_SCRIPT = '''#!{python_path}
+import os, socket, subprocess, sys
+
+args_list, options_dict, positional_list = sys.argv[1:], {{}}, []
+is_master, control_op = False, None
+while args_list:
+    each_arg = args_list.pop(0)
+    if each_arg == "-o":
+        option_key, _, option_value = args_list.pop(0).partition("=")
+        options_dict[option_key] = option_value
+    elif each_arg == "-p":
+        args_list.pop(0)
+    elif each_arg == "-O":
+        control_op = args_list.pop(0)
+    elif each_arg == "-N":
+        is_master = True
+    elif each_arg != "-f":
+        positional_list.append(each_arg)
+
+control_path = options_dict["ControlPath"]
+with open({log_path!r}, "a") as log_file:
+    log_file.write("{{}}\\n".format("master" if is_master else (control_op or "command")))
+
+if control_op == "exit":
+    with socket.socket(socket.AF_UNIX) as control_sock:
+        control_sock.connect(control_path)
+        control_sock.sendall(b"exit")
+    sys.exit(0)
+
+if is_master:
+    listen_sock = socket.socket(socket.AF_UNIX)
+    listen_sock.bind(control_path)
+    listen_sock.listen(8)
+
+    # Go to the background once the socket is ready, like 'ssh -f'
+    if os.fork() != 0:
+        os._exit(0)
+    os.setsid()
+    with open(control_path + ".pid", "w") as pid_file:
+        pid_file.write(str(os.getpid()))
+
+    listen_sock.settimeout(10)
+    try:
+        while True:
+            client_sock, _ = listen_sock.accept()
+            with client_sock:
+                if client_sock.recv(16) == b"exit":
+                    break
+    finally:
+        os.unlink(control_path)
+    os._exit(0)
+
+sys.exit(subprocess.call(["sh", "-c", positional_list[-1]]))
+'''
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define tests
+
+class Test_SSH_Session_Manager(unittest.TestCase):
+
+    '''
+    Checks master connection re-use (including replacing stale control sockets), streaming & fan-out,
+    using a stand-in for ssh, so no remote host (or ssh install) is needed.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        self._temp_folder = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self._temp_folder.name, "ssh_calls.log")
+        stand_in_path = os.path.join(self._temp_folder.name, "fake_ssh")
+        with open(stand_in_path, "w") as out_file:
+            out_file.write(STAND_IN_SCRIPT.format(python_path=sys.executable, log_path=self.log_path))
+        os.chmod(stand_in_path, 0o755)
+
+        self.manager = SSH_Session_Manager(control_dir=os.path.join(self._temp_folder.name, "cm"),
+                                           ssh_executable=stand_in_path)
+        self._started_destinations = []
+
+    # .................................................................................................................
+
+    def tearDown(self):
+
+        # Don't leave stand-in masters running in the background
+        for each_host, each_user, each_port in self._started_destinations:
+            self.kill_master(each_host, each_user, each_port)
+        self._temp_folder.cleanup()
+
+    # .................................................................................................................
+
+    def test_master_is_reused(self):
+
+        commands_list = ["echo hello", "echo oops >&2; exit 3", "sleep 5"] + ["echo again"] * 3
+        self.track_master("host1", "user", 22)
+        with ThreadPoolExecutor(len(commands_list)) as pool:
+            results_list = list(pool.map(lambda cmd: self.manager.run_command("host1", "user", cmd, timeout_sec=1),
+                                         commands_list))
+
+        # One master for every (concurrent) command
+        self.assertEqual(self.get_logged_calls().count("master"), 1)
+        self.assertEqual(self.get_logged_calls().count("command"), len(commands_list))
+
+        self.assertEqual((results_list[0]["exit_status"], results_list[0]["stdout"]), (0, "hello\n"))
+        self.assertEqual((results_list[1]["exit_status"], results_list[1]["stderr"]), (3, "oops\n"))
+        self.assertTrue(results_list[2]["timed_out"])
+
+        # Later commands still use the same master, while other hosts get their own
+        self.manager.run_command("host1", "user", "true")
+        self.track_master("host2", "user", 22)
+        self.manager.run_command("host2", "user", "true")
+        self.assertEqual(self.get_logged_calls().count("master"), 2)
+
+    # .................................................................................................................
+
+    def test_close_stops_master(self):
+
+        self.track_master("host1", "user", 22)
+        self.assertTrue(self.manager.ensure_master("host1", "user", 22))
+        control_path = self.manager._get_control_path("host1", "user", 22)
+
+        self.manager.close("host1", "user", 22)
+        self.assertTrue(self.wait_for(lambda: not _is_master_running(control_path)))
+
+        # The next command starts a new master
+        self.manager.run_command("host1", "user", "true")
+        self.assertEqual(self.get_logged_calls().count("master"), 2)
+
+    # .................................................................................................................
+
+    def test_stale_socket_is_replaced(self):
+
+        # Kill the master outright, so it leaves its socket behind (e.g. the pi lost power)
+        self.track_master("host1", "user", 22)
+        self.manager.run_command("host1", "user", "true")
+        control_path = self.manager._get_control_path("host1", "user", 22)
+        self.kill_master("host1", "user", 22)
+        self.assertTrue(os.path.exists(control_path))
+        self.assertFalse(_is_master_running(control_path))
+
+        result = self.manager.run_command("host1", "user", "echo replaced")
+        self.assertEqual(result["stdout"], "replaced\n")
+        self.assertEqual(self.get_logged_calls().count("master"), 2)
+        self.assertTrue(_is_master_running(control_path))
+
+        # Closing a host whose master is gone just cleans up the socket
+        self.kill_master("host1", "user", 22)
+        self.manager.close("host1", "user", 22)
+        self.assertFalse(os.path.exists(control_path))
+        self.assertNotIn("exit", self.get_logged_calls())
+
+    # .................................................................................................................
+
+    def test_master_check_doesnt_hang(self):
+
+        control_path = os.path.join(self.manager.control_dir, "cm-test")
+
+        # Nothing listening (a dead master's socket) fails right away
+        with socket.socket(socket.AF_UNIX) as dead_sock:
+            dead_sock.bind(control_path)
+        start_time = time.monotonic()
+        self.assertFalse(_is_master_running(control_path))
+        self.assertLess(time.monotonic() - start_time, 0.5)
+
+        # A master that's stuck (never accepting, with a full backlog) gives up after the connect timeout
+        os.unlink(control_path)
+        stuck_sock = socket.socket(socket.AF_UNIX)
+        stuck_sock.bind(control_path)
+        stuck_sock.listen(0)
+        waiting_socks = []
+        try:
+            while True:
+                each_sock = socket.socket(socket.AF_UNIX)
+                each_sock.setblocking(False)
+                waiting_socks.append(each_sock)
+                each_sock.connect(control_path)
+        except BlockingIOError:
+            pass
+
+        try:
+            start_time = time.monotonic()
+            self.assertFalse(_is_master_running(control_path))
+            self.assertLess(time.monotonic() - start_time, 2)
+        finally:
+            for each_sock in waiting_socks + [stuck_sock]:
+                each_sock.close()
+
+    # .................................................................................................................
+
+    def test_stream_command(self):
+
+        self.track_master("host1", "user", 22)
+        items_list = list(self.manager.stream_command("host1", "user", "for i in 1 2 3; do echo $i; done"))
+
+        streamed_text = "".join(each_text for each_name, each_text in items_list if each_name == "stdout")
+        self.assertEqual(streamed_text, "1\n2\n3\n")
+        exit_name, exit_dict = items_list[-1]
+        self.assertEqual(exit_name, "exit")
+        self.assertEqual((exit_dict["exit_status"], exit_dict["stdout_bytes"]), (0, 6))
+
+    # .................................................................................................................
+
+    def test_fan_out(self):
+
+        destinations = [parse_ssh_destination("user@host{}:22".format(idx)) for idx in range(4)]
+        for each_dest in destinations:
+            self.track_master(each_dest["host"], each_dest["user"], each_dest["port"])
+
+        items_list = list(self.manager.fan_out(destinations, "sleep 0.3; echo done", max_concurrency=2))
+        host_results = [each_dict for each_name, each_dict in items_list if each_name == "host_result"]
+        summary_name, summary_dict = items_list[-1]
+
+        self.assertEqual(sorted(each_dict["host"] for each_dict in host_results), ["host0", "host1", "host2", "host3"])
+        self.assertTrue(all(each_dict["stdout"] == "done\n" for each_dict in host_results))
+        self.assertEqual(summary_name, "summary")
+        self.assertEqual((summary_dict["succeeded"], summary_dict["failed"]), (4, 0))
+        self.assertEqual(self.get_logged_calls().count("master"), 4)
+
+    # .................................................................................................................
+
+    def track_master(self, host, user, port):
+        ''' Records a destination, so its master is stopped when the test ends '''
+        self._started_destinations.append((host, user, port))
+
+    # .................................................................................................................
+
+    def kill_master(self, host, user, port):
+
+        ''' Kills the stand-in master for a destination (if it's running), without cleaning up its socket '''
+
+        control_path = self.manager._get_control_path(host, user, port)
+        try:
+            with open(control_path + ".pid", "r") as pid_file:
+                master_pid = int(pid_file.read())
+            os.unlink(control_path + ".pid")
+            os.kill(master_pid, signal.SIGKILL)
+        except (FileNotFoundError, ProcessLookupError, ValueError):
+            return
+
+        # Killing isn't instant, wait for the socket to stop accepting connections
+        self.assertTrue(self.wait_for(lambda: not _is_master_running(control_path)))
+
+    # .................................................................................................................
+
+    def get_logged_calls(self):
+        with open(self.log_path, "r") as in_file:
+            return in_file.read().split()
+
+    # .................................................................................................................
+
+    def wait_for(self, check_func, timeout_sec=5):
+        end_time = time.monotonic() + timeout_sec
+        while time.monotonic() < end_time:
+            if check_func():
+                return True
+            time.sleep(0.01)
+        return False
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
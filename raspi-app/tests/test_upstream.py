@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import socket
+import threading
+import unittest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from local.lib.upstream import Upstream_Client
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Stub_Handler(BaseHTTPRequestHandler):
+
+    '''
+    Stand-in for the upstream server. Records the (client) address of every request, so connection re-use
+    can be checked. '/slow' doesn't answer until released & '/drop' closes the connection without answering
+    '''
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    # .................................................................................................................
+
+    def do_GET(self):
+
+        self.server.requests_list.append((self.path, self.client_address))
+
+        if self.path == "/slow":
+            self.server.release_event.wait(5)
+        elif self.path == "/drop":
+            self.close_connection = True
+            return
+
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # .................................................................................................................
+
+    def log_message(self, *args):
+        pass
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+@unittest.skipIf(requests is None, "requests isn't installed")
+class Test_Upstream_Client(unittest.TestCase):
+
+    '''
+    Checks the pooled client against a local stub server.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Stub_Handler)
+        self.server.requests_list = []
+        self.server.release_event = threading.Event()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = "http://127.0.0.1:{}".format(self.server.server_address[1])
+
+    # .................................................................................................................
+
+    def tearDown(self):
+        self.server.release_event.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    # .................................................................................................................
+
+    def test_connections_are_reused(self):
+
+        client = Upstream_Client(self.base_url)
+        for _ in range(20):
+            self.assertEqual(client.get("/ping").json(), {"ok": True})
+        client.close()
+
+        # Every request should have come in over the same (kept-alive) connection
+        client_addresses = {each_address for _, each_address in self.server.requests_list}
+        self.assertEqual(len(self.server.requests_list), 20)
+        self.assertEqual(len(client_addresses), 1)
+
+    # .................................................................................................................
+
+    def test_connect_errors_are_retried(self):
+
+        # Nothing listens on a port we've just released, so connections are refused
+        with socket.socket() as closed_socket:
+            closed_socket.bind(("127.0.0.1", 0))
+            closed_port = closed_socket.getsockname()[1]
+
+        client = Upstream_Client("http://127.0.0.1:{}".format(closed_port), max_retries=2, backoff_sec=0.01)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.get("/ping")
+
+        stats = client.get_stats()["/ping"]
+        self.assertEqual((stats["calls"], stats["errors"], stats["retries"]), (1, 1, 2))
+
+    # .................................................................................................................
+
+    def test_read_errors_are_not_retried(self):
+
+        # The server got these requests (& may have acted on them), so they mustn't be sent again
+        client = Upstream_Client(self.base_url, read_timeout_sec=0.2, max_retries=2, backoff_sec=0.01)
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            client.get("/slow")
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.get("/drop")
+
+        self.assertEqual([each_path for each_path, _ in self.server.requests_list], ["/slow", "/drop"])
+        for each_path in ("/slow", "/drop"):
+            stats = client.get_stats()[each_path]
+            self.assertEqual((stats["calls"], stats["errors"], stats["retries"]), (1, 1, 0))
+
+    # .................................................................................................................
+
+    def test_stats(self):
+
+        client = Upstream_Client(self.base_url, read_timeout_sec=0.2)
+        for _ in range(5):
+            client.get("/ping")
+        client.get("/ping?verbose=1", stats_name="/ping")
+        client.get("/other")
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            client.get("/slow")
+
+        all_stats = client.get_stats()
+        self.assertEqual(set(all_stats.keys()), {"/ping", "/other", "/slow"})
+
+        ping_stats = all_stats["/ping"]
+        self.assertEqual((ping_stats["calls"], ping_stats["errors"], ping_stats["retries"]), (6, 0, 0))
+        self.assertLessEqual(ping_stats["p50_ms"], ping_stats["p95_ms"])
+        self.assertLessEqual(ping_stats["p95_ms"], ping_stats["max_ms"])
+        self.assertGreater(ping_stats["mean_ms"], 0)
+
+        # Failed calls are timed too
+        slow_stats = all_stats["/slow"]
+        self.assertEqual((slow_stats["calls"], slow_stats["errors"]), (1, 1))
+        self.assertGreaterEqual(slow_stats["max_ms"], 200)
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
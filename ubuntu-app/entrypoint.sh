@@ -1,3 +1,5 @@
 #!/bin/sh
 
-$UBUNTU_APP_VENV_PATH/bin/python $UBUNTU_APP_LAUNCH_PATH
+# Resolve the 'current' release link once at startup, so this process keeps running from its own release
+# folder even if 'current' is switched to a new release (self-update) while we're running
+$UBUNTU_APP_VENV_PATH/bin/python "$(readlink -f "$UBUNTU_APP_LAUNCH_PATH")"
@@ -7,16 +7,29 @@ Created on Fri May 28 2021
 
 # ---------------------------------------------------------------------------------------------------------------------
 # %% Imports
-from flask import Flask
+import os
+import threading
+
+from flask import Flask, Response, request
 from flask_cors import CORS
 
-from waitress import serve as wsgi_serve
+from waitress import create_server as create_wsgi_server
 
 from local.lib.response_helpers import json_response, server_error_response
 
-from local.lib.server_helpers import check_git_version, register_waitress_shutdown_command
+from local.lib.server_helpers import check_git_version, register_waitress_shutdown_command, GIT_READER
+from local.lib.server_helpers import force_server_shutdown, get_git_state_signature
 from local.lib.environment import get_service_host, get_service_protocol, get_service_port, get_debugmode
+from local.lib.environment import get_update_check_interval_sec, get_update_check_max_backoff_sec, get_deploy_root
+from local.lib.environment import get_response_cache_max_entries
+from local.lib.environment import get_bulkhead_cheap_limit, get_bulkhead_control_limit, get_rate_limits
 from local.lib.helpers import reboot_with_os
+from local.lib.update_checker import Update_Checker
+from local.lib.releases import Release_Manager
+from local.lib.response_cache import Response_Cache
+from local.lib.bulkheads import Bulkhead_Pools
+from local.lib.rate_limit import Rate_Limiter
+from local.lib.metrics import METRICS
 # ---------------------------------------------------------------------------------------------------------------------
 # %% Create main routes
 
@@ -24,10 +37,28 @@ from local.lib.helpers import reboot_with_os
 wsgi_app = Flask(__name__)
 CORS(wsgi_app)
 
+# Record timing of every request (exported at /metrics)
+METRICS.instrument_flask(wsgi_app)
+
+# Limit how often each client (ip) can call the expensive & control routes, over-eager clients get a 429
+RATE_LIMITER = Rate_Limiter(get_rate_limits())
+RATE_LIMITER.install(wsgi_app)
+
+# Read-mostly routes re-use their responses (with ETags), until the data behind them changes
+RESPONSE_CACHE = Response_Cache(get_response_cache_max_entries())
+
+# Routes are split into pools that get their own share of the server threads, so slow routes can't starve the rest
+# -> Requests beyond a pool's limit get a 503 right away, rather than queueing up
+BULKHEADS = Bulkhead_Pools()
+BULKHEADS.add_pool("cheap", get_bulkhead_cheap_limit(), retry_after_sec=1)
+BULKHEADS.add_pool("control", get_bulkhead_control_limit(), retry_after_sec=10)
+
 # .....................................................................................................................
 
 
 @wsgi_app.route("/")
+@RESPONSE_CACHE.cached(validator_func=get_git_state_signature)
+@BULKHEADS.limit("cheap")
 def home_route():
     '''Home route that serves a home page of some sort'''
 
@@ -63,6 +94,8 @@ def home_route():
 
 
 @wsgi_app.route("/help")
+@RESPONSE_CACHE.cached(ttl_sec=300)
+@BULKHEADS.limit("cheap")
 def help_route():
 
     # Initialize output html listing
@@ -109,6 +142,7 @@ def help_route():
 # .....................................................................................................................
 
 @wsgi_app.route("/reboot-with-os/<string:os_select>")
+@BULKHEADS.limit("control")
 def bring_online_route(os_select):
     '''
     Reboots the desktop PC with a specified OS.
@@ -132,6 +166,178 @@ def bring_online_route(os_select):
 
 # .....................................................................................................................
 
+@wsgi_app.route("/metrics")
+def metrics_route():
+    '''
+    Gets request/subprocess timing histograms, counters & server gauges, in the Prometheus text format
+    '''
+
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+# .....................................................................................................................
+
+@wsgi_app.route("/versions")
+@BULKHEADS.limit("cheap")
+def versions_route():
+    '''
+    Gets the newer/current/older commit listing from the last background update check (doesn't touch the network)
+    Add '?refresh=1' to ask for a new check in the background. The response doesn't wait for it
+    '''
+
+    if request.args.get("refresh", "0") == "1":
+        UPDATE_CHECKER.request_check()
+
+    version_state = UPDATE_CHECKER.get_state()
+    if version_state is None:
+        response, status_code = server_error_response("Update check hasn't finished yet, try again later", 503)
+        response.headers["Retry-After"] = "5"
+        return response, status_code
+
+    return json_response(version_state)
+
+# .....................................................................................................................
+
+@wsgi_app.route("/releases")
+@BULKHEADS.limit("cheap")
+def releases_route():
+    '''
+    Lists the prepared releases (one git worktree per commit) used for self-updates, and which one is current
+    '''
+
+    return json_response(RELEASE_MANAGER.get_status())
+
+# .....................................................................................................................
+
+@wsgi_app.route("/update-to/<string:revision>")
+@BULKHEADS.limit("control")
+def update_to_route(revision):
+    '''
+    Prepares the given commit/tag as a release (separate worktree, pre-compiled), then switches to it.
+    The server restarts itself afterwards (to be started again by systemd), unless '?restart=0' is given.
+    The old release is kept on disk for instant rollbacks (see /rollback-update)
+    '''
+
+    try:
+        update_result = RELEASE_MANAGER.update_to(revision)
+    except AttributeError:
+        return server_error_response("Unknown commit: {}".format(revision), 404)
+    except RuntimeError as err:
+        return server_error_response(str(err))
+
+    update_result["restarting"] = schedule_restart(update_result["changed"])
+
+    return json_response(update_result)
+
+# .....................................................................................................................
+
+@wsgi_app.route("/rollback-update")
+@BULKHEADS.limit("control")
+def rollback_update_route():
+    '''
+    Switches back to the release that was in use before the last update, then restarts (unless '?restart=0')
+    '''
+
+    try:
+        rollback_result = RELEASE_MANAGER.rollback()
+    except RuntimeError as err:
+        return server_error_response(str(err))
+
+    rollback_result["restarting"] = schedule_restart(rollback_result["changed"])
+
+    return json_response(rollback_result)
+
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+# %% Route helpers
+
+def get_response_cache_counts():
+    '''Returns the response cache hit/miss counts, labelled for the metrics'''
+
+    cache_stats = RESPONSE_CACHE.get_stats()
+
+    return {(("result", each_key),): cache_stats[each_key] for each_key in ("hits", "misses", "not_modified")}
+
+# .....................................................................................................................
+
+def get_bulkhead_counts():
+    '''Returns how many requests each route pool let through or turned away (503), labelled for the metrics'''
+
+    counts_dict = {}
+    for each_pool, each_stats in BULKHEADS.get_stats().items():
+        for each_result in ("admitted", "rejected"):
+            counts_dict[(("pool", each_pool), ("result", each_result))] = each_stats[each_result]
+
+    return counts_dict
+
+# .....................................................................................................................
+
+def get_bulkhead_active():
+    '''Returns how many requests are running in each route pool, labelled for the metrics'''
+
+    return {(("pool", each_pool),): each_stats["active"] for each_pool, each_stats in BULKHEADS.get_stats().items()}
+
+# .....................................................................................................................
+
+def get_rate_limit_counts():
+    '''Returns how many requests were allowed or limited (429) by route, labelled for the metrics'''
+
+    counts_dict = {}
+    for each_route, each_counts in RATE_LIMITER.get_counts().items():
+        for each_result, each_count in each_counts.items():
+            counts_dict[(("route", each_route), ("result", each_result))] = each_count
+
+    return counts_dict
+
+# .....................................................................................................................
+
+def schedule_restart(release_changed):
+    '''
+    Stops the server shortly after the current response is sent, so that systemd starts it again
+    from the (new) current release. Returns True if a restart was scheduled
+    '''
+
+    restart_requested = (request.args.get("restart", "1") != "0")
+    if not (release_changed and restart_requested):
+        return False
+
+    restart_timer = threading.Timer(RESTART_DELAY_SEC, force_server_shutdown)
+    restart_timer.daemon = True
+    restart_timer.start()
+
+    return True
+
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+# %% Configure globals
+
+# Check for updates (git fetch) in the background, so version listings don't wait on the network
+UPDATE_CHECKER = Update_Checker(GIT_READER, get_update_check_interval_sec(),
+                                max_backoff_sec=get_update_check_max_backoff_sec())
+
+# Self-updates prepare each release in its own worktree (under the deploy root), next to the running one
+# -> The repo is found (from this code's location) on first use, rather than searching for it at startup
+APP_FOLDER_NAME = os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+RELEASE_MANAGER = Release_Manager(None, get_deploy_root(),
+                                  compile_subfolder=APP_FOLDER_NAME)
+RESTART_DELAY_SEC = 1.0
+
+# Include response cache results in the metrics
+METRICS.add_callback("response_cache_requests_total", "Responses served by the cache (or not), by result",
+                     get_response_cache_counts, metric_type="counter")
+
+# Include route pool (bulkhead) admissions & rejections in the metrics
+METRICS.add_callback("bulkhead_requests_total", "Requests let through or turned away (503), by route pool",
+                     get_bulkhead_counts, metric_type="counter")
+METRICS.add_callback("bulkhead_active_requests", "Requests currently running, by route pool", get_bulkhead_active)
+
+# Include per-client rate limiting in the metrics
+METRICS.add_callback("rate_limit_requests_total", "Requests allowed or limited (429) by the per-client rate limits",
+                     get_rate_limit_counts, metric_type="counter")
+METRICS.add_callback("rate_limit_buckets", "Clients being tracked by the rate limits (idle ones are dropped)",
+                     RATE_LIMITER.get_num_buckets)
+
 # ---------------------------------------------------------------------------------------------------------------------
 # %% *** Launch server ***
 
@@ -144,6 +350,9 @@ if __name__ == "__main__":
     SERVER_URL = "{}://{}:{}".format(service_protocol,
                                      service_host, service_port)
 
+    # Start checking for updates before we begin serving requests
+    UPDATE_CHECKER.start()
+
     # Launch wsgi server
     print("")
     enable_debug_mode = get_debugmode()
@@ -153,8 +362,11 @@ if __name__ == "__main__":
     else:
         # Launch server using waitress
         register_waitress_shutdown_command()
-        wsgi_serve(wsgi_app, host=service_host,
-                   port=service_port, url_scheme=service_protocol)
+        wsgi_server = create_wsgi_server(wsgi_app, host=service_host,
+                                         port=service_port, url_scheme=service_protocol)
+        METRICS.add_waitress_gauges(wsgi_server.task_dispatcher)
+        wsgi_server.print_listen("Serving on http://{}:{}")
+        wsgi_server.run()
 
     # Feedback in case we get here
     print("Done! Closing server...")
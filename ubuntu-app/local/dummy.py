@@ -1,11 +0,0 @@
-#!/usr/bin/env python3
-"""
-Created on Wed May 26 2021
-
-@author: jaredmcgrath
-"""
-
-
-def dummy_func():
-    '''Dummy func for importing path_to_local'''
-    pass
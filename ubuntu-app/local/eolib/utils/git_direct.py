@@ -0,0 +1,885 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import heapq
+import threading
+import zlib
+
+import datetime as dt
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Git_Direct_Reader:
+    
+    '''
+    Class used to read git metadata (refs, tags & commits) directly from the .git folder, without calling git.
+    Supports loose refs/objects, packed-refs, worktrees and pack files (v1/v2 idx, including delta objects).
+    Anything it can't handle (e.g. sha256 repos, alternates) raises an error other than AttributeError,
+    so that callers can fall back to using git itself
+    '''
+    
+    # .................................................................................................................
+    
+    def __init__(self, git_folder_path, common_folder_path = None):
+        
+        # Worktrees keep their own HEAD, but share everything else (refs, objects etc.) with the main repo
+        self.git_folder_path = git_folder_path
+        self.common_folder_path = git_folder_path if common_folder_path is None else common_folder_path
+        self.objects_folder_path = os.path.join(self.common_folder_path, "objects")
+        self.pack_folder_path = os.path.join(self.objects_folder_path, "pack")
+        
+        # Storage for things that only need to be re-read when the files change
+        self._lock = threading.Lock()
+        self._packed_refs_cache = (None, {}, {})
+        self._pack_index_cache = (None, [])
+        self._tags_index_cache = (None, {})
+        self._commit_cache = {}
+        self._ancestors_cache = (None, None)
+        self._min_abbrev_length = self._read_min_abbrev_length()
+    
+    # .................................................................................................................
+    
+    @classmethod
+    def create_if_supported(cls, git_folder_parent_path):
+        
+        ''' Returns a reader for the repo at the given path, or None if the repo layout isn't supported '''
+        
+        # Bail if we can't find the git folder(s)
+        git_folder_path, common_folder_path = find_git_folders(git_folder_parent_path)
+        if git_folder_path is None:
+            return None
+        
+        # Bail on repos that use features we don't handle
+        config_str = _read_text_file(os.path.join(common_folder_path, "config")) or ""
+        if "objectformat" in config_str.lower():
+            return None
+        if os.path.exists(os.path.join(common_folder_path, "objects", "info", "alternates")):
+            return None
+        
+        return cls(git_folder_path, common_folder_path)
+    
+    # .................................................................................................................
+    
+    def resolve(self, revision_str):
+        
+        '''
+        Converts a revision (e.g. "HEAD", "origin/master", "v1.0", full or short commit id) into a full object id
+        Raises an AttributeError if the revision can't be found,
+        or a NotImplementedError for revision syntax that isn't handled here (e.g. "HEAD~3")
+        '''
+        
+        # Full ids don't need any lookups
+        revision_str = revision_str.strip()
+        if any(each_char in revision_str for each_char in "~^:@{}*?[\\ "):
+            raise NotImplementedError("Revision syntax not supported: {}".format(revision_str))
+        if len(revision_str) == 40 and _is_hex(revision_str):
+            return revision_str.lower()
+        
+        # Try the same ref locations as git, in the same order
+        ref_candidates = [revision_str,
+                          "refs/{}".format(revision_str),
+                          "refs/tags/{}".format(revision_str),
+                          "refs/heads/{}".format(revision_str),
+                          "refs/remotes/{}".format(revision_str),
+                          "refs/remotes/{}/HEAD".format(revision_str)]
+        for each_ref in ref_candidates:
+            object_id = self.read_ref(each_ref)
+            if object_id is not None:
+                return object_id
+        
+        # Finally, see if we were given an abbreviated object id
+        if 4 <= len(revision_str) < 40 and _is_hex(revision_str):
+            matching_ids = self._find_objects_by_prefix(revision_str.lower(), max_matches = 2)
+            if len(matching_ids) == 1:
+                return matching_ids[0]
+        
+        raise AttributeError("Error reading git! Can't resolve revision: {}".format(revision_str))
+    
+    # .................................................................................................................
+    
+    def read_ref(self, ref_name, max_depth = 5):
+        
+        ''' Reads a ref (following symbolic refs like HEAD), returns the object id or None if it doesn't exist '''
+        
+        for _ in range(max_depth):
+            
+            # Loose refs take priority over packed refs
+            ref_str = None
+            if ref_name == "HEAD" or ref_name.startswith("refs/"):
+                ref_str = _read_text_file(os.path.join(self._get_ref_folder_path(ref_name), ref_name))
+            if ref_str is None:
+                _, packed_refs_dict, _ = self._read_packed_refs()
+                return packed_refs_dict.get(ref_name)
+            
+            # Follow symbolic refs (e.g. "ref: refs/heads/master")
+            ref_str = ref_str.strip()
+            if not ref_str.startswith("ref:"):
+                return ref_str.lower()
+            ref_name = ref_str[4:].strip()
+        
+        return None
+    
+    # .................................................................................................................
+    
+    def list_refs(self, prefix = "refs/tags/"):
+        
+        ''' Returns a dictionary of {ref name: object id} for all refs starting with the given prefix '''
+        
+        # Start with packed refs, then overwrite with loose refs, which take priority
+        _, packed_refs_dict, _ = self._read_packed_refs()
+        refs_dict = {each_name: each_id for each_name, each_id in packed_refs_dict.items()
+                     if each_name.startswith(prefix)}
+        
+        prefix_folder_path = os.path.join(self.common_folder_path, prefix)
+        for each_parent, _, each_file_names in os.walk(prefix_folder_path):
+            for each_name in each_file_names:
+                file_path = os.path.join(each_parent, each_name)
+                ref_name = os.path.relpath(file_path, self.common_folder_path).replace(os.sep, "/")
+                ref_str = _read_text_file(file_path)
+                if ref_str is not None and not ref_str.startswith("ref:"):
+                    refs_dict[ref_name] = ref_str.strip().lower()
+        
+        return refs_dict
+    
+    # .................................................................................................................
+    
+    def get_tags_for_commit(self, object_id):
+        
+        ''' Returns the (sorted) names of tags that point at the given object, directly or via an annotated tag '''
+        
+        return self._get_tags_index().get(object_id, [])
+    
+    # .................................................................................................................
+    
+    def read_commit(self, commit_id):
+        
+        '''
+        Returns a dictionary describing the commit:
+            {"id", "tree", "parents", "author", "committer", "commit_dt", "commit_time", "message"}
+        Commits never change, so results are cached
+        '''
+        
+        commit_dict = self._commit_cache.get(commit_id)
+        if commit_dict is not None:
+            return commit_dict
+        
+        object_type, object_data = self.read_object(commit_id)
+        if object_type == "tag":
+            return self.read_commit(_parse_headers(object_data)[0]["object"][0])
+        if object_type != "commit":
+            raise AttributeError("Error reading git! Object is not a commit: {}".format(commit_id))
+        
+        commit_dict = parse_commit_object(commit_id, object_data)
+        self._commit_cache[commit_id] = commit_dict
+        
+        return commit_dict
+    
+    # .................................................................................................................
+    
+    def iter_log(self, include_ids, exclude_ids = ()):
+        
+        '''
+        Walks through commits reachable from the include ids, but not from the exclude ids, newest first.
+        Uses the same (commit date) ordering as a plain 'git log'
+        '''
+        
+        excluded_set = self._get_ancestors(exclude_ids) if exclude_ids else set()
+        
+        # Priority queue of (-commit time, insertion order, id), so ties come out in the order they were found
+        seen_set = set()
+        commit_heap = []
+        insert_count = 0
+        for each_id in include_ids:
+            if each_id not in seen_set:
+                seen_set.add(each_id)
+                heapq.heappush(commit_heap, (-self.read_commit(each_id)["commit_time"], insert_count, each_id))
+                insert_count += 1
+        
+        while commit_heap:
+            _, _, commit_id = heapq.heappop(commit_heap)
+            commit_dict = self.read_commit(commit_id)
+            if commit_id in excluded_set:
+                continue
+            yield commit_dict
+            
+            for each_parent_id in commit_dict["parents"]:
+                if each_parent_id not in seen_set:
+                    seen_set.add(each_parent_id)
+                    parent_time = self.read_commit(each_parent_id)["commit_time"]
+                    heapq.heappush(commit_heap, (-parent_time, insert_count, each_parent_id))
+                    insert_count += 1
+    
+    # .................................................................................................................
+    
+    def abbreviate(self, object_id):
+        
+        ''' Returns the shortest unique abbreviation of an object id, following the same rules as git '''
+        
+        # Minimum length scales with the number of packed objects, unless core.abbrev is set (like git)
+        abbrev_length = self._min_abbrev_length
+        if abbrev_length is None:
+            num_packed_objects = sum(each_index.num_objects for each_index in self._get_pack_indexes())
+            abbrev_length = max(7, (num_packed_objects.bit_length() + 1) // 2)
+        
+        while abbrev_length < 40:
+            if len(self._find_objects_by_prefix(object_id[:abbrev_length], max_matches = 2)) < 2:
+                break
+            abbrev_length += 1
+        
+        return object_id[:abbrev_length]
+    
+    # .................................................................................................................
+    
+    def read_object(self, object_id):
+        
+        ''' Reads any object (loose or packed) from the repo. Returns: object_type (str), object_data (bytes) '''
+        
+        # Try loose objects first
+        loose_path = os.path.join(self.objects_folder_path, object_id[:2], object_id[2:])
+        try:
+            with open(loose_path, "rb") as in_file:
+                raw_bytes = zlib.decompress(in_file.read())
+            header_bytes, object_data = raw_bytes.split(b"\x00", 1)
+            object_type, _ = header_bytes.decode("ascii").split(" ")
+            return object_type, object_data
+        except FileNotFoundError:
+            pass
+        
+        # Then look for the object in the pack files
+        object_id_bytes = bytes.fromhex(object_id)
+        for each_index in self._get_pack_indexes():
+            pack_offset = each_index.find_offset(object_id_bytes)
+            if pack_offset is not None:
+                return each_index.read_pack_object(pack_offset, self.read_object)
+        
+        raise LookupError("Error reading git! Object not found: {}".format(object_id))
+    
+    # .................................................................................................................
+    
+    def _get_tags_index(self):
+        
+        '''
+        Returns a (cached) dictionary of {object id: [sorted tag names]}, which includes
+        both the tag object & the commit it points at, for annotated tags.
+        Only re-built when the tag folders (including sub-folders, e.g. refs/tags/release/) or packed-refs change
+        '''
+        
+        index_key = (get_folder_tree_signature(os.path.join(self.common_folder_path, "refs", "tags")),
+                     _get_stat_signature(os.path.join(self.common_folder_path, "packed-refs")))
+        cached_key, cached_index = self._tags_index_cache
+        if index_key == cached_key:
+            return cached_index
+        
+        _, _, peeled_dict = self._read_packed_refs()
+        names_per_id = {}
+        for each_ref, each_id in self.list_refs("refs/tags/").items():
+            tag_name = each_ref[len("refs/tags/"):]
+            names_per_id.setdefault(each_id, set()).add(tag_name)
+            
+            # Annotated tags point at a tag object, which in turn points at the commit
+            peeled_id = peeled_dict.get(each_ref)
+            if peeled_id is None:
+                object_type, object_data = self.read_object(each_id)
+                if object_type == "tag":
+                    peeled_id = _parse_headers(object_data)[0].get("object", [None])[0]
+            if peeled_id is not None:
+                names_per_id.setdefault(peeled_id, set()).add(tag_name)
+        
+        tags_index = {each_id: sorted(each_names) for each_id, each_names in names_per_id.items()}
+        self._tags_index_cache = (index_key, tags_index)
+        
+        return tags_index
+    
+    # .................................................................................................................
+    
+    def _get_ref_folder_path(self, ref_name):
+        
+        ''' Helper which returns the folder holding a given (loose) ref. Only HEAD & a few refs are per-worktree '''
+        
+        is_per_worktree = (not ref_name.startswith("refs/")) or ref_name.startswith(PER_WORKTREE_REF_PREFIXES)
+        
+        return self.git_folder_path if is_per_worktree else self.common_folder_path
+    
+    # .................................................................................................................
+    
+    def _get_ancestors(self, start_ids):
+        
+        ''' Returns the set of all commits reachable from the given commits (cached for the last set of ids) '''
+        
+        cache_key = tuple(sorted(start_ids))
+        cached_key, cached_set = self._ancestors_cache
+        if cached_key == cache_key:
+            return cached_set
+        
+        ancestors_set = set()
+        to_visit = list(start_ids)
+        while to_visit:
+            commit_id = to_visit.pop()
+            if commit_id in ancestors_set:
+                continue
+            ancestors_set.add(commit_id)
+            to_visit.extend(self.read_commit(commit_id)["parents"])
+        
+        self._ancestors_cache = (cache_key, ancestors_set)
+        
+        return ancestors_set
+    
+    # .................................................................................................................
+    
+    def _find_objects_by_prefix(self, hex_prefix, max_matches = 2):
+        
+        ''' Returns up to max_matches object ids (loose or packed) that start with the given hex prefix '''
+        
+        matching_ids = set()
+        
+        # Check loose objects, which are stored in folders named by the first 2 hex characters
+        if len(hex_prefix) >= 2:
+            loose_folder_path = os.path.join(self.objects_folder_path, hex_prefix[:2])
+            try:
+                for each_name in os.listdir(loose_folder_path):
+                    if each_name.startswith(hex_prefix[2:]):
+                        matching_ids.add(hex_prefix[:2] + each_name)
+            except FileNotFoundError:
+                pass
+        
+        for each_index in self._get_pack_indexes():
+            if len(matching_ids) >= max_matches:
+                break
+            matching_ids.update(each_index.find_by_prefix(hex_prefix, max_matches))
+        
+        return sorted(matching_ids)[:max_matches]
+    
+    # .................................................................................................................
+    
+    def _get_pack_indexes(self):
+        
+        ''' Returns the (cached) pack indexes, re-reading them only if the pack folder has changed '''
+        
+        folder_stat = _get_stat_signature(self.pack_folder_path)
+        cached_stat, cached_indexes = self._pack_index_cache
+        if folder_stat == cached_stat:
+            return cached_indexes
+        
+        with self._lock:
+            pack_indexes = []
+            try:
+                idx_file_names = sorted(each_name for each_name in os.listdir(self.pack_folder_path)
+                                        if each_name.endswith(".idx"))
+            except FileNotFoundError:
+                idx_file_names = []
+            
+            for each_name in idx_file_names:
+                idx_path = os.path.join(self.pack_folder_path, each_name)
+                pack_path = idx_path[:-len(".idx")] + ".pack"
+                if os.path.exists(pack_path):
+                    pack_indexes.append(Pack_Index(idx_path, pack_path))
+            
+            self._pack_index_cache = (folder_stat, pack_indexes)
+        
+        return pack_indexes
+    
+    # .................................................................................................................
+    
+    def _read_packed_refs(self):
+        
+        '''
+        Returns the (cached) contents of the packed-refs file as:
+            stat signature, {ref name: object id}, {ref name: peeled object id}
+        '''
+        
+        packed_refs_path = os.path.join(self.common_folder_path, "packed-refs")
+        file_stat = _get_stat_signature(packed_refs_path)
+        if file_stat == self._packed_refs_cache[0]:
+            return self._packed_refs_cache
+        
+        refs_dict = {}
+        peeled_dict = {}
+        prev_ref_name = None
+        for each_line in (_read_text_file(packed_refs_path) or "").splitlines():
+            if not each_line or each_line.startswith("#"):
+                continue
+            
+            # Lines starting with '^' hold the commit that the previous (annotated tag) line points to
+            if each_line.startswith("^"):
+                if prev_ref_name is not None:
+                    peeled_dict[prev_ref_name] = each_line[1:].strip().lower()
+                continue
+            
+            object_id, ref_name = each_line.split(" ", 1)
+            refs_dict[ref_name.strip()] = object_id.lower()
+            prev_ref_name = ref_name.strip()
+        
+        self._packed_refs_cache = (file_stat, refs_dict, peeled_dict)
+        
+        return self._packed_refs_cache
+    
+    # .................................................................................................................
+    
+    def _read_min_abbrev_length(self):
+        
+        ''' Reads core.abbrev from the repo config, if it's set to a number (otherwise returns None) '''
+        
+        in_core_section = False
+        for each_line in (_read_text_file(os.path.join(self.common_folder_path, "config")) or "").splitlines():
+            each_line = each_line.strip()
+            if each_line.startswith("["):
+                in_core_section = (each_line.lower() == "[core]")
+                continue
+            if in_core_section and "=" in each_line:
+                key_str, value_str = [each_str.strip() for each_str in each_line.split("=", 1)]
+                if key_str.lower() == "abbrev" and value_str.isdigit():
+                    return max(4, int(value_str))
+        
+        return None
+    
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Pack_Index:
+    
+    ''' Class used to look up objects in a single pack file, through its .idx file '''
+    
+    # .................................................................................................................
+    
+    def __init__(self, idx_path, pack_path):
+        
+        self.idx_path = idx_path
+        self.pack_path = pack_path
+        
+        with open(idx_path, "rb") as in_file:
+            idx_bytes = in_file.read()
+        
+        # Version 2 indexes start with a magic number, version 1 indexes go straight into the fan-out table
+        self.version = 2 if idx_bytes[:4] == b"\xfftOc" else 1
+        fanout_start = 8 if self.version == 2 else 0
+        self._fanout = [int.from_bytes(idx_bytes[fanout_start + 4 * k : fanout_start + 4 * (k + 1)], "big")
+                        for k in range(256)]
+        self.num_objects = self._fanout[255]
+        self._idx_bytes = idx_bytes
+        self._table_start = fanout_start + 4 * 256
+    
+    # .................................................................................................................
+    
+    def get_object_id(self, position):
+        
+        ''' Returns the (binary) object id at the given (sorted) position in the index '''
+        
+        if self.version == 2:
+            id_start = self._table_start + 20 * position
+        else:
+            id_start = self._table_start + 24 * position + 4
+        
+        return self._idx_bytes[id_start : id_start + 20]
+    
+    # .................................................................................................................
+    
+    def find_offset(self, object_id_bytes):
+        
+        ''' Returns the pack file offset of the given (binary) object id, or None if it isn't in this pack '''
+        
+        position = self._bisect(object_id_bytes)
+        if position >= self.num_objects or self.get_object_id(position) != object_id_bytes:
+            return None
+        
+        return self._get_offset(position)
+    
+    # .................................................................................................................
+    
+    def find_by_prefix(self, hex_prefix, max_matches = 2):
+        
+        ''' Returns up to max_matches (hex) object ids in this pack that start with the given hex prefix '''
+        
+        # Pad odd-length prefixes with a zero, which sorts before every other object id with that prefix
+        padded_hex = hex_prefix if len(hex_prefix) % 2 == 0 else hex_prefix + "0"
+        position = self._bisect(bytes.fromhex(padded_hex))
+        
+        matching_ids = []
+        while position < self.num_objects and len(matching_ids) < max_matches:
+            each_hex = self.get_object_id(position).hex()
+            if not each_hex.startswith(hex_prefix):
+                break
+            matching_ids.append(each_hex)
+            position += 1
+        
+        return matching_ids
+    
+    # .................................................................................................................
+    
+    def read_pack_object(self, pack_offset, read_object_func):
+        
+        '''
+        Reads the object stored at the given pack offset, resolving delta-compressed objects.
+        read_object_func(object_id) is used to find the base of ref-deltas (which may be in another pack)
+        Returns: object_type (str), object_data (bytes)
+        '''
+        
+        with open(self.pack_path, "rb") as pack_file:
+            return self._read_pack_object(pack_file, pack_offset, read_object_func)
+    
+    # .................................................................................................................
+    
+    def _read_pack_object(self, pack_file, pack_offset, read_object_func):
+        
+        # Read the type & (uncompressed) size header
+        pack_file.seek(pack_offset)
+        header_byte = pack_file.read(1)[0]
+        type_number = (header_byte >> 4) & 0x07
+        object_size = header_byte & 0x0F
+        shift = 4
+        while header_byte & 0x80:
+            header_byte = pack_file.read(1)[0]
+            object_size |= (header_byte & 0x7F) << shift
+            shift += 7
+        
+        # Offset deltas store their base as a (negative) offset into this pack, ref deltas store the base id
+        base_offset = base_id = None
+        if type_number == OBJ_OFS_DELTA:
+            offset_byte = pack_file.read(1)[0]
+            relative_offset = offset_byte & 0x7F
+            while offset_byte & 0x80:
+                offset_byte = pack_file.read(1)[0]
+                relative_offset = ((relative_offset + 1) << 7) | (offset_byte & 0x7F)
+            base_offset = pack_offset - relative_offset
+        elif type_number == OBJ_REF_DELTA:
+            base_id = pack_file.read(20).hex()
+        
+        data_bytes = _inflate_from_file(pack_file, object_size)
+        
+        # Non-delta objects are done
+        if type_number in PACK_OBJECT_TYPES:
+            return PACK_OBJECT_TYPES[type_number], data_bytes
+        
+        if base_offset is not None:
+            base_type, base_bytes = self._read_pack_object(pack_file, base_offset, read_object_func)
+        elif base_id is not None:
+            base_type, base_bytes = read_object_func(base_id)
+        else:
+            raise ValueError("Error reading git! Unknown pack object type: {}".format(type_number))
+        
+        return base_type, _apply_delta(base_bytes, data_bytes)
+    
+    # .................................................................................................................
+    
+    def _bisect(self, object_id_bytes):
+        
+        ''' Returns the first (sorted) position whose object id is >= the given id, using the fan-out table '''
+        
+        first_byte = object_id_bytes[0]
+        low_idx = self._fanout[first_byte - 1] if first_byte > 0 else 0
+        high_idx = self._fanout[first_byte]
+        while low_idx < high_idx:
+            mid_idx = (low_idx + high_idx) // 2
+            if self.get_object_id(mid_idx) < object_id_bytes:
+                low_idx = mid_idx + 1
+            else:
+                high_idx = mid_idx
+        
+        return low_idx
+    
+    # .................................................................................................................
+    
+    def _get_offset(self, position):
+        
+        if self.version == 1:
+            offset_start = self._table_start + 24 * position
+            return int.from_bytes(self._idx_bytes[offset_start : offset_start + 4], "big")
+        
+        # Version 2: id table, then crc table, then 4-byte offsets (with large offsets stored in a separate table)
+        offsets_start = self._table_start + 24 * self.num_objects
+        offset_start = offsets_start + 4 * position
+        offset = int.from_bytes(self._idx_bytes[offset_start : offset_start + 4], "big")
+        if offset & 0x80000000:
+            large_offsets_start = offsets_start + 4 * self.num_objects
+            large_start = large_offsets_start + 8 * (offset & 0x7FFFFFFF)
+            offset = int.from_bytes(self._idx_bytes[large_start : large_start + 8], "big")
+        
+        return offset
+    
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def find_git_folders(git_folder_parent_path):
+    
+    '''
+    Function which finds the git folders for a repo (or worktree) checked out at the given path
+    Normal repos have a .git folder, while worktrees have a .git file pointing to a folder inside the main repo:
+        gitdir: /path/to/main/repo/.git/worktrees/<name>
+    Returns:
+        git_folder_path (holds HEAD), common_folder_path (holds refs, objects etc.)
+        -> Returns (None, None) if there is no git folder
+    '''
+    
+    # Bail on missing pathing
+    if git_folder_parent_path is None:
+        return None, None
+    
+    git_folder_path = os.path.join(git_folder_parent_path, ".git")
+    if os.path.isfile(git_folder_path):
+        gitdir_str = (_read_text_file(git_folder_path) or "").strip()
+        if not gitdir_str.startswith("gitdir:"):
+            return None, None
+        git_folder_path = os.path.join(git_folder_parent_path, gitdir_str[len("gitdir:"):].strip())
+    
+    if not os.path.isfile(os.path.join(git_folder_path, "HEAD")):
+        return None, None
+    
+    # Worktree folders have a 'commondir' file, pointing (usually relatively) to the main .git folder
+    common_folder_path = git_folder_path
+    commondir_str = _read_text_file(os.path.join(git_folder_path, "commondir"))
+    if commondir_str is not None:
+        common_folder_path = os.path.normpath(os.path.join(git_folder_path, commondir_str.strip()))
+    
+    return git_folder_path, common_folder_path
+
+# .....................................................................................................................
+
+def parse_commit_object(commit_id, object_data):
+    
+    '''
+    Function which converts the raw data of a commit object into a dictionary:
+        {"id", "tree", "parents", "author", "committer", "commit_dt", "commit_time", "message"}
+    '''
+    
+    headers_dict, message_bytes = _parse_headers(object_data)
+    encoding = headers_dict.get("encoding", ["utf-8"])[0]
+    committer_str = headers_dict["committer"][0]
+    commit_time, commit_dt = _parse_signature_time(committer_str)
+    
+    return {"id": commit_id,
+            "tree": headers_dict["tree"][0],
+            "parents": headers_dict.get("parent", []),
+            "author": headers_dict.get("author", [""])[0],
+            "committer": committer_str,
+            "commit_time": commit_time,
+            "commit_dt": commit_dt,
+            "message": message_bytes.decode(encoding, errors = "replace")}
+
+# .....................................................................................................................
+
+def _read_text_file(file_path):
+    
+    ''' Helper which returns the contents of a (small) text file, or None if it doesn't exist '''
+    
+    try:
+        with open(file_path, "r") as in_file:
+            return in_file.read()
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None
+
+# .....................................................................................................................
+
+def _get_stat_signature(file_path):
+    
+    ''' Helper which returns a tuple that changes whenever the file is modified (or None if it doesn't exist) '''
+    
+    try:
+        file_stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    
+    return (file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino)
+
+# .....................................................................................................................
+
+def get_folder_tree_signature(folder_path):
+    
+    '''
+    Helper which returns a tuple that changes whenever a file is added, removed or replaced in the folder
+    or any of its sub-folders (since adding a file only changes the modified time of the folder holding it)
+    '''
+    
+    folder_signatures = []
+    for each_parent, each_folder_names, _ in os.walk(folder_path):
+        each_folder_names.sort()
+        folder_signatures.append((each_parent, _get_stat_signature(each_parent)))
+    
+    return tuple(folder_signatures)
+
+# .....................................................................................................................
+
+def _is_hex(input_str):
+    return all(each_char in "0123456789abcdefABCDEF" for each_char in input_str)
+
+# .....................................................................................................................
+
+def _parse_headers(object_data):
+    
+    '''
+    Helper which splits a commit/tag object into its headers & message
+    Returns: headers_dict ({key: [values]}), message_bytes
+    '''
+    
+    header_bytes, _, message_bytes = object_data.partition(b"\n\n")
+    
+    headers_dict = {}
+    prev_key = None
+    for each_line in header_bytes.decode("utf-8", errors = "replace").split("\n"):
+        
+        # Lines starting with a space continue the previous header (e.g. gpg signatures)
+        if each_line.startswith(" ") and prev_key is not None:
+            headers_dict[prev_key][-1] += "\n" + each_line[1:]
+            continue
+        
+        key_str, _, value_str = each_line.partition(" ")
+        headers_dict.setdefault(key_str, []).append(value_str)
+        prev_key = key_str
+    
+    return headers_dict, message_bytes
+
+# .....................................................................................................................
+
+def _parse_signature_time(signature_str):
+    
+    '''
+    Helper which pulls the timestamp out of an author/committer line, keeping the original timezone
+    Example signature str:
+        "Jared McGrath <jared@example.com> 1596650945 -0400"
+    Returns: epoch_time (int), datetime
+    '''
+    
+    # Split from the right, since names can contain spaces
+    _, epoch_str, tz_str = signature_str.rsplit(" ", 2)
+    epoch_time = int(epoch_str)
+    
+    tz_sign = -1 if tz_str.startswith("-") else 1
+    tz_minutes = 60 * int(tz_str[-4:-2]) + int(tz_str[-2:])
+    tz_info = dt.timezone(dt.timedelta(minutes = tz_sign * tz_minutes))
+    
+    return epoch_time, dt.datetime.fromtimestamp(epoch_time, tz = tz_info)
+
+# .....................................................................................................................
+
+def _inflate_from_file(in_file, expected_size, chunk_size = 4096):
+    
+    ''' Helper which decompresses one zlib stream from the current position of a file '''
+    
+    decompressor = zlib.decompressobj()
+    output_chunks = []
+    while not decompressor.eof:
+        compressed_chunk = in_file.read(chunk_size)
+        if not compressed_chunk:
+            raise ValueError("Error reading git! Truncated pack data")
+        output_chunks.append(decompressor.decompress(compressed_chunk))
+    
+    data_bytes = b"".join(output_chunks)
+    if len(data_bytes) != expected_size:
+        raise ValueError("Error reading git! Pack object size mismatch")
+    
+    return data_bytes
+
+# .....................................................................................................................
+
+def _read_delta_size(delta_bytes, position):
+    
+    ''' Helper which reads a size (little-endian base-128) from a delta header. Returns: size, new position '''
+    
+    size = 0
+    shift = 0
+    while True:
+        each_byte = delta_bytes[position]
+        position += 1
+        size |= (each_byte & 0x7F) << shift
+        shift += 7
+        if not (each_byte & 0x80):
+            return size, position
+
+# .....................................................................................................................
+
+def _apply_delta(base_bytes, delta_bytes):
+    
+    ''' Helper which rebuilds an object from its base and a git delta (a list of copy/insert instructions) '''
+    
+    base_size, position = _read_delta_size(delta_bytes, 0)
+    result_size, position = _read_delta_size(delta_bytes, position)
+    if base_size != len(base_bytes):
+        raise ValueError("Error reading git! Delta base size mismatch")
+    
+    output_parts = []
+    num_delta_bytes = len(delta_bytes)
+    while position < num_delta_bytes:
+        opcode = delta_bytes[position]
+        position += 1
+        
+        # Copy instruction: bits 0-3 flag which offset bytes follow, bits 4-6 flag which size bytes follow
+        if opcode & 0x80:
+            copy_offset = copy_size = 0
+            for k in range(4):
+                if opcode & (1 << k):
+                    copy_offset |= delta_bytes[position] << (8 * k)
+                    position += 1
+            for k in range(3):
+                if opcode & (1 << (4 + k)):
+                    copy_size |= delta_bytes[position] << (8 * k)
+                    position += 1
+            copy_size = copy_size or 0x10000
+            output_parts.append(base_bytes[copy_offset : copy_offset + copy_size])
+        
+        # Insert instruction: the opcode is the number of literal bytes that follow
+        elif opcode:
+            output_parts.append(delta_bytes[position : position + opcode])
+            position += opcode
+        
+        else:
+            raise ValueError("Error reading git! Invalid delta opcode")
+    
+    result_bytes = b"".join(output_parts)
+    if len(result_bytes) != result_size:
+        raise ValueError("Error reading git! Delta result size mismatch")
+    
+    return result_bytes
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Refs that belong to each worktree separately, rather than the (shared) main repo
+PER_WORKTREE_REF_PREFIXES = ("refs/worktree/", "refs/bisect/", "refs/rewritten/")
+
+# Pack object type numbers
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+PACK_OBJECT_TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+    
+    import sys
+    
+    repo_path = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    ex_reader = Git_Direct_Reader.create_if_supported(repo_path)
+    if ex_reader is None:
+        print("", "Repo layout not supported (or not a repo): {}".format(repo_path), sep = "\n")
+    else:
+        head_id = ex_reader.resolve("HEAD")
+        for each_commit in ex_reader.iter_log([head_id]):
+            print(ex_reader.abbreviate(each_commit["id"]), each_commit["commit_dt"],
+                  ex_reader.get_tags_for_commit(each_commit["id"]))
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
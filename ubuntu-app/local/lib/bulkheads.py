@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import functools
+import threading
+
+from flask import make_response
+
+from local.lib.response_helpers import server_error_response
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class _Pool:
+
+    ''' Concurrency limit & counts for one class of routes '''
+
+    def __init__(self, pool_name, max_concurrent, retry_after_sec):
+        self.pool_name = pool_name
+        self.max_concurrent = max_concurrent
+        self.retry_after_sec = retry_after_sec
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Bulkhead_Pools:
+
+    '''
+    Limits how many requests of each class of route (e.g. 'cheap', 'slow', 'control') can run at once,
+    so that slow routes can't take every server thread and starve the cheap ones.
+    Requests beyond the limit of their pool are turned away right away (503 with Retry-After),
+    rather than queueing up behind the requests that are already running
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    # .................................................................................................................
+
+    def add_pool(self, pool_name, max_concurrent, retry_after_sec=1):
+
+        ''' Sets up a named pool, allowing at most max_concurrent requests to run at once '''
+
+        with self._lock:
+            self._pools[pool_name] = _Pool(pool_name, max(1, max_concurrent), retry_after_sec)
+
+    # .................................................................................................................
+
+    def limit(self, pool_name):
+
+        '''
+        Decorator for flask routes (place it below the @route decorator, and below any @cached decorator,
+        so that cached responses don't need a slot). The pool must be added before the route is decorated.
+        Streamed responses hold their slot until the response is closed, everything else frees the slot
+        as soon as the route returns
+        '''
+
+        pool = self._pools[pool_name]
+
+        def decorator(route_func):
+
+            @functools.wraps(route_func)
+            def limited_route(*args, **kwargs):
+
+                # Fail fast if the pool is full
+                if not self._try_acquire(pool):
+                    error_msg = "Too many '{}' requests running, try again later".format(pool.pool_name)
+                    response, status_code = server_error_response(error_msg, 503)
+                    response.headers["Retry-After"] = str(pool.retry_after_sec)
+                    return response, status_code
+
+                try:
+                    response = make_response(route_func(*args, **kwargs))
+                except BaseException:
+                    self._release(pool)
+                    raise
+
+                if response.is_streamed:
+                    response.call_on_close(lambda: self._release(pool))
+                else:
+                    self._release(pool)
+
+                return response
+
+            return limited_route
+
+        return decorator
+
+    # .................................................................................................................
+
+    def check_thread_budget(self, num_threads, shared_pool_name="cheap"):
+
+        '''
+        Makes sure that the other pools can't take every server thread between them, so that at least one
+        thread is always left for the shared (e.g. cheap) pool. Raises a ValueError if the limits don't fit
+        '''
+
+        with self._lock:
+            reserved_limits = {each_name: each_pool.max_concurrent
+                               for each_name, each_pool in self._pools.items() if each_name != shared_pool_name}
+
+        num_reserved = sum(reserved_limits.values())
+        if num_reserved >= num_threads:
+            raise ValueError("Route pool limits {} use {} of {} server threads, leaving none for '{}' routes!"
+                             " Lower the limits or use more threads".format(reserved_limits, num_reserved,
+                                                                           num_threads, shared_pool_name))
+
+    # .................................................................................................................
+
+    def get_stats(self):
+
+        '''
+        Returns a dictionary of:
+            {pool_name: {"max_concurrent": int, "active": int, "admitted": int, "rejected": int}}
+        '''
+
+        with self._lock:
+            return {each_name: {"max_concurrent": each_pool.max_concurrent,
+                                "active": each_pool.active,
+                                "admitted": each_pool.admitted,
+                                "rejected": each_pool.rejected}
+                    for each_name, each_pool in self._pools.items()}
+
+    # .................................................................................................................
+
+    def _try_acquire(self, pool):
+
+        with self._lock:
+            if pool.active >= pool.max_concurrent:
+                pool.rejected += 1
+                return False
+            pool.active += 1
+            pool.admitted += 1
+
+        return True
+
+    # .................................................................................................................
+
+    def _release(self, pool):
+        with self._lock:
+            pool.active -= 1
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from flask import Flask
+
+    # Small app with one slow route, limited to 2 requests at a time
+    ex_app = Flask(__name__)
+    ex_pools = Bulkhead_Pools()
+    ex_pools.add_pool("slow", 2, retry_after_sec=5)
+
+    @ex_app.route("/slow")
+    @ex_pools.limit("slow")
+    def slow_route():
+        time.sleep(0.5)
+        return "done"
+
+    def call_slow_route(_):
+        with ex_app.test_client() as client:
+            response = client.get("/slow")
+            return response.status_code, response.headers.get("Retry-After")
+
+    with ThreadPoolExecutor(5) as pool:
+        print("", "Status codes:", list(pool.map(call_slow_route, range(5))), sep="\n")
+    print("Pool stats:", ex_pools.get_stats())
+
+    # The 2 slow slots don't fit in 2 server threads (nothing would be left for other routes)
+    try:
+        ex_pools.check_thread_budget(2)
+    except ValueError as err:
+        print("", "Thread budget:", err, sep="\n")
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -7,50 +7,11 @@ Created on Tue Jul 1 2021
 """
 
 
-# ---------------------------------------------------------------------------------------------------------------------
-#%% Add local path
-
-import os
-import sys
-
-def find_path_to_local(target_folder = "local"):
-    '''Finds the path to the local folder so that local imports work properly'''
-
-    # Skip path finding if we successfully import the dummy file
-    try:
-        from local.dummy import dummy_func
-        dummy_func()
-        return
-    except ImportError:
-        print("", "Couldn't find local directory!", "Searching for path...", sep="\n")
-
-    # Figure out where this file is located so we can work backwards to find the target folder
-    file_directory = os.path.dirname(os.path.abspath(__file__))
-    path_check = []
-
-    # Check parent directories to see if we hit the main project directory containing the target folder
-    prev_working_path = working_path = file_directory
-    while True:
-        # If we find the target folder in the given directory, add it to the python path (if it's not already there)
-        if target_folder in os.listdir(working_path):
-            if working_path not in sys.path:
-                tilde_swarm = "~"*(4 + len(working_path))
-                print("\n{0}\nPython path updated:\n  {1}\n{0}".format(tilde_swarm, working_path))
-                sys.path.append(working_path)
-            break
-
-        # Stop if we hit the filesystem root directory (parent directory isn't changing)
-        prev_working_path, working_path = working_path, os.path.dirname(working_path)
-        path_check.append(prev_working_path)
-        if prev_working_path == working_path:
-            print("\nTried paths:", *path_check, "", sep="\n  ")
-            raise ImportError("Can't find '{}' directory!".format(target_folder))
-
-find_path_to_local()
-
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Imports
 
+import os
+import json
 # .....................................................................................................................
 # .....................................................................................................................
 
@@ -100,6 +61,73 @@ def get_debugmode():
 
 # ---------------------------------------------------------------------------------------------------------------------
 
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Update checking
+
+# .....................................................................................................................
+
+def get_update_check_interval_sec():
+    """Returns UPDATE_CHECK_INTERVAL_S (time between background 'git fetch' checks for updates) if set, or 900"""
+    return float(os.environ.get("UPDATE_CHECK_INTERVAL_S", 900))
+
+# .....................................................................................................................
+
+def get_update_check_max_backoff_sec():
+    """Returns UPDATE_CHECK_MAX_BACKOFF_S (longest wait between retries after failed fetches) if set, or 3600"""
+    return float(os.environ.get("UPDATE_CHECK_MAX_BACKOFF_S", 3600))
+
+# .....................................................................................................................
+
+def get_deploy_root():
+    """Returns DEPLOY_ROOT (folder holding release worktrees & the 'current' link) if set, or a default path"""
+    return os.environ.get("DEPLOY_ROOT", "/home/jared/remote-compute-access-releases")
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Response caching
+
+# .....................................................................................................................
+
+def get_response_cache_max_entries():
+    """Returns RESPONSE_CACHE_MAX_ENTRIES (number of responses kept for read-mostly routes) if set, or 128"""
+    return int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 128))
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Admission control
+
+# .....................................................................................................................
+
+def get_bulkhead_cheap_limit():
+    """Returns BULKHEAD_CHEAP_LIMIT (max. requests at once for quick routes, e.g. /versions) if set, or 6"""
+    return int(os.environ.get("BULKHEAD_CHEAP_LIMIT", 6))
+
+# .....................................................................................................................
+
+def get_bulkhead_control_limit():
+    """Returns BULKHEAD_CONTROL_LIMIT (max. requests at once for reboot & self-update routes) if set, or 1"""
+    return int(os.environ.get("BULKHEAD_CONTROL_LIMIT", 1))
+
+# .....................................................................................................................
+
+def get_rate_limits():
+    """
+    Returns RATE_LIMITS (json object of {route: [requests per minute, burst]}, limited per client ip) if set,
+    or limits for the control (reboot, update) routes
+    """
+    default_limits = {"/reboot-with-os/<string:os_select>": [3, 2],
+                      "/update-to/<string:revision>": [3, 2],
+                      "/rollback-update": [3, 2]}
+    limits_json = os.environ.get("RATE_LIMITS")
+    return default_limits if limits_json is None else json.loads(limits_json)
+
+# .....................................................................................................................
+# .....................................................................................................................
+
 # ---------------------------------------------------------------------------------------------------------------------
 #%% Demo
 
@@ -113,6 +141,14 @@ if __name__ == "__main__":
     print("SERVICE_HOST:", get_service_host())
     print("SERVICE_PORT:", get_service_port())
     print("")
+    print("UPDATE_CHECK_INTERVAL_S", get_update_check_interval_sec())
+    print("UPDATE_CHECK_MAX_BACKOFF_S", get_update_check_max_backoff_sec())
+    print("DEPLOY_ROOT", get_deploy_root())
+    print("RESPONSE_CACHE_MAX_ENTRIES", get_response_cache_max_entries())
+    print("BULKHEAD_CHEAP_LIMIT", get_bulkhead_cheap_limit())
+    print("BULKHEAD_CONTROL_LIMIT", get_bulkhead_control_limit())
+    print("RATE_LIMITS", get_rate_limits())
+    print("")
 
 
 # ---------------------------------------------------------------------------------------------------------------------
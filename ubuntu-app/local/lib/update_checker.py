@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import random
+import signal
+import threading
+import time
+
+from local.lib.shared_files import save_json, load_json
+from local.lib.timekeeper_utils import get_current_ems
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define classes
+
+class Update_Checker:
+
+    '''
+    Fetches from the git remote on a schedule (from a background thread) and keeps the resulting
+    newer/current/older commit listing in memory, so routes can report available updates without
+    blocking on the network. Failed fetches are retried with an exponential backoff
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, git_reader, interval_sec=900, jitter_fraction=0.1, max_backoff_sec=3600,
+                 max_listings=6, fetch_timeout_sec=60, shared_state_path=None):
+
+        '''
+        If a shared state path is given, every check result is also saved to that (json) file,
+        so other processes can read it (see Shared_Update_Checker)
+        '''
+
+        self.git_reader = git_reader
+        self.shared_state_path = shared_state_path
+        self.interval_sec = interval_sec
+        self.jitter_fraction = jitter_fraction
+        self.max_backoff_sec = max_backoff_sec
+        self.max_listings = max_listings
+        self.fetch_timeout_sec = fetch_timeout_sec
+
+        # Latest check result is replaced as a whole, so readers never see a half-updated state
+        self._state_lock = threading.Lock()
+        self._latest = None
+        self._num_fetch_failures = 0
+        self._next_check_mono = None
+
+        # Separate events for stopping vs. waking up early for a new check
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = None
+
+    # .................................................................................................................
+
+    def start(self):
+
+        ''' Starts the background checking thread (does nothing if it's already running) '''
+
+        if self.is_running():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="update-checker", daemon=True)
+        self._thread.start()
+
+    # .................................................................................................................
+
+    def stop(self, join_timeout_sec=2.0):
+
+        ''' Stops the background checking thread (a fetch that's already running is left to finish) '''
+
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(join_timeout_sec)
+        self._thread = None
+
+    # .................................................................................................................
+
+    def is_running(self):
+        return (self._thread is not None) and self._thread.is_alive()
+
+    # .................................................................................................................
+
+    def request_check(self):
+
+        ''' Asks the background thread to check right away, instead of waiting for the next scheduled check '''
+
+        self._wake_event.set()
+
+    # .................................................................................................................
+
+    def listen_for_check_requests(self):
+
+        '''
+        Lets other processes ask for a check (see Shared_Update_Checker.request_check), by signalling this process.
+        Must be called from the main thread
+        '''
+
+        signal.signal(CHECK_REQUEST_SIGNAL, lambda *_: self.request_check())
+
+    # .................................................................................................................
+
+    def get_state(self):
+
+        '''
+        Returns the most recent check result (with its age), without checking.
+        Returns None if no check has finished yet
+        '''
+
+        with self._state_lock:
+            latest = self._latest
+            next_check_mono = self._next_check_mono
+
+        return _format_state(latest, next_check_mono)
+
+    # .................................................................................................................
+
+    def check_now(self, fetch_first=True):
+
+        '''
+        Runs a check (in the calling thread), updates the cached state and returns it.
+        The commit listing is still updated if fetching fails, using whatever was fetched previously
+        '''
+
+        # Get latest info from the remote, if possible (new tags aren't followed when fetching a named branch)
+        fetch_error = None
+        if fetch_first:
+            try:
+                self.git_reader.fetch("--tags", timeout_sec=self.fetch_timeout_sec)
+            except Exception as err:
+                fetch_error = str(err)
+
+        # Build the listing from the local copy of the repo (doesn't touch the network)
+        listing_error = None
+        commit_listings = []
+        try:
+            commit_listings = self.git_reader.get_commit_listings(self.max_listings)
+        except Exception as err:
+            listing_error = str(err)
+
+        with self._state_lock:
+            self._num_fetch_failures = (self._num_fetch_failures + 1) if fetch_error else 0
+            num_fetch_failures = self._num_fetch_failures
+
+        # Newer commits are listed before the one in use
+        in_use_idx = next((idx for idx, each_listing in enumerate(commit_listings) if each_listing["in_use"]), 0)
+        check_result = {"commit_listings": commit_listings,
+                        "num_newer": in_use_idx,
+                        "update_available": (in_use_idx > 0),
+                        "checked_at_ems": get_current_ems(),
+                        "fetch_ok": fetch_first and (fetch_error is None),
+                        "fetch_error": fetch_error,
+                        "num_fetch_failures": num_fetch_failures,
+                        "listing_error": listing_error}
+
+        with self._state_lock:
+            self._latest = (check_result, time.monotonic())
+        self._save_shared_state()
+
+        return {**check_result, "age_sec": 0}
+
+    # .................................................................................................................
+
+    def get_next_delay_sec(self, num_fetch_failures):
+
+        '''
+        Returns the time to wait before the next check.
+        Normally this is the check interval, but after failed fetches we retry sooner and then back off
+        (doubling each time, up to the max backoff). Jitter is added so multiple devices don't fetch in lockstep
+        '''
+
+        if num_fetch_failures == 0:
+            base_delay_sec = self.interval_sec
+        else:
+            first_retry_sec = min(self.interval_sec, 30)
+            base_delay_sec = min(self.max_backoff_sec, first_retry_sec * (2 ** (num_fetch_failures - 1)))
+
+        jitter_scale = 1.0 + random.uniform(-self.jitter_fraction, self.jitter_fraction)
+
+        return max(1.0, base_delay_sec * jitter_scale)
+
+    # .................................................................................................................
+
+    def _run(self):
+
+        # Start with a short random delay, so a batch of servers started together don't all fetch at once
+        first_delay_sec = random.uniform(0, min(5.0, self.interval_sec * self.jitter_fraction))
+        self._schedule_next(first_delay_sec)
+        self._stop_event.wait(first_delay_sec)
+
+        while not self._stop_event.is_set():
+
+            self._wake_event.clear()
+            try:
+                check_result = self.check_now()
+                num_fetch_failures = check_result["num_fetch_failures"]
+            except Exception as err:
+                print("", "Error (Update_Checker):", "  {}".format(err), sep="\n")
+                num_fetch_failures = self._num_fetch_failures + 1
+
+            delay_sec = self.get_next_delay_sec(num_fetch_failures)
+            self._schedule_next(delay_sec)
+            self._wake_event.wait(delay_sec)
+
+    # .................................................................................................................
+
+    def _schedule_next(self, delay_sec):
+        with self._state_lock:
+            self._next_check_mono = time.monotonic() + delay_sec
+        self._save_shared_state()
+
+    # .................................................................................................................
+
+    def _save_shared_state(self):
+
+        if self.shared_state_path is None:
+            return
+
+        # Monotonic times are system-wide (on linux), so they can be shared with other processes
+        with self._state_lock:
+            state_dict = {"latest": self._latest, "next_check_mono": self._next_check_mono, "pid": os.getpid()}
+        try:
+            save_json(self.shared_state_path, state_dict)
+        except (OSError, TypeError, ValueError) as err:
+            print("", "Error saving update check state:", "  {}".format(err), sep="\n")
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Shared_Update_Checker(Update_Checker):
+
+    '''
+    Reports the update checks made by an Update_Checker running in another process (e.g. when the server runs
+    as several worker processes), through its shared state file, rather than fetching from the remote itself.
+    Requests for a new check are passed on to the process doing the checks
+    '''
+
+    # .................................................................................................................
+
+    def __init__(self, shared_state_path):
+        super().__init__(None, shared_state_path=shared_state_path)
+
+    # .................................................................................................................
+
+    def start(self):
+        pass
+
+    # .................................................................................................................
+
+    def request_check(self):
+
+        state_dict = load_json(self.shared_state_path)
+        if state_dict is None:
+            return
+
+        try:
+            os.kill(state_dict["pid"], CHECK_REQUEST_SIGNAL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    # .................................................................................................................
+
+    def get_state(self):
+
+        state_dict = load_json(self.shared_state_path)
+        if state_dict is None:
+            return None
+
+        return _format_state(state_dict["latest"], state_dict["next_check_mono"])
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def _format_state(latest, next_check_mono):
+
+    ''' Adds the age (and time until the next check) to the latest check result. Returns None if there isn't one '''
+
+    if latest is None:
+        return None
+
+    check_result, checked_at_mono = latest
+    age_sec = round(time.monotonic() - checked_at_mono, 3)
+    next_check_sec = None
+    if next_check_mono is not None:
+        next_check_sec = round(max(0, next_check_mono - time.monotonic()), 3)
+
+    return {**check_result, "age_sec": age_sec, "next_check_sec": next_check_sec}
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Set up globals
+
+# Signal used by other processes to ask for an update check
+CHECK_REQUEST_SIGNAL = signal.SIGUSR1
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Demo
+
+if __name__ == "__main__":
+
+    from local.eolib.utils.use_git import Git_Reader
+
+    # Run a single check against this repo
+    ex_checker = Update_Checker(Git_Reader(None))
+    print("", "Check result:", ex_checker.check_now(), sep="\n")
+    print("", "Retry delays (sec) after repeated fetch failures:",
+          *[round(ex_checker.get_next_delay_sec(k)) for k in range(8)], sep="\n  ")
+
+    # Other processes can read the results through a shared state file
+    import tempfile
+    with tempfile.TemporaryDirectory() as ex_folder_path:
+        ex_state_path = os.path.join(ex_folder_path, "update_state.json")
+        ex_checker = Update_Checker(Git_Reader(None), shared_state_path=ex_state_path)
+        ex_checker.check_now(fetch_first=False)
+        shared_state = Shared_Update_Checker(ex_state_path).get_state()
+        print("", "Shared state:", {key: shared_state[key] for key in ("num_newer", "age_sec", "fetch_ok")}, sep="\n")
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from statistics import median
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define functions
+
+# .....................................................................................................................
+
+def measure_import(app_folder_path, module_name="launch", python_path=sys.executable):
+
+    '''
+    Imports a module in a fresh interpreter using 'python -X importtime' and parses the timing report.
+    Returns a dictionary of: {module name: (self_us, cumulative_us)}
+    '''
+
+    command_list = [python_path, "-X", "importtime", "-c", "import {}".format(module_name)]
+    import_proc = subprocess.run(command_list, cwd=app_folder_path,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if import_proc.returncode != 0:
+        raise RuntimeError("Error importing {}:\n{}".format(module_name, import_proc.stderr))
+
+    # Lines look like: "import time:       self [us] |  cumulative | imported package"
+    timing_dict = {}
+    for each_line in import_proc.stderr.splitlines():
+        if not each_line.startswith("import time:"):
+            continue
+        self_str, cumulative_str, name_str = each_line[len("import time:"):].split("|")
+        if not self_str.strip().isdigit():
+            continue
+        timing_dict[name_str.strip()] = (int(self_str), int(cumulative_str))
+
+    return timing_dict
+
+# .....................................................................................................................
+
+def check_budget(app_folder_path, budget_dict, num_runs=5, python_path=sys.executable):
+
+    '''
+    Imports the module in the budget a few times, and compares the median timings against the budget.
+    Returns: is_ok, report_dict
+    '''
+
+    # Throw away the first run, which may include compiling bytecode (already done on the server)
+    module_name = budget_dict["module"]
+    measure_import(app_folder_path, module_name, python_path)
+    runs_list = [measure_import(app_folder_path, module_name, python_path) for _ in range(num_runs)]
+
+    # Use the median of each module's cumulative time, to smooth out disk/cpu noise between runs
+    all_names = set.union(*(set(each_run.keys()) for each_run in runs_list))
+    cumulative_ms_dict = {each_name: median(each_run.get(each_name, (0, 0))[1] for each_run in runs_list) / 1000
+                          for each_name in all_names}
+
+    total_ms = cumulative_ms_dict.get(module_name, 0)
+    banned_imported_list = sorted(each_name for each_name in budget_dict.get("not_imported", [])
+                                  if each_name in all_names)
+    is_ok = (total_ms <= budget_dict["total_ms"]) and (len(banned_imported_list) == 0)
+
+    report_dict = {"module": module_name,
+                   "runs": num_runs,
+                   "total_ms": round(total_ms, 1),
+                   "budget_ms": budget_dict["total_ms"],
+                   "imported_but_should_not_be": banned_imported_list,
+                   "slowest": sorted(cumulative_ms_dict.items(), key=lambda item: item[1], reverse=True)}
+
+    return is_ok, report_dict
+
+# .....................................................................................................................
+
+def parse_args():
+
+    # Default to checking the app that this script lives in
+    app_folder_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    budget_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_time_budget.json")
+
+    parser = argparse.ArgumentParser(description="Check the import (cold start) time of the server against a budget")
+    parser.add_argument("-r", "--runs", default=5, type=int, help="Number of fresh imports to take the median of")
+    parser.add_argument("-n", "--show", default=15, type=int, help="Number of slowest imports to list")
+    parser.add_argument("-p", "--python", default=sys.executable, help="Python interpreter to measure with")
+    parser.add_argument("--app", default=app_folder_path, help="App folder (containing launch.py)")
+    parser.add_argument("--budget", default=budget_path, help="Path to budget (json) file")
+
+    return parser.parse_args()
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run check
+
+if __name__ == "__main__":
+
+    args = parse_args()
+    with open(args.budget, "r") as in_file:
+        budget_dict = json.load(in_file)
+
+    is_ok, report_dict = check_budget(args.app, budget_dict, args.runs, args.python)
+
+    print("", "Slowest imports (cumulative, median of {} runs):".format(report_dict["runs"]), sep="\n")
+    for each_name, each_ms in report_dict["slowest"][:args.show]:
+        print("  {:>8.1f} ms  {}".format(each_ms, each_name))
+
+    print("", "Import '{}': {:.1f} ms (budget: {} ms)".format(report_dict["module"], report_dict["total_ms"],
+                                                              report_dict["budget_ms"]), sep="\n")
+    if report_dict["imported_but_should_not_be"]:
+        print("Imported at startup (should be lazy):", ", ".join(report_dict["imported_but_should_not_be"]))
+
+    print("OK" if is_ok else "Over budget!")
+    sys.exit(0 if is_ok else 1)
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from local.eolib.utils.use_git import Git_Reader
+from local.lib import server_helpers
+
+from tests.test_git_direct import Fixture_Repo
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define tests
+
+class Test_Git_Version_Cache(unittest.TestCase):
+
+    '''
+    Checks that the cached (home page) version info is re-read whenever the checked out commit or its tags change,
+    including tags added to existing sub-folders of refs/tags (e.g. 'release/v2').
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        if shutil.which("git") is None:
+            self.skipTest("git isn't installed")
+
+        self._temp_folder = tempfile.TemporaryDirectory()
+        self.repo = Fixture_Repo(os.path.join(self._temp_folder.name, "repo"))
+        self.master_ids = self.repo.build_history()
+
+        # Point the version cache at the fixture repo, starting with nothing cached
+        reader_patch = mock.patch.object(server_helpers, "GIT_READER", Git_Reader(self.repo.repo_path))
+        cache_patch = mock.patch.object(server_helpers, "_GIT_VERSION_CACHE", (None, None))
+        for each_patch in (reader_patch, cache_patch):
+            each_patch.start()
+            self.addCleanup(each_patch.stop)
+
+    # .................................................................................................................
+
+    def tearDown(self):
+        self._temp_folder.cleanup()
+
+    # .................................................................................................................
+
+    def test_unchanged_repo_is_cached(self):
+
+        version_info = server_helpers.check_git_version()
+        self.assertEqual(version_info[2], "release/rc/v2.0")
+
+        with mock.patch.object(server_helpers, "_read_git_version") as mock_read:
+            self.assertEqual(server_helpers.check_git_version(), version_info)
+            mock_read.assert_not_called()
+
+    # .................................................................................................................
+
+    def test_new_nested_tag(self):
+
+        self.assertEqual(server_helpers.check_git_version()[2], "release/rc/v2.0")
+        start_signature = server_helpers.get_git_state_signature()
+
+        # Only the modified time of the (existing) refs/tags/release/rc folder changes here
+        self.repo.git("tag", "release/rc/v2.1")
+        self.assertNotEqual(server_helpers.get_git_state_signature(), start_signature)
+        self.assertEqual(server_helpers.check_git_version()[2], "release/rc/v2.0, release/rc/v2.1")
+
+    # .................................................................................................................
+
+    def test_new_commit(self):
+
+        server_helpers.check_git_version()
+        new_id = self.repo.commit("fourth")
+        self.assertEqual(server_helpers.check_git_version()[2], new_id[:7])
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
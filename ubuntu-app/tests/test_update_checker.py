@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from local.eolib.utils.use_git import Git_Reader
+from local.lib.update_checker import Update_Checker
+
+from tests.test_git_direct import Fixture_Repo
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define tests
+
+class Test_Update_Checker(unittest.TestCase):
+
+    '''
+    Checks for updates against a local bare repo standing in for the remote, with a checkout (the 'device')
+    cloned from it. New releases are made in a separate working repo & pushed to the remote.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        if shutil.which("git") is None:
+            self.skipTest("git isn't installed")
+
+        self._temp_folder = tempfile.TemporaryDirectory()
+        self.remote_path = os.path.join(self._temp_folder.name, "remote.git")
+        self.checkout_path = os.path.join(self._temp_folder.name, "checkout")
+
+        self.work_repo = Fixture_Repo(os.path.join(self._temp_folder.name, "work"))
+        self.work_repo.build_history()
+        self.work_repo.git("clone", "-q", "--bare", self.work_repo.repo_path, self.remote_path)
+        self.work_repo.git("remote", "add", "origin", self.remote_path)
+        self.work_repo.git("clone", "-q", self.remote_path, self.checkout_path)
+
+        self.checker = None
+
+    # .................................................................................................................
+
+    def tearDown(self):
+        if self.checker is not None:
+            self.checker.stop()
+        self._temp_folder.cleanup()
+
+    # .................................................................................................................
+
+    def test_reports_pushed_tag(self):
+
+        checker = Update_Checker(Git_Reader(self.checkout_path), max_listings=4)
+        check_result = checker.check_now()
+        self.assertTrue(check_result["fetch_ok"])
+        self.assertFalse(check_result["update_available"])
+        self.assertEqual(check_result["num_newer"], 0)
+
+        # Release a new (tagged) version on the remote
+        new_id = self.work_repo.commit("new release")
+        self.work_repo.git("tag", "-a", "-m", "new release", "v9.0")
+        self.work_repo.git("push", "-q", "origin", "master", "v9.0")
+
+        check_result = checker.check_now()
+        self.assertTrue(check_result["fetch_ok"])
+        self.assertTrue(check_result["update_available"])
+        self.assertEqual(check_result["num_newer"], 1)
+
+        newest_listing = check_result["commit_listings"][0]
+        self.assertEqual(newest_listing["commit_tag"], "v9.0")
+        self.assertTrue(new_id.startswith(newest_listing["commit_id"]))
+        self.assertEqual(checker.get_state()["num_newer"], 1)
+
+    # .................................................................................................................
+
+    def test_failed_fetch_keeps_listing(self):
+
+        checker = Update_Checker(Git_Reader(self.checkout_path), max_listings=4)
+        checker.check_now()
+        self.set_remote_url(os.path.join(self._temp_folder.name, "missing.git"))
+
+        check_result = checker.check_now()
+        self.assertFalse(check_result["fetch_ok"])
+        self.assertIsNotNone(check_result["fetch_error"])
+        self.assertEqual(check_result["num_fetch_failures"], 1)
+        self.assertIsNone(check_result["listing_error"])
+        self.assertGreater(len(check_result["commit_listings"]), 0)
+
+    # .................................................................................................................
+
+    def test_retry_delays(self):
+
+        checker = Update_Checker(None, interval_sec=100, jitter_fraction=0, max_backoff_sec=400)
+        retry_delays = [checker.get_next_delay_sec(each_num_failures) for each_num_failures in range(7)]
+        self.assertEqual(retry_delays, [100, 30, 60, 120, 240, 400, 400])
+
+        # Jitter stays within the given fraction
+        checker.jitter_fraction = 0.1
+        for _ in range(50):
+            self.assertTrue(90 <= checker.get_next_delay_sec(0) <= 110)
+
+    # .................................................................................................................
+
+    def test_background_checks_follow_schedule(self):
+
+        # Jitter is turned off so the first check runs right away & every delay is exact
+        self.checker = Update_Checker(Git_Reader(self.checkout_path), interval_sec=100, jitter_fraction=0,
+                                      max_backoff_sec=100, max_listings=4)
+        self.checker.start()
+        self.wait_for_check(0, 100)
+
+        # Nothing else runs before the interval is up
+        checked_at_ems = self.checker.get_state()["checked_at_ems"]
+        time.sleep(0.5)
+        self.assertEqual(self.checker.get_state()["checked_at_ems"], checked_at_ems)
+
+        # Failed fetches are retried sooner, backing off up to the max
+        self.set_remote_url(os.path.join(self._temp_folder.name, "missing.git"))
+        for each_num_failures, each_delay_sec in ((1, 30), (2, 60), (3, 100), (4, 100)):
+            self.checker.request_check()
+            self.wait_for_check(each_num_failures, each_delay_sec)
+
+        # Back to the normal interval once fetching works again
+        self.set_remote_url(self.remote_path)
+        self.checker.request_check()
+        self.wait_for_check(0, 100)
+        self.assertTrue(self.checker.get_state()["fetch_ok"])
+
+    # .................................................................................................................
+
+    def set_remote_url(self, remote_url):
+        self.work_repo.git("remote", "set-url", "origin", remote_url, cwd=self.checkout_path)
+
+    # .................................................................................................................
+
+    def wait_for_check(self, num_fetch_failures, next_check_sec, timeout_sec=10):
+
+        ''' Waits for a background check with the given number of fetch failures, then checks its schedule '''
+
+        end_time = time.monotonic() + timeout_sec
+        while time.monotonic() < end_time:
+            state = self.checker.get_state()
+            is_scheduled = (state is not None) and (state["next_check_sec"] > next_check_sec - 5)
+            if is_scheduled and state["num_fetch_failures"] == num_fetch_failures:
+                self.assertLessEqual(state["next_check_sec"], next_check_sec)
+                return
+            time.sleep(0.01)
+
+        self.fail("Timed out waiting for a check with {} fetch failure(s)".format(num_fetch_failures))
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap
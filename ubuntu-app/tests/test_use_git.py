@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 2026
+
+@author: Jared McGrath
+"""
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Imports
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from local.eolib.utils.use_git import Git_Reader
+
+from tests.test_git_direct import Fixture_Repo
+
+# .....................................................................................................................
+# .....................................................................................................................
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Define tests
+
+class Test_Commit_Listings(unittest.TestCase):
+
+    '''
+    Checks that version listings give the same results with & without direct reads, and that
+    listing through git only costs a single git process, however many commits are listed.
+    Run from the app folder with: python -m unittest discover tests
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        if shutil.which("git") is None:
+            self.skipTest("git isn't installed")
+
+        # Build a history where the checkout (HEAD) is a few commits behind the upstream (origin/master)
+        self._temp_folder = tempfile.TemporaryDirectory()
+        self.repo = Fixture_Repo(os.path.join(self._temp_folder.name, "repo"))
+        self.master_ids = self.repo.build_history()
+        for idx in range(4):
+            self.master_ids.append(self.repo.commit("upstream {}".format(idx)))
+        self.repo.git("tag", "-a", "-m", "upstream release", "v3.0", self.master_ids[-2])
+        self.repo.git("update-ref", "refs/remotes/origin/master", self.master_ids[-1])
+        self.repo.git("reset", "-q", "--hard", self.master_ids[3])
+
+    # .................................................................................................................
+
+    def tearDown(self):
+        self._temp_folder.cleanup()
+
+    # .................................................................................................................
+
+    def test_listing_uses_one_git_call(self):
+
+        for each_max_listings in (1, 3, 6, 20):
+            with self.subTest(max_listings=each_max_listings):
+                git_reader = Git_Reader(self.repo.repo_path, use_direct_reads=False)
+                git_listings = git_reader.get_commit_listings(each_max_listings)
+                self.assertEqual(git_reader.num_git_calls, 1)
+
+                direct_reader = Git_Reader(self.repo.repo_path, use_direct_reads=True)
+                self.assertEqual(git_listings, direct_reader.get_commit_listings(each_max_listings))
+                self.assertEqual(direct_reader.num_git_calls, 0)
+
+    # .................................................................................................................
+
+    def test_listing_contents(self):
+
+        git_reader = Git_Reader(self.repo.repo_path, use_direct_reads=False)
+        listings = git_reader.get_commit_listings(6)
+
+        # 4 newer (upstream) commits come first, then the current commit & an older one
+        listed_full_ids = [git_reader.get_full_commit_id(each_listing["commit_id"]) for each_listing in listings]
+        self.assertEqual(listed_full_ids, self.master_ids[:1:-1])
+        self.assertEqual([each_listing["in_use"] for each_listing in listings], [False] * 4 + [True, False])
+        self.assertEqual([each_listing["commit_tag"] for each_listing in listings],
+                         ["", "v3.0", "", "", "release/rc/v2.0", ""])
+
+    # .................................................................................................................
+
+    def test_listing_at_upstream(self):
+
+        self.repo.git("reset", "-q", "--hard", self.master_ids[-1])
+
+        git_reader = Git_Reader(self.repo.repo_path, use_direct_reads=False)
+        git_listings = git_reader.get_commit_listings(4)
+        self.assertEqual(git_reader.num_git_calls, 1)
+        self.assertEqual([each_listing["in_use"] for each_listing in git_listings], [True, False, False, False])
+        self.assertEqual(git_listings, Git_Reader(self.repo.repo_path).get_commit_listings(4))
+
+    # .................................................................................................................
+
+    def test_missing_upstream(self):
+
+        self.repo.git("update-ref", "-d", "refs/remotes/origin/master")
+        with self.assertRaises(AttributeError):
+            Git_Reader(self.repo.repo_path, use_direct_reads=False).get_commit_listings(6)
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+class Test_Tags_Index(unittest.TestCase):
+
+    '''
+    Checks that the (cached) tag listing used when reading through git is re-read when tags change,
+    including tags added to existing sub-folders of refs/tags (e.g. 'release/v2')
+    '''
+
+    # .................................................................................................................
+
+    def setUp(self):
+
+        if shutil.which("git") is None:
+            self.skipTest("git isn't installed")
+
+        self._temp_folder = tempfile.TemporaryDirectory()
+        self.repo = Fixture_Repo(os.path.join(self._temp_folder.name, "repo"))
+        self.master_ids = self.repo.build_history()
+        self.git_reader = Git_Reader(self.repo.repo_path, use_direct_reads=False)
+
+    # .................................................................................................................
+
+    def tearDown(self):
+        self._temp_folder.cleanup()
+
+    # .................................................................................................................
+
+    def test_unchanged_tags_are_cached(self):
+
+        self.assertEqual(self.git_reader.get_current_commit()[1], ["release/rc/v2.0"])
+        num_git_calls = self.git_reader.num_git_calls
+
+        # Only the 'git log' call is repeated
+        self.assertEqual(self.git_reader.get_current_commit()[1], ["release/rc/v2.0"])
+        self.assertEqual(self.git_reader.num_git_calls, num_git_calls + 1)
+
+    # .................................................................................................................
+
+    def test_new_nested_tags(self):
+
+        self.assertEqual(self.git_reader.get_current_commit()[1], ["release/rc/v2.0"])
+        start_state = self.git_reader._get_tags_state()
+
+        # Only the modified time of the (existing) refs/tags/release/rc folder changes here
+        self.repo.git("tag", "release/rc/v2.1")
+        self.assertNotEqual(self.git_reader._get_tags_state(), start_state)
+        self.assertEqual(self.git_reader.get_current_commit()[1], ["release/rc/v2.0", "release/rc/v2.1"])
+
+        # Same again, with the older tags packed
+        self.repo.git("pack-refs", "--all")
+        self.repo.git("tag", "release/rc/v2.2")
+        self.assertEqual(self.git_reader.get_current_commit()[1],
+                         ["release/rc/v2.0", "release/rc/v2.1", "release/rc/v2.2"])
+
+    # .................................................................................................................
+    # .................................................................................................................
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Run tests
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+# ---------------------------------------------------------------------------------------------------------------------
+#%% Scrap